@@ -0,0 +1,182 @@
+'''
+Array-backed storage for the nodes of a search. Instead of one Node object
+(with its own board, move tuples and attributes) per generated node, a
+NodeArena keeps one entry per node in parallel columns and nodes are referred
+to by their integer id, their index in the columns. A node costs a couple of
+dozen bytes this way instead of several hundred.
+
+ArenaNode wraps an id into an object with the interface of Node, which is
+what the searches return so that their results can be used as usual, and
+ArenaSearchSpace does the same for the expanded nodes of their search_space.
+'''
+from __future__ import annotations
+from array import array
+from collections.abc import Sequence
+from board import PackedBoard
+from moves import move_table
+from node import Node
+from typing import Iterator, List
+import numpy as np
+
+NO_PARENT = -1
+
+
+class NodeArena:
+    '''
+    Parallel columns, indexed by node id:
+
+        states:     the packed configuration (see PackedBoard)
+        parents:    id of the parent node, NO_PARENT for the root
+        g, h:       cost from the root and heuristic value
+        blanks:     index of the blank tile. The tile moved to produce a node
+                    is the one now at its parent's blank index.
+        costs:      cost of the move that produced the node
+
+    States are stored as unsigned 64 bit integers when they fit (up to 4x4
+    boards), as Python ints otherwise.
+    '''
+
+    def __init__(self, shape: tuple, bits: int = None):
+        self.shape = tuple(shape)
+        self.size = self.shape[0] * self.shape[1]
+        self.bits = bits if bits is not None else PackedBoard.bits_for(self.shape)
+
+        self.states = array('Q') if self.size * self.bits <= 64 else []
+        self.parents = array('i')
+        self.g = array('i')
+        self.h = array('i')
+        self.blanks = array('B')
+        self.costs = array('B')
+
+    def add(self, state: int, parent: int, g: int, h: int, blank: int, cost: int) -> int:
+        '''Stores a node and returns its id.'''
+        self.states.append(state)
+        self.parents.append(parent)
+        self.g.append(g)
+        self.h.append(h)
+        self.blanks.append(blank)
+        self.costs.append(cost)
+        return len(self.parents) - 1
+
+    def __len__(self) -> int:
+        return len(self.parents)
+
+    def board(self, node_id: int) -> PackedBoard:
+        return PackedBoard.from_state(self.states[node_id], self.shape, self.bits, self.blanks[node_id])
+
+    def node(self, node_id: int) -> ArenaNode:
+        return ArenaNode(self, node_id)
+
+    def nbytes(self) -> int:
+        '''Approximate memory used by the columns (not counting over-allocation).'''
+        columns = (self.parents, self.g, self.h, self.blanks, self.costs)
+        total = sum(column.itemsize * len(column) for column in columns)
+        if isinstance(self.states, array):
+            return total + self.states.itemsize * len(self.states)
+        return total + sum(state.__sizeof__() for state in self.states) + 8 * len(self.states)
+
+
+class ArenaNode(Node):
+    '''
+    A node stored in a NodeArena, with the attributes of Node computed from
+    the columns when they are accessed.
+    '''
+
+    def __init__(self, arena: NodeArena, node_id: int):
+        self.arena = arena
+        self.id = node_id
+        self._board = None
+
+    def __eq__(self, other) -> bool:
+        return isinstance(other, ArenaNode) and other.arena is self.arena and other.id == self.id
+
+    def __hash__(self) -> int:
+        return hash(self.id)
+
+    @property
+    def is_root(self) -> bool:
+        return self.arena.parents[self.id] == NO_PARENT
+
+    @property
+    def parent(self) -> ArenaNode:
+        parent = self.arena.parents[self.id]
+        return None if parent == NO_PARENT else ArenaNode(self.arena, parent)
+
+    @property
+    def board(self) -> PackedBoard:
+        if self._board is None:
+            self._board = self.arena.board(self.id)
+        return self._board
+
+    @property
+    def start(self) -> tuple:
+        parent = self.arena.parents[self.id]
+        if parent == NO_PARENT:
+            return (np.nan, np.nan)
+        return move_table(self.arena.shape).positions[self.arena.blanks[parent]]
+
+    @property
+    def end(self) -> tuple:
+        if self.is_root:
+            return (np.nan, np.nan)
+        return move_table(self.arena.shape).positions[self.arena.blanks[self.id]]
+
+    @property
+    def simple_cost(self) -> int:
+        return self.arena.costs[self.id]
+
+    @property
+    def total_cost(self) -> int:
+        return self.arena.g[self.id]
+
+    @property
+    def g_n(self) -> int:
+        return self.arena.g[self.id]
+
+    @property
+    def h_n(self) -> int:
+        return self.arena.h[self.id]
+
+    @property
+    def f_n(self) -> int:
+        return self.arena.g[self.id] + self.arena.h[self.id]
+
+    def make_child(self, start: tuple, end: tuple, simple_cost: int, heuristic_func=None) -> Node:
+        '''Builds the child as a plain Node: the arena only holds the nodes its search added.'''
+        move = {'start': start, 'end': end, 'board': self.board.swap(start, end), 'simple_cost': simple_cost}
+        return Node(move=move, parent=self, heuristic_func=heuristic_func)
+
+    def successors(self, heuristic_func=None) -> List[Node]:
+        '''Every child of the node (see make_child), from the move table of the arena's shape.'''
+        table = move_table(self.arena.shape)
+        blank = self.arena.blanks[self.id]
+        start = table.positions[blank]
+        return [self.make_child(start, table.positions[end], cost, heuristic_func) for end, cost in table.all[blank]]
+
+
+class ArenaSearchSpace(Sequence):
+    '''
+    The search_space of a search over a NodeArena: the ids of the expanded
+    nodes, in order, in an array of ints. The ArenaNodes are only built when
+    the sequence is read, so keeping the expansion order costs 4 bytes per
+    expanded node rather than an object.
+    '''
+
+    def __init__(self, arena: NodeArena):
+        self.arena = arena
+        self.ids = array('i')
+
+    def append(self, node_id: int):
+        self.ids.append(node_id)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [ArenaNode(self.arena, node_id) for node_id in self.ids[index]]
+        return ArenaNode(self.arena, self.ids[index])
+
+    def __iter__(self) -> Iterator[ArenaNode]:
+        for node_id in self.ids:
+            yield ArenaNode(self.arena, node_id)
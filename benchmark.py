@@ -0,0 +1,289 @@
+'''
+Reproducible benchmark of the searches. Every instance of a fixed corpus
+(the puzzles of input.txt and random_puzzles.txt plus 3x3 and 4x4 instances
+generated by seeded random walks from the goal) is solved with every
+algorithm/heuristic pair, and the wall time, expanded and generated nodes,
+nodes per second and peak memory of each run are reported as JSON.
+
+    python benchmark.py run --output before.json
+    python benchmark.py run --quick --algorithms A* IDA* --output after.json
+    python benchmark.py compare before.json after.json
+
+Peak memory is measured with tracemalloc in a second run of each pair, since
+tracing allocations slows the searches down too much to time them at the
+same time (--no-memory skips it). It only sees the calling process, so the
+peak memory of HDA* leaves out its workers.
+'''
+from board import Board
+from moves import move_table
+from node import Node
+import argparse
+import datetime
+import hda_star
+import heuristics
+import json
+import numpy as np
+import os
+import platform
+import search
+import subprocess
+import sys
+import time
+import tracemalloc
+
+SEED = 472
+
+# (name, search function, whether it takes a heuristic, whether it can also run without one)
+ALGORITHMS = [
+    ('UCS', lambda board, H, timeout: search.uniform_cost(board, timeout=timeout), False),
+    ('GBF', lambda board, H, timeout: search.greedy_best_first(board, H, timeout=timeout), True),
+    ('A*', lambda board, H, timeout: search.a_star(board, H, timeout=timeout), True),
+    ('wA*', lambda board, H, timeout: search.weighted_a_star(board, H, timeout=timeout), True),
+    ('IDA*', lambda board, H, timeout: search.ida_star(board, H, timeout=timeout), True),
+    ('ARA*', lambda board, H, timeout: search.ara_star(board, H, timeout=timeout), True),
+    ('BD', lambda board, H, timeout: search.bidirectional(board, H, timeout=timeout), None),
+    ('HDA*', lambda board, H, timeout: hda_star.hda_star(board, H, timeout=timeout), True),
+]
+
+HEURISTICS = [
+    heuristics.hamming_distance,
+    heuristics.manhattan_distance,
+    heuristics.row_col_out_of_place,
+    heuristics.euclidean_distance,
+    heuristics.permutation_inversion,
+    heuristics.pattern_database_distance,
+]
+
+WALKS = [((3, 3), 20, 4), ((3, 3), 40, 4), ((4, 4), 30, 4)]   # (shape, number of moves, number of instances)
+
+
+def read_puzzles(file_name: str, shape: tuple) -> list:
+    '''Reads one puzzle per line, the tiles in row-major order.'''
+    if not os.path.isfile(file_name):
+        return []
+
+    with open(file_name) as f:
+        return [np.array(line.split(), dtype=int).reshape(shape) for line in f if line.strip()]
+
+
+def random_walk(shape: tuple, moves: int, random: np.random.RandomState) -> np.array:
+    '''Returns the board reached from the goal by that many random moves, never undoing the previous one.'''
+    table = move_table(shape)
+    size = shape[0] * shape[1]
+    tiles = list(range(1, size)) + [0]
+    blank = size - 1
+    previous = None
+
+    for _ in range(moves):
+        ends = [end for end, _ in table.all[blank] if end != previous]
+        end = ends[random.randint(len(ends))]
+        tiles[blank], tiles[end] = tiles[end], tiles[blank]
+        previous, blank = blank, end
+
+    return np.array(tiles).reshape(shape)
+
+
+def load_corpus(quick: bool = False, directory: str = '.') -> list:
+    '''
+    Returns the (name, puzzle) instances of the corpus, always the same ones
+    for a given seed. The quick corpus keeps the first 3 puzzles of every group.
+    '''
+    groups = [
+        ('input', read_puzzles(os.path.join(directory, 'input.txt'), (2, 4))),
+        ('random', read_puzzles(os.path.join(directory, 'random_puzzles.txt'), (2, 4))),
+    ]
+
+    random = np.random.RandomState(SEED)
+    for shape, moves, count in WALKS:
+        walks = [random_walk(shape, moves, random) for _ in range(count)]
+        groups.append((f'walk{shape[0]}x{shape[1]}-{moves}', walks))
+
+    corpus = []
+    for group, puzzles in groups:
+        if quick:
+            puzzles = puzzles[:3]
+        corpus += [(f'{group}-{i+1}', puzzle) for i, puzzle in enumerate(puzzles)]
+
+    return corpus
+
+
+def pairs(algorithms: list = None, heuristic_names: list = None) -> list:
+    '''Returns the (algorithm name, search, heuristic or None) pairs to run, optionally filtered by name.'''
+    chosen = []
+    for name, func, needs_heuristic in ALGORITHMS:
+        if algorithms and name not in algorithms:
+            continue
+        if needs_heuristic is not True:
+            chosen.append((name, func, None))
+        if needs_heuristic is not False:
+            chosen += [(name, func, H) for H in HEURISTICS if not heuristic_names or H.__name__ in heuristic_names]
+
+    return chosen
+
+
+def measure(func, puzzle: np.array, H, timeout: int, memory: bool) -> dict:
+    '''Runs one search and returns its measurements.'''
+    board = Board(puzzle=puzzle)
+    if H is not None:
+        H(Node(is_root=True, board=board))     # tables and databases are built before timing
+
+    start = time.perf_counter()
+    result = func(board, H, timeout)
+    wall_time = time.perf_counter() - start
+
+    peak_memory = None
+    if memory:
+        tracemalloc.start()
+        func(board, H, timeout)
+        peak_memory = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {
+        'success': result['success'],
+        'message': result['message'],
+        'cost': int(result['current_node'].total_cost) if result['success'] else None,
+        'wall_time': round(wall_time, 6),
+        'expanded': result['visited_nodes'],
+        'generated': result['created_nodes'],
+        'nodes_per_second': round(result['visited_nodes'] / wall_time, 1) if wall_time > 0 else None,
+        'peak_memory': peak_memory,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(corpus: list, chosen_pairs: list, timeout: int = 10, memory: bool = True, log=sys.stderr) -> dict:
+    '''Runs every pair on every instance and returns the report.'''
+    runs = []
+    for instance, puzzle in corpus:
+        for name, func, H in chosen_pairs:
+            measurements = measure(func, puzzle, H, timeout, memory)
+            run = {'instance': instance, 'shape': list(puzzle.shape), 'algorithm': name, 'heuristic': H.__name__ if H else None}
+            run.update(measurements)
+            runs.append(run)
+
+            if log is not None:
+                print(f"{instance:>14} {name:>5} {run['heuristic'] or '-':>25} {run['wall_time']:>9.3f}s {run['expanded']:>9} expanded", file=log)
+
+    return {
+        'meta': {
+            'seed': SEED,
+            'timeout': timeout,
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+        },
+        'runs': runs,
+    }
+
+
+def _key(run: dict) -> tuple:
+    return run['instance'], run['algorithm'], run['heuristic']
+
+
+def compare(baseline: dict, candidate: dict) -> list:
+    '''
+    Matches the runs of two reports and returns one row per run found in both,
+    with the candidate/baseline ratios of wall time, nodes per second and peak
+    memory, and whether the searches themselves behaved differently (cost,
+    expanded or generated nodes).
+    '''
+    candidates = {_key(run): run for run in candidate['runs']}
+    rows = []
+    for before in baseline['runs']:
+        after = candidates.get(_key(before))
+        if after is None:
+            continue
+
+        def ratio(field):
+            if before[field] and after[field] is not None:
+                return after[field] / before[field]
+            return None
+
+        changed = [field for field in ('success', 'cost', 'expanded', 'generated') if before[field] != after[field]]
+        rows.append({
+            'instance': before['instance'],
+            'algorithm': before['algorithm'],
+            'heuristic': before['heuristic'],
+            'time_ratio': ratio('wall_time'),
+            'speed_ratio': ratio('nodes_per_second'),
+            'memory_ratio': ratio('peak_memory'),
+            'changed': changed,
+        })
+
+    return rows
+
+
+def geometric_mean(values: list) -> float:
+    values = [v for v in values if v]
+    return float(np.exp(np.mean(np.log(values)))) if values else None
+
+
+def print_comparison(rows: list, threshold: float = 0.1, out=sys.stdout):
+    '''Prints the runs whose time or memory changed by more than threshold, those that behaved differently and a summary.'''
+    def fmt(ratio):
+        return '     -' if ratio is None else f'{ratio:>6.2f}'
+
+    print(f"{'instance':>14} {'algo':>5} {'heuristic':>25}   time  speed    mem  changed", file=out)
+    for row in rows:
+        moved = [r for r in (row['time_ratio'], row['memory_ratio']) if r is not None and abs(r - 1) > threshold]
+        if moved or row['changed']:
+            print(f"{row['instance']:>14} {row['algorithm']:>5} {row['heuristic'] or '-':>25} "
+                  f"{fmt(row['time_ratio'])} {fmt(row['speed_ratio'])} {fmt(row['memory_ratio'])}  {' '.join(row['changed'])}", file=out)
+
+    print(f"\n{len(rows)} runs compared, geometric means: time {fmt(geometric_mean([r['time_ratio'] for r in rows]))}, "
+          f"nodes/s {fmt(geometric_mean([r['speed_ratio'] for r in rows]))}, "
+          f"memory {fmt(geometric_mean([r['memory_ratio'] for r in rows]))}", file=out)
+
+    changed = sum(1 for row in rows if row['changed'])
+    if changed:
+        print(f'{changed} run(s) found a different solution or searched differently', file=out)
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmarks the searches on a fixed corpus of puzzles.')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = commands.add_parser('run', help='run the benchmark and write its report as JSON')
+    run_parser.add_argument('--output', help='file to write the report to (default: standard output)')
+    run_parser.add_argument('--timeout', type=int, default=10, help='timeout of every search in seconds (default: 10)')
+    run_parser.add_argument('--quick', action='store_true', help='only run the first 3 instances of every group')
+    run_parser.add_argument('--algorithms', nargs='+', choices=[name for name, _, _ in ALGORITHMS], help='only run these algorithms')
+    run_parser.add_argument('--heuristics', nargs='+', choices=[H.__name__ for H in HEURISTICS], help='only use these heuristics')
+    run_parser.add_argument('--no-memory', action='store_true', help="don't measure peak memory (halves the running time)")
+
+    compare_parser = commands.add_parser('compare', help='compare two reports')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('candidate')
+    compare_parser.add_argument('--threshold', type=float, default=0.1, help='relative change below which a run is not listed (default: 0.1)')
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'run':
+        report = run_benchmark(load_corpus(args.quick), pairs(args.algorithms, args.heuristics), args.timeout, not args.no_memory)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(report, f, indent=1)
+        else:
+            json.dump(report, sys.stdout, indent=1)
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    rows = compare(baseline, candidate)
+    print_comparison(rows, args.threshold)
+    return 1 if any(row['changed'] for row in rows) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,173 @@
+'''
+Compact binary format for the search and solution traces written to results/.
+
+A trace file starts with a small header followed by fixed-width records, one
+per line of the equivalent .txt file. A record holds the packed board (the
+tile at row-major index i in the bits [i*bits, (i+1)*bits), as in PackedBoard)
+and three unsigned 16 bit values:
+
+    search files:   f, g, h                 ("f g h board" lines)
+    solution files: moved tile, cost, 0     ("tile cost board" lines)
+
+Since records have a fixed width, the number of lines of a trace is known from
+its size alone, and the records can be read back through a memory map.
+'''
+from board import Board, PackedBoard
+import numpy as np
+import os
+import struct
+
+MAGIC = b'XTRC'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBBBB')     # magic, version, kind, rows, cols, bits per tile, bytes per state
+
+SEARCH = 0
+SOLUTION = 1
+KINDS = {'search': SEARCH, 'solution': SOLUTION}
+
+VALUE_TYPE = np.dtype('<u2')
+MAX_VALUE = np.iinfo(VALUE_TYPE).max
+
+BUFFER_SIZE = 1 << 16
+
+
+def record_type(state_bytes: int) -> np.dtype:
+    '''The numpy dtype of the records of a trace whose states take state_bytes bytes.'''
+    return np.dtype([('state', 'u1', (state_bytes,)), ('values', VALUE_TYPE, (3,))])
+
+
+def board_state(board: Board, bits: int) -> int:
+    '''Returns the configuration of board packed with bits per tile.'''
+    if isinstance(board, PackedBoard) and board.bits == bits:
+        return board.state
+
+    state = 0
+    for i, tile in enumerate(board.puzzle.flatten().tolist()):
+        state |= tile << (i * bits)
+    return state
+
+
+class BinaryTraceWriter:
+    '''
+    Writes the records of one trace file. kind is SEARCH or SOLUTION and every
+    board written must have the given shape.
+    '''
+
+    def __init__(self, path: str, kind: int, shape: tuple, bits: int = None):
+        rows, cols = shape
+        self.shape = (int(rows), int(cols))
+        self.bits = bits if bits is not None else PackedBoard.bits_for(self.shape)
+        self.state_bytes = (rows * cols * self.bits + 7) // 8
+        self.records = 0
+
+        self.file = open(path, mode='wb', buffering=BUFFER_SIZE)
+        self.file.write(HEADER.pack(MAGIC, VERSION, kind, rows, cols, self.bits, self.state_bytes))
+        self._values = struct.Struct(f'<{self.state_bytes}s3H')
+
+    def write_state(self, state: int, a: int, b: int, c: int):
+        for value in (a, b, c):
+            if not 0 <= value <= MAX_VALUE:
+                raise ValueError(f'{value} does not fit in a trace record (0 to {MAX_VALUE})')
+        self.file.write(self._values.pack(state.to_bytes(self.state_bytes, 'little'), a, b, c))
+        self.records += 1
+
+    def write(self, board: Board, a: int, b: int, c: int):
+        '''Appends the record of board with the values a, b and c.'''
+        self.write_state(board_state(board, self.bits), int(a), int(b), int(c))
+
+    def write_line(self, line: str):
+        '''Appends the record of one line of a .txt trace: the 3 values (or 2 in solution files) then the tiles.'''
+        numbers = [int(x) for x in line.split()]
+        size = self.shape[0] * self.shape[1]
+        values, tiles = numbers[:-size], numbers[-size:]
+        values += [0] * (3 - len(values))
+
+        state = 0
+        for i, tile in enumerate(tiles):
+            state |= tile << (i * self.bits)
+        self.write_state(state, *values)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def write_text(text: str, path: str, kind: int, shape: tuple):
+    '''Converts the contents of a .txt trace to a binary trace at path.'''
+    with BinaryTraceWriter(path, kind, shape) as writer:
+        for line in text.splitlines():
+            if line:
+                writer.write_line(line)
+
+
+class TraceFile:
+    '''
+    A binary trace read back through a memory map. records is a structured
+    array with the fields state and values.
+    '''
+
+    def __init__(self, path: str):
+        with open(path, mode='rb') as f:
+            header = f.read(HEADER.size)
+        magic, version, self.kind, rows, cols, self.bits, state_bytes = HEADER.unpack(header)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a binary trace (version {VERSION})')
+
+        self.shape = (rows, cols)
+        dtype = record_type(state_bytes)
+        count = (os.path.getsize(path) - HEADER.size) // dtype.itemsize
+        if count == 0:
+            self.records = np.zeros(0, dtype=dtype)
+        else:
+            self.records = np.memmap(path, dtype=dtype, mode='r', offset=HEADER.size, shape=(count,))
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def tiles(self) -> np.array:
+        '''Returns the unpacked boards, one row-major row of tiles per record.'''
+        size = self.shape[0] * self.shape[1]
+        bits = np.unpackbits(np.asarray(self.records['state']), axis=1, bitorder='little')[:, :size * self.bits]
+        return bits.reshape(len(self), size, self.bits) @ (1 << np.arange(self.bits))
+
+    def lines(self):
+        '''Yields the lines of the equivalent .txt trace.'''
+        columns = 3 if self.kind == SEARCH else 2
+        values = np.asarray(self.records['values'])[:, :columns].tolist()
+        for numbers, tiles in zip(values, self.tiles().tolist()):
+            yield ' '.join(str(x) for x in numbers + tiles) + '\n'
+
+    def to_text(self) -> str:
+        '''Returns the exact contents of the equivalent .txt trace.'''
+        return ''.join(self.lines())
+
+
+def count_records(path: str) -> int:
+    '''Returns the number of lines of a binary trace from its header and size, without reading it.'''
+    with open(path, mode='rb') as f:
+        state_bytes = HEADER.unpack(f.read(HEADER.size))[-1]
+    return (os.path.getsize(path) - HEADER.size) // record_type(state_bytes).itemsize
+
+
+def convert_to_text(path: str, text_path: str = None) -> str:
+    '''Writes the .txt equivalent of the binary trace at path (next to it by default) and returns its path.'''
+    if text_path is None:
+        text_path = os.path.splitext(path)[0] + '.txt'
+
+    with open(text_path, mode='w', buffering=BUFFER_SIZE) as f:
+        f.writelines(TraceFile(path).lines())
+
+    return text_path
+
+
+if __name__ == '__main__':
+    import sys
+    for path in sys.argv[1:]:
+        print(convert_to_text(path))
@@ -1,5 +1,7 @@
+from __future__ import annotations  # in order to allow type hints for a class referring to itself
 import numpy as np
 from typing import *
+from moves import move_table
 
 
 class Board:
@@ -10,6 +12,48 @@ class Board:
     def __repr__(self) -> str:
         return str(self.puzzle)
 
+    @property
+    def shape(self) -> tuple:
+        return self.puzzle.shape
+
+    def key(self) -> tuple:
+        '''
+        Returns a hashable value identifying the configuration of the board. It
+        is used by the search algorithms to index their closed lists.
+        '''
+        return tuple(self.puzzle.flatten().tolist())
+
+    def tile(self, index: int) -> int:
+        '''Returns the tile at row-major index.'''
+        return int(self.puzzle.flat[index])
+
+    def swapped_key(self, start: tuple, end: tuple) -> tuple:
+        '''Returns the key the board would have after swapping start and end, without building it.'''
+        cols = self.puzzle.shape[1]
+        i = start[0] * cols + start[1]
+        j = end[0] * cols + end[1]
+        tiles = self.puzzle.flatten().tolist()
+        tiles[i], tiles[j] = tiles[j], tiles[i]
+        return tuple(tiles)
+
+    def swap(self, start: tuple, end: tuple) -> Board:
+        '''Returns a new board where the tiles at start and end are swapped.'''
+        new_puzzle = np.copy(self.puzzle)
+        new_puzzle[start], new_puzzle[end] = new_puzzle[end], new_puzzle[start]
+        return Board(new_puzzle)
+
+    def pack(self) -> PackedBoard:
+        '''Returns the same configuration stored in a PackedBoard.'''
+        return PackedBoard(self.puzzle)
+
+    def is_permutation(self) -> bool:
+        '''True if the tiles are exactly 0..rows*cols-1, which is what ranking requires.'''
+        return sorted(self.key()) == list(range(self.puzzle.size))
+
+    def rank(self) -> int:
+        '''Returns the permutation_rank of the configuration.'''
+        return permutation_rank(self.key())
+
     def is_goal_state(self) -> bool:
         x = self.puzzle
         rows = x.shape[0]
@@ -39,136 +83,245 @@ class Board:
 
         return self.top_left_corner or self.top_right_corner or self.bottom_left_corner or self.bottom_right_corner
 
+    def blank_index(self) -> int:
+        '''Returns the row-major index of the blank (0) tile.'''
+        return int(np.flatnonzero(self.puzzle == 0)[0])
+
+    def _moves_from_table(self, moves: tuple) -> List[dict]:
+        positions = move_table(self.shape).positions
+        start = positions[self.blank_index()]
+        return [
+            {'start': start, 'end': positions[end], 'board': self.swap(start, positions[end]), 'simple_cost': cost}
+            for end, cost in moves
+        ]
+
+    def possible_moves(self) -> tuple:
+        '''
+        Returns every move (end index, cost) the blank tile can perform from its
+        current position, without building any board.
+        '''
+        return move_table(self.shape).all[self.blank_index()]
+
     def generate_regular_moves(self) -> List[dict]:
         '''
         Generates all the possible regular move (i.e. cost of one from the
         current state of the board.
         '''
-
-        rowof0 = np.where(self.puzzle == 0)[0][0]
-        colof0 = np.where(self.puzzle == 0)[1][0]
-
-        possible_moves = {
-            'up': (rowof0-1, colof0),
-            'down': (rowof0 + 1, colof0),
-            'left': (rowof0, colof0-1),
-            'right': (rowof0, colof0+1)
-        }
-
-        regular_moves = []
-
-        for move in possible_moves:
-            try:
-                new_puzzle = np.copy(self.puzzle)
-                start = (rowof0, colof0)
-                end = possible_moves[move]
-
-                if end[0] < 0 or end[1] < 0:  # an index must be negative and we dont want that
-                    continue
-
-                new_puzzle[start], new_puzzle[end] = new_puzzle[end], new_puzzle[start]
-                regular_moves.append({'start': start, 'end': end, 'board': Board(new_puzzle), 'simple_cost': 1})
-
-            except IndexError:  # performing this move is not possible because the index goes out of bounds (it is not a possible child state) so skip it.
-                continue
-
-        return regular_moves
-
-    def _wrap_around(self, wrapping_direction: str) -> dict:
-
-        new_puzzle = np.copy(self.puzzle)
-        start = self.coordinates
-        rows = new_puzzle.shape[0] - 1
-        cols = new_puzzle.shape[1] - 1
-
-        end_position = {
-            'left': (start[0], cols),
-            'right': (start[0], 0),
-            'up': (rows, start[1]),
-            'down': (0, start[1]),
-        }
-
-        end = end_position[wrapping_direction]
-        new_puzzle[start], new_puzzle[end] = new_puzzle[end], new_puzzle[start]
-
-        return {'start': start, 'end': end, 'board': Board(new_puzzle), 'simple_cost': 2}
+        return self._moves_from_table(move_table(self.shape).regular[self.blank_index()])
 
     def generate_wrapping_moves(self) -> List[dict]:
+        return self._moves_from_table(move_table(self.shape).wrapping[self.blank_index()])
 
-        if not self.is_corner():
-            return []
-
-        moves = []
+    def generate_diagonal_moves(self) -> List[dict]:
+        return self._moves_from_table(move_table(self.shape).diagonal[self.blank_index()])
 
-        rows = self.puzzle.shape[0]
+    def generate_all_moves(self) -> List[dict]:
+        return self._moves_from_table(self.possible_moves())
 
-        can_be_performed = {
-            'left': self.top_left_corner or self.bottom_left_corner,
-            'right': self.top_right_corner or self.bottom_right_corner,
-            'up': (self.top_left_corner or self.top_right_corner) and 2 < rows,
-            'down': (self.bottom_left_corner or self.bottom_right_corner) and 2 < rows,
-        }
 
-        for move in can_be_performed:
-            if can_be_performed[move]:
-                moves.append(self._wrap_around(move))
+    def line_representation(self)->str:
+        '''return a single line with all board values counted in row-major order'''
 
-        return moves
+        tiles = [str(i) for i in self.puzzle.flatten()]
+        return ' '.join(tiles)
 
-    def _move_diagonal(self, wrapping_direction: str) -> dict:
 
-        new_puzzle0 = np.copy(self.puzzle)
-        new_puzzle1 = np.copy(self.puzzle)
-        start = self.coordinates
-        rows = new_puzzle1.shape[0] - 1
-        cols = new_puzzle1.shape[1] - 1
+class PackedBoard(Board):
+    '''
+    A Board whose configuration is stored as one packed integer instead of a
+    numpy array. The tile at row-major index i occupies the bits
+    [i*bits, (i+1)*bits) of the state. 4 bits per tile are used up to 4x4
+    boards, wider tiles beyond that. Swapping two tiles is a couple of bit
+    operations and the state itself is the hash key of the board.
 
-        direction_to_endposition_mapping = {
-            'bottom-right': [(1, 1), (rows, cols)],
-            'bottom-left': [(1, cols-1), (rows, 0)],
-            'top-left': [(0, 0), (rows-1, cols-1)],
-            'top-right': [(rows-1, 1), (0, cols)],
-        }
+    The puzzle attribute is still available (as a read-only numpy array) for
+    printing and for the heuristics.
+    '''
 
-        end = direction_to_endposition_mapping[wrapping_direction]
+    _goal_cache = {}  # (shape, bits) -> packed goal states, shared by all boards of that shape
 
-        new_puzzle0[start], new_puzzle0[end[0]] = new_puzzle0[end[0]], new_puzzle0[start]
-        new_puzzle1[start], new_puzzle1[end[1]] = new_puzzle1[end[1]], new_puzzle1[start]
+    def __init__(self, puzzle: np.array = None):
+        self.puzzle = puzzle
 
+    @classmethod
+    def from_state(cls, state: int, shape: tuple, bits: int = None, blank: int = None) -> PackedBoard:
+        '''Builds a board directly from a packed state without going through numpy.'''
+        board = cls.__new__(cls)
+        board._shape = tuple(shape)
+        board.size = board.shape[0] * board.shape[1]
+        board.bits = bits if bits is not None else cls.bits_for(board.shape)
+        board.mask = (1 << board.bits) - 1
+        board.state = state
+        board._puzzle = None
+        board.blank = blank if blank is not None else board._find_blank()
+        return board
+
+    @staticmethod
+    def bits_for(shape: tuple, max_tile: int = 0) -> int:
+        '''Number of bits used per tile: 4 up to 4x4 boards, wider beyond that.'''
+        size = shape[0] * shape[1]
+        return max(4, (size - 1).bit_length(), int(max_tile).bit_length())
+
+    @property
+    def puzzle(self) -> np.array:
+        if self._puzzle is None:
+            tiles = [(self.state >> (i * self.bits)) & self.mask for i in range(self.size)]
+            self._puzzle = np.array(tiles).reshape(self.shape)
+            self._puzzle.flags.writeable = False
+        return self._puzzle
+
+    @puzzle.setter
+    def puzzle(self, puzzle: np.array):
+        if puzzle is None:
+            raise ValueError('A PackedBoard needs a puzzle to pack')
+        if puzzle.min() < 0:
+            raise ValueError('A PackedBoard can only hold non-negative tiles')
+
+        self._shape = tuple(puzzle.shape)
+        self.size = puzzle.size
+        self.bits = self.bits_for(self.shape, puzzle.max())
+        self.mask = (1 << self.bits) - 1
+
+        state = 0
+        for i, tile in enumerate(puzzle.flatten()):
+            state |= int(tile) << (i * self.bits)
+
+        self.state = state
+        self._puzzle = None
+        self.blank = self._find_blank()
+
+    @property
+    def shape(self) -> tuple:
+        return self._shape
+
+    def _find_blank(self) -> int:
+        for i in range(self.size):
+            if (self.state >> (i * self.bits)) & self.mask == 0:
+                return i
+        return -1
+
+    def __hash__(self) -> int:
+        return hash(self.state)
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, PackedBoard):
+            return NotImplemented
+        return self.shape == other.shape and self.bits == other.bits and self.state == other.state
+
+    def key(self) -> int:
+        return self.state
+
+    def tile(self, index: int) -> int:
+        '''Returns the tile at row-major index.'''
+        return (self.state >> (index * self.bits)) & self.mask
+
+    def _flat_index(self, position: tuple) -> int:
+        row, col = position
+        if not (0 <= row < self.shape[0] and 0 <= col < self.shape[1]):
+            raise IndexError(f'{position} is out of bounds for a board of shape {self.shape}')
+        return int(row * self.shape[1] + col)
+
+    def blank_index(self) -> int:
+        return self.blank
+
+    def _moves_from_table(self, moves: tuple) -> List[dict]:
+        positions = move_table(self._shape).positions
+        start = positions[self.blank]
         return [
-            {'start': start, 'end': end[0], 'board': Board(new_puzzle0), 'simple_cost': 3},
-            {'start': start, 'end': end[1], 'board': Board(new_puzzle1), 'simple_cost': 3}
+            {'start': start, 'end': positions[end], 'board': self.swap_indices(self.blank, end), 'simple_cost': cost}
+            for end, cost in moves
         ]
 
-    def generate_diagonal_moves(self) -> List[dict]:
-
-        if not self.is_corner():
-            return []
+    def swapped_key(self, start: tuple, end: tuple) -> int:
+        i = self._flat_index(start)
+        j = self._flat_index(end)
+        diff = self.tile(i) ^ self.tile(j)
+        return self.state ^ (diff << (i * self.bits)) ^ (diff << (j * self.bits))
+
+    def swap(self, start: tuple, end: tuple) -> PackedBoard:
+        return self.swap_indices(self._flat_index(start), self._flat_index(end))
+
+    def swap_indices(self, i: int, j: int) -> PackedBoard:
+        '''Same as swap but with row-major indices.'''
+        a = self.tile(i)
+        b = self.tile(j)
+        diff = a ^ b
+        state = self.state ^ (diff << (i * self.bits)) ^ (diff << (j * self.bits))
+
+        if a == 0:
+            blank = j
+        elif b == 0:
+            blank = i
+        else:
+            blank = self.blank
+
+        return PackedBoard.from_state(state, self.shape, self.bits, blank)
+
+    def pack(self) -> PackedBoard:
+        return self
+
+    def is_permutation(self) -> bool:
+        return sorted(self.tile(i) for i in range(self.size)) == list(range(self.size))
+
+    def rank(self) -> int:
+        return packed_permutation_rank(self.state, self.size, self.bits)
+
+    def goal_keys(self) -> tuple:
+        '''Returns the two goal states packed the same way as this board.'''
+        cache_key = (self.shape, self.bits)
+        if cache_key not in PackedBoard._goal_cache:
+            packed_goals = []
+            for goal in self.generate_goal_states():
+                state = 0
+                for i, tile in enumerate(goal):
+                    state |= int(tile) << (i * self.bits)
+                packed_goals.append(state)
+            PackedBoard._goal_cache[cache_key] = tuple(packed_goals)
+
+        return PackedBoard._goal_cache[cache_key]
 
-        moves = []
-
-        can_be_performed = {
-            'bottom-right': self.top_left_corner,
-            'bottom-left': self.top_right_corner,
-            'top-right': self.bottom_left_corner,
-            'top-left': self.bottom_right_corner,
-        }
-
-        for direction in can_be_performed:
-            if can_be_performed[direction]:
-                move1, move2 = self._move_diagonal(direction)
-                moves.append(move1)
-                moves.append(move2)
-
-        return moves
-
-    def generate_all_moves(self) -> List[dict]:
-        all_moves = self.generate_regular_moves() + self.generate_wrapping_moves() + self.generate_diagonal_moves()
-        return all_moves
-
-
-    def line_representation(self)->str:
-        '''return a single line with all board values counted in row-major order'''
-
-        tiles = [str(i) for i in self.puzzle.flatten()]
-        return ' '.join(tiles)
+    def is_goal_state(self) -> bool:
+        return self.state in self.goal_keys()
+
+    def line_representation(self) -> str:
+        return ' '.join(str(self.tile(i)) for i in range(self.size))
+
+
+def permutation_rank(tiles: Sequence[int]) -> int:
+    '''
+    Returns the lexicographic rank (Lehmer code) of a permutation of
+    0..len(tiles)-1, e.g. the row-major tiles of a board. Every configuration
+    of a shape gets a distinct rank in [0, (rows*cols)!).
+    '''
+    size = len(tiles)
+    rank = 0
+    seen = 0    # bit t is set once tile t was met, so the smaller tiles still to come are the unset bits below it
+    for i, tile in enumerate(tiles):
+        rank = rank * (size - i) + tile - bin(seen & ((1 << tile) - 1)).count('1')
+        seen |= 1 << tile
+    return rank
+
+
+def packed_permutation_rank(state: int, size: int, bits: int) -> int:
+    '''permutation_rank of the tiles of a state packed as in PackedBoard, without unpacking it first.'''
+    mask = (1 << bits) - 1
+    rank = 0
+    seen = 0
+    for i in range(size):
+        tile = state & mask
+        state >>= bits
+        rank = rank * (size - i) + tile - bin(seen & ((1 << tile) - 1)).count('1')
+        seen |= 1 << tile
+    return rank
+
+
+def permutation_unrank(rank: int, size: int) -> List[int]:
+    '''Inverse of permutation_rank: returns the permutation of 0..size-1 with that rank.'''
+    lehmer = []
+    for radix in range(1, size + 1):
+        rank, digit = divmod(rank, radix)
+        lehmer.append(digit)
+    lehmer.reverse()
+
+    remaining = list(range(size))
+    return [remaining.pop(digit) for digit in lehmer]
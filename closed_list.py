@@ -0,0 +1,171 @@
+'''
+Closed lists used by the searches: a dict (or a set for greedy best first)
+keyed by board keys, or for small shapes, whose (rows*cols)! configurations
+can all be given a slot, a DenseClosedList that keeps the g of every
+configuration in a preallocated array indexed by permutation rank, which
+takes 2 bytes per configuration of the shape rather than a dict entry per
+closed configuration. The searches pick the dense one whenever it fits.
+
+Ranking a configuration tile by tile costs dozens of times more than hashing
+it, so DenseClosedList ranks through a RankTable: two lookups, in tables of a
+few thousand entries, per configuration.
+'''
+from __future__ import annotations
+from array import array
+from board import Board, PackedBoard
+from itertools import permutations
+import math
+
+DENSE_MAX_STATES = math.factorial(9)    # 2x4 and 3x3 boards: 725 KiB of costs at most
+
+ABSENT = 0xFFFF
+MAX_COST = ABSENT - 1
+
+
+class RankTable:
+    '''
+    Gives the permutation_rank of the configurations of one size from two
+    lookups. With the Lehmer digits counting the smaller tiles to the right of
+    each position, the digits of the first size // 2 positions only depend on
+    the tiles there (a digit is the tile minus the smaller tiles before it) and
+    the digits of the other positions only on the tiles after them. The rank
+    is thus the sum of a term of the first half of the tiles and a term of the
+    second half, both precomputed for every sequence of distinct tiles (3024
+    and 15120 of them for 3x3 boards).
+
+    Keys are packed states (with bits per tile) or tuples of tiles when bits
+    is None, like the keys of PackedBoard and Board.
+    '''
+
+    _tables = {}    # (size, bits) -> RankTable, shared by all the searches of a shape
+
+    def __init__(self, size: int, bits: int = None):
+        self.size = size
+        self.bits = bits
+        self.split = size // 2
+        self.shift = self.split * bits if bits is not None else None
+        self.low_mask = (1 << self.shift) - 1 if bits is not None else None
+
+        weights = [math.factorial(size - 1 - i) for i in range(size)]
+        self.prefix = {}
+        for tiles in permutations(range(size), self.split):
+            rank = sum(weights[i] * (tile - sum(1 for other in tiles[:i] if other < tile)) for i, tile in enumerate(tiles))
+            self.prefix[self._key(tiles)] = rank
+        self.suffix = {}
+        for tiles in permutations(range(size), size - self.split):
+            rank = sum(weights[self.split + i] * sum(1 for other in tiles[i + 1:] if other < tile) for i, tile in enumerate(tiles))
+            self.suffix[self._key(tiles)] = rank
+
+    @classmethod
+    def of(cls, size: int, bits: int = None) -> RankTable:
+        if (size, bits) not in cls._tables:
+            cls._tables[(size, bits)] = cls(size, bits)
+        return cls._tables[(size, bits)]
+
+    def _key(self, tiles: tuple):
+        if self.bits is None:
+            return tiles
+        state = 0
+        for i, tile in enumerate(tiles):
+            state |= tile << (i * self.bits)
+        return state
+
+    def rank(self, key) -> int:
+        if self.bits is None:
+            return self.prefix[key[:self.split]] + self.suffix[key[self.split:]]
+        return self.prefix[key & self.low_mask] + self.suffix[key >> self.shift]
+
+
+class DenseClosedList:
+    '''
+    Closed list of the configurations of one shape, with the interface the
+    searches use of a dict from key to g (in, [], []=) and of a set (add).
+    Keys are the ones of the searched boards: packed states for PackedBoard,
+    or tuples of tiles for Board when packed is False.
+    '''
+
+    def __init__(self, shape: tuple, bits: int = None, packed: bool = True):
+        self.shape = tuple(shape)
+        self.size = self.shape[0] * self.shape[1]
+        self.bits = bits if bits is not None else PackedBoard.bits_for(self.shape)
+        self.packed = packed
+        self.costs = array('H', [ABSENT]) * math.factorial(self.size)
+        self.count = 0
+
+        table = RankTable.of(self.size, self.bits if packed else None)     # its lookups are inlined here and in search._arena_search
+        self.prefix, self.suffix = table.prefix, table.suffix
+        self.split, self.shift, self.low_mask = table.split, table.shift, table.low_mask
+        self._last_key = None       # searches look a key up and then read or set it, so its rank is kept
+        self._last_rank = None
+
+    def rank(self, key) -> int:
+        if key == self._last_key:
+            return self._last_rank
+        if self.packed:
+            rank = self.prefix[key & self.low_mask] + self.suffix[key >> self.shift]
+        else:
+            rank = self.prefix[key[:self.split]] + self.suffix[key[self.split:]]
+        self._last_key, self._last_rank = key, rank
+        return rank
+
+    def __contains__(self, key) -> bool:
+        return self.costs[self.rank(key)] != ABSENT
+
+    def get(self, key, default=None):
+        '''dict.get: the searches that follow path costs look up and read a key in one call.'''
+        if self.packed:
+            cost = self.costs[self.prefix[key & self.low_mask] + self.suffix[key >> self.shift]]
+        else:
+            cost = self.costs[self.prefix[key[:self.split]] + self.suffix[key[self.split:]]]
+        return default if cost == ABSENT else cost
+
+    def __getitem__(self, key) -> int:
+        cost = self.costs[self.rank(key)]
+        if cost == ABSENT:
+            raise KeyError(key)
+        return cost
+
+    def __setitem__(self, key, cost: int):
+        if not 0 <= cost <= MAX_COST:
+            raise ValueError(f'{cost} cannot be stored in a dense closed list (0 to {MAX_COST})')
+        rank = self.rank(key)
+        if self.costs[rank] == ABSENT:
+            self.count += 1
+        self.costs[rank] = cost
+
+    def add(self, key):
+        '''Set-like insertion, for searches that only need to know whether a configuration was closed.'''
+        if key not in self:
+            self[key] = 0
+
+    def __len__(self) -> int:
+        return self.count
+
+    def nbytes(self) -> int:
+        return self.costs.itemsize * len(self.costs)
+
+
+def dense_closed_list_fits(board: Board) -> bool:
+    '''True if the configurations of board's shape are few enough, and board a permutation that can be ranked.'''
+    rows, cols = board.shape
+    return math.factorial(rows * cols) <= DENSE_MAX_STATES and board.is_permutation()
+
+
+def make_closed_list(board: Board, closed: str = 'auto', as_set: bool = False):
+    '''
+    Returns the closed list of a search starting at board. closed is 'hash'
+    for a dict (a set with as_set), 'dense' for a DenseClosedList or 'auto'
+    for a DenseClosedList whenever dense_closed_list_fits(board).
+    '''
+    if closed not in ('auto', 'dense', 'hash'):
+        raise ValueError(f'unknown closed list "{closed}", expected auto, dense or hash')
+
+    if closed == 'dense' and not dense_closed_list_fits(board):
+        raise ValueError(f'a dense closed list needs a permutation of at most {DENSE_MAX_STATES} configurations')
+
+    if closed == 'dense' or (closed == 'auto' and dense_closed_list_fits(board)):
+        if isinstance(board, PackedBoard):
+            return DenseClosedList(board.shape, board.bits)
+        return DenseClosedList(board.shape, packed=False)
+
+    return set() if as_set else {}
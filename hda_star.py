@@ -0,0 +1,316 @@
+'''
+Hash-distributed A* (Kishimoto, Fukunaga & Botea, 2009): an A* spread over
+worker processes. Every configuration is owned by one worker, chosen by
+hashing its packed state, which keeps the open and closed lists of the
+configurations it owns. Expanding a configuration sends each child to the
+worker that owns it, over that worker's message queue (in batches, since a
+message costs more than an expansion).
+
+The workers report the goals they expand to the coordinator (the calling
+process), which sends every improvement of the best cost back to them: nodes
+whose f isn't lower than that cost are pruned. The search is over when every
+worker has nothing left below that cost to expand and no batch is still in
+flight. The coordinator detects it with waves of probes: every worker answers
+with whether it is idle and how many batches it has sent and received, and
+the search is over after two consecutive waves where all workers were idle
+and the counts, equal to each other, didn't change (Mattern's four-counter
+method). The best cost is then optimal when H is admissible, as with a_star.
+
+Expansions happen in parallel, in an order that depends on the timing of the
+messages, so visited and created nodes change from one run to the next but
+the cost doesn't.
+'''
+from board import Board, PackedBoard
+from limits import SearchLimits
+from moves import move_table
+from node import Node
+import heapq
+import math
+import multiprocessing
+import os
+import queue
+import solvability
+import time
+
+BATCH_SIZE = 64         # children buffered per destination before they are sent
+POLL_EVERY = 16         # expansions between two looks at the inbox while busy
+WAVE_PERIOD = 0.002     # seconds between two termination probes
+
+MASK_64 = (1 << 64) - 1
+
+
+def owner(state: int, workers: int) -> int:
+    '''
+    The worker that owns a packed state. Neighbouring states only differ by
+    one tile moved, so the state is mixed (the splitmix64 finalizer) before
+    taking the remainder, for the children of a node to be spread evenly.
+    '''
+    x = hash(state) & MASK_64       # hash() of an int is the same in every process
+    x = ((x ^ (x >> 30)) * 0xBF58476D1CE4E5B9) & MASK_64
+    x = ((x ^ (x >> 27)) * 0x94D049BB133111EB) & MASK_64
+    return (x ^ (x >> 31)) % workers
+
+
+def _worker(index: int, workers: int, inboxes: list, results, shape: tuple, bits: int, H):
+    '''
+    Runs one worker until the coordinator stops it. Messages to a worker are
+    ('nodes', [(state, g, h, blank, parent, cost)]), ('bound', cost),
+    ('probe', wave), ('parent', state) and ('stop',); it sends ('goal', cost,
+    state), ('status', index, wave, idle, sent, received, stored), ('parent',
+    state, parent, cost) and ('stats', index, visited, created) to results.
+    '''
+    table = move_table(shape)
+    mask = (1 << bits) - 1
+    goals = PackedBoard.from_state(0, shape, bits, 0).goal_keys()
+    incremental = getattr(H, 'incremental', None)
+    inbox = inboxes[index]
+
+    g_values = {}       # state -> lowest g received
+    parents = {}        # state -> (parent state, move cost) of that g
+    open_list = []      # (f, g, state, blank, h)
+    bound = math.inf
+    outgoing = [[] for _ in range(workers)]
+    sent = received = visited = created = 0
+
+    def receive(nodes: list):
+        for state, g, h, blank, parent, cost in nodes:
+            if g < g_values.get(state, math.inf):
+                g_values[state] = g
+                parents[state] = (parent, cost)
+                if g + h < bound:
+                    heapq.heappush(open_list, (g + h, g, state, blank, h))
+
+    def flush():
+        nonlocal sent
+        for destination, nodes in enumerate(outgoing):
+            if nodes:
+                inboxes[destination].put(('nodes', nodes))
+                outgoing[destination] = []
+                sent += 1
+
+    def handle(message) -> bool:
+        '''Handles a message, returns False once the worker must stop.'''
+        nonlocal bound, received
+        kind = message[0]
+        if kind == 'nodes':
+            received += 1
+            receive(message[1])
+        elif kind == 'bound':
+            bound = min(bound, message[1])
+        elif kind == 'probe':
+            flush()     # children kept back aren't counted as sent, the search would look over without them
+            idle = not open_list or open_list[0][0] >= bound
+            results.put(('status', index, message[1], idle, sent, received, len(g_values)))
+        elif kind == 'parent':
+            results.put(('parent', message[1]) + parents[message[1]])
+        elif kind == 'stop':
+            results.put(('stats', index, visited, created))
+            return False
+        return True
+
+    while True:
+        busy = open_list and open_list[0][0] < bound
+        if not busy:
+            flush()         # nothing is kept back while waiting
+        if not busy or visited % POLL_EVERY == 0:
+            try:
+                while True:
+                    if not handle(inbox.get(block=not busy)):
+                        return
+                    busy = open_list and open_list[0][0] < bound
+            except queue.Empty:
+                pass
+            if not busy:
+                continue
+
+        f, g, state, blank, h = heapq.heappop(open_list)
+        if g > g_values[state]:     # a cheaper copy was received since
+            continue
+
+        visited += 1
+        if state in goals:
+            if g < bound:
+                bound = g
+                results.put(('goal', g, state))
+            continue
+
+        parent = parents[state][0]
+        components = incremental.components(PackedBoard.from_state(state, shape, bits, blank)) if incremental is not None else None
+        for end, cost in table.all[blank]:
+            tile = (state >> (end * bits)) & mask
+            child = state ^ (tile << (end * bits)) ^ (tile << (blank * bits))   # the blank is 0 so xor moves the tile
+            if child == parent:
+                continue
+
+            child_g = g + cost
+            if H is None:
+                child_h = 0
+            elif incremental is not None:
+                child_h = incremental.combine(incremental.update(components, shape, tile, end, blank))
+            else:
+                child_h = H(Node(is_root=True, board=PackedBoard.from_state(child, shape, bits, end)))
+            if child_g + child_h >= bound:
+                continue
+
+            created += 1
+            destination = owner(child, workers)
+            if destination == index:
+                receive([(child, child_g, child_h, end, state, cost)])
+            else:
+                outgoing[destination].append((child, child_g, child_h, end, state, cost))
+                if len(outgoing[destination]) >= BATCH_SIZE:
+                    inboxes[destination].put(('nodes', outgoing[destination]))
+                    outgoing[destination] = []
+                    sent += 1
+
+
+def hda_star(board: Board, H=None, workers: int = None, timeout=60, deadline=None, cancel=None, max_nodes=None) -> dict:
+    '''
+    Solves board with an A* distributed over workers processes (by default
+    one per core, at least 2), see the module docstring. timeout, deadline,
+    cancel and max_nodes (over all the workers) work as for the other
+    searches, see limits.py. search_space is always empty.
+
+    The workers are child processes, which daemonic processes (those of a
+    multiprocessing.Pool, like the ones of run.py --jobs) cannot start: it
+    raises RuntimeError there.
+    '''
+    if multiprocessing.current_process().daemon:
+        raise RuntimeError('hda_star starts worker processes and cannot run in a daemonic process (a multiprocessing.Pool worker, run.py --jobs)')
+
+    limits = SearchLimits(timeout, deadline, cancel, max_nodes)
+    rejected = solvability.rejection(board)
+    if rejected:
+        return {'algo': 'HDA*', 'current_node': Node(is_root=True, board=board), 'runtime': 0, 'visited_nodes': 0, 'created_nodes': 1,
+                'search_space': [], 'success': False, 'message': rejected}
+
+    start_time = limits.start
+    workers = workers or max(2, os.cpu_count() or 1)
+    packed = board.pack()
+    shape, bits = packed.shape, packed.bits
+
+    context = multiprocessing.get_context()
+    inboxes = [context.Queue() for _ in range(workers)]
+    results = context.Queue()
+    processes = [context.Process(target=_worker, args=(i, workers, inboxes, results, shape, bits, H), daemon=True) for i in range(workers)]
+    for process in processes:
+        process.start()
+
+    root_h = Node(is_root=True, board=packed, heuristic_func=H).h_n if H is not None else 0
+    inboxes[owner(packed.state, workers)].put(('nodes', [(packed.state, 0, root_h, packed.blank, None, 0)]))
+    sent_by_coordinator = 1
+
+    best_cost, best_state = math.inf, None
+    message = None
+    wave = 0
+    previous = None     # (sent, received) of the last wave where every worker was idle and the counts matched
+
+    def handle_goal(report):
+        nonlocal best_cost, best_state
+        _, cost, state = report
+        if cost < best_cost:
+            best_cost, best_state = cost, state
+            for inbox in inboxes:
+                inbox.put(('bound', cost))
+
+    try:
+        while message is None:
+            wave += 1
+            for inbox in inboxes:
+                inbox.put(('probe', wave))
+
+            statuses = {}
+            while len(statuses) < workers:
+                report = _receive(results, processes)
+                if report[0] == 'goal':
+                    handle_goal(report)
+                elif report[0] == 'status' and report[2] == wave:
+                    statuses[report[1]] = report[3:]
+
+            idle = all(status[0] for status in statuses.values())
+            sent = sent_by_coordinator + sum(status[1] for status in statuses.values())
+            received = sum(status[2] for status in statuses.values())
+            stored = sum(status[3] for status in statuses.values())
+
+            if idle and sent == received:
+                if previous == (sent, received):
+                    message = 'solution found' if best_state is not None else 'no more nodes in open list'
+                    break
+                previous = (sent, received)
+            else:
+                previous = None
+
+            stop = limits.check(wave, stored)
+            if stop:
+                message = stop
+                break
+            time.sleep(WAVE_PERIOD)
+
+        success = message == 'solution found'
+        node = _solution_path(packed, best_state, inboxes, results, processes, H, handle_goal) if success else Node(is_root=True, board=board)
+
+    finally:
+        for inbox in inboxes:
+            inbox.put(('stop',))
+
+        visited_nodes = created_nodes = 0
+        stopped = 0
+        while stopped < workers:
+            try:
+                report = results.get(timeout=5)
+            except queue.Empty:
+                break
+            if report[0] == 'stats':
+                stopped += 1
+                visited_nodes += report[2]
+                created_nodes += report[3]
+        for process in processes:
+            process.join(timeout=1)
+            if process.is_alive():
+                process.terminate()
+
+    return {
+        'algo': 'HDA*',
+        'current_node': node,
+        'runtime': round(time.time() - start_time, 2),
+        'visited_nodes': visited_nodes,
+        'created_nodes': created_nodes + 1,
+        'search_space': [],
+        'success': success,
+        'message': message,
+        'workers': workers,
+    }
+
+
+def _receive(results, processes: list):
+    '''Next message of the workers, raises RuntimeError if one of them died instead of waiting forever.'''
+    while True:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            if not all(process.is_alive() for process in processes):
+                raise RuntimeError('an HDA* worker stopped unexpectedly')
+
+
+def _solution_path(root: PackedBoard, goal: int, inboxes: list, results, processes: list, H, handle_goal) -> Node:
+    '''Rebuilds the path from root to goal by asking the owners of its configurations for their parents.'''
+    states = [goal]
+    costs = []
+    while states[-1] != root.state:
+        inboxes[owner(states[-1], len(processes))].put(('parent', states[-1]))
+        while True:
+            report = _receive(results, processes)
+            if report[0] == 'parent' and report[1] == states[-1]:
+                break
+            if report[0] == 'goal':
+                handle_goal(report)
+        states.append(report[2])
+        costs.append(report[3])
+
+    table = move_table(root.shape)
+    node = Node(is_root=True, board=root, heuristic_func=H)
+    for state, cost in zip(reversed(states[:-1]), reversed(costs)):
+        start = node.board.blank
+        end = PackedBoard.from_state(state, root.shape, root.bits).blank
+        node = node.make_child(table.positions[start], table.positions[end], cost, heuristic_func=H)
+    return node
@@ -1,81 +1,110 @@
 from node import Node
+from functools import lru_cache
+from typing import Callable, Tuple
 import numpy as np
 import math
+import pattern_db
 
 
-def hamming_distance(n: Node) -> int:
+class ShapeTables:
     '''
-    This heuristic will return the number of tiles out of place.
+    Everything the heuristics need to know about a board shape, computed once
+    per shape: both goal states, the goal row, column and index of every tile
+    value in each goal, and the distance tables indexed by
+    [goal, tile value, board index]. All arrays have a leading axis of size 2,
+    one entry per goal state, so a heuristic is a single vectorized expression
+    followed by a min over that axis.
     '''
 
-    goal_states = n.board.generate_goal_states()
-    tiles_out_of_place = []
-    for state in goal_states:
-        config = n.board.puzzle.flatten()
-        x = np.where(config != state)[0]
-        num_tiles = len(x)
-        tiles_out_of_place.append(num_tiles)
+    def __init__(self, shape: tuple):
+        rows, cols = shape
+        size = rows * cols
+        self.shape = shape
+        self.size = size
 
-    return int(min(tiles_out_of_place))
+        goal_state1 = np.concatenate((np.arange(1, size), np.array([0])))
+        goal_state2 = goal_state1.reshape(cols, rows).T.flatten()
+        self.goal_states = np.stack((goal_state1, goal_state2))
 
+        self.positions = np.arange(size)
+        self.rows = self.positions // cols
+        self.cols = self.positions % cols
 
-def manhattan_distance(n: Node) -> int:
+        self.goal_indices = np.empty((2, size), dtype=np.int64)
+        for i, goal in enumerate(self.goal_states):
+            self.goal_indices[i, goal] = self.positions
+        self.goal_rows = self.goal_indices // cols
+        self.goal_cols = self.goal_indices % cols
 
-    goal_states = n.board.generate_goal_states()
-    puzzle = n.board.puzzle
-    man_dist = [0, 0]  # one for each goal state, always 2
+        row_offsets = self.goal_rows[:, :, np.newaxis] - self.rows[np.newaxis, np.newaxis, :]
+        col_offsets = self.goal_cols[:, :, np.newaxis] - self.cols[np.newaxis, np.newaxis, :]
 
-    for i in range(len(goal_states)):
-        goal = goal_states[i].reshape(n.board.puzzle.shape)
+        self.manhattan = np.abs(row_offsets) + np.abs(col_offsets)
+        self.manhattan[:, 0, :] = 0                             # the blank is not counted
+        self.squared_distances = row_offsets**2 + col_offsets**2
+        self.euclidean = np.sqrt(self.squared_distances)
+        self.euclidean[:, 0, :] = 0.0
+        self.inversions = np.abs(self.positions[np.newaxis, np.newaxis, :] - self.goal_indices[:, :, np.newaxis])
 
-        for y in range(puzzle.shape[0]):  # x y are grid coordinate
-            for x in range(puzzle.shape[1]):
+        # plain tuples for the incremental updates, where indexing numpy scalars would dominate
+        self.goal_index_tuples = tuple(tuple(where.tolist()) for where in self.goal_indices)
+        self.largest_squared_distance = (rows - 1)**2 + (cols - 1)**2
 
-                tile_value = puzzle[y, x]
-                if tile_value == 0:
-                    continue
-                goal_coordinate = np.where(goal == tile_value)
-                y_goal = goal_coordinate[0][0]
-                x_goal = goal_coordinate[1][0]
 
-                distance = math.fabs(y_goal-y) + math.fabs(x_goal-x)
-                man_dist[i] += int(distance)
+@lru_cache(maxsize=None)
+def shape_tables(shape: tuple) -> ShapeTables:
+    '''Returns the (cached) tables of a board shape.'''
+    return ShapeTables(tuple(int(x) for x in shape))
 
-    return min(man_dist)
 
+def _tiles(n: Node) -> Tuple[np.array, ShapeTables]:
+    return n.board.puzzle.flatten(), shape_tables(n.board.shape)
 
-def row_col_out_of_place(n: Node) -> int:
+
+class Incremental:
     '''
-    This heuristic computes the number of tiles out of row place and column place.
+    Describes how a heuristic can be computed from its parent's value. A
+    heuristic is the min (over both goal states) of per-goal components, so
+    nodes carry the components and a child only updates them for the single
+    tile that moved, instead of recomputing them over the whole board.
+
+    components(board) computes the components from scratch,
+    update(components, shape, tile, source, destination) returns the components
+    after tile moved from index source to index destination (the blank doing
+    the opposite) and combine(components) gives the value of the heuristic.
     '''
 
-    goal_states = n.board.generate_goal_states()
-    rows, cols = n.board.puzzle.shape
+    def __init__(self, components: Callable, update: Callable, combine: Callable):
+        self.components = components
+        self.update = update
+        self.combine = combine
 
-    total_out_of_place = [0, 0]  # always exactly 2
 
-    for i in range(len(goal_states)):
-        out_of_row_place = np.zeros(rows)
-        out_of_column_place = np.zeros(cols)
+def hamming_distance(n: Node) -> int:
+    '''
+    This heuristic will return the number of tiles out of place.
+    '''
 
-        puzzle = n.board.puzzle
-        state = goal_states[i].reshape(rows, cols)
+    tiles, tables = _tiles(n)
+    return int((tiles != tables.goal_states).sum(axis=1).min())
 
-        # out of place rows
-        for j in range(rows):
-            current_row = set(puzzle[j])
-            goal_row = set(state[j])
-            out_of_row_place[i] += sum([c not in goal_row for c in current_row])
 
-        # out of place columns
-        for k in range(cols):
-            current_col = set(puzzle[:, k])
-            goal_col = set(state[:, k])
-            out_of_column_place[k] += sum([c not in goal_col for c in current_col])
+def manhattan_distance(n: Node) -> int:
 
-        total_out_of_place[i] = sum(out_of_row_place) + sum(out_of_column_place)
+    tiles, tables = _tiles(n)
+    return int(tables.manhattan[:, tiles, tables.positions].sum(axis=1).min())
 
-    return int(min(total_out_of_place))
+
+def row_col_out_of_place(n: Node) -> int:
+    '''
+    This heuristic computes the number of tiles out of row place and column place.
+    '''
+
+    tiles, tables = _tiles(n)
+    out_of_row_place = (tables.goal_rows[:, tiles] != tables.rows).sum(axis=1)
+    out_of_column_place = (tables.goal_cols[:, tiles] != tables.cols).sum(axis=1)
+
+    return int((out_of_row_place + out_of_column_place).min())
 
 
 def euclidean_distance(n: Node) -> int:
@@ -83,41 +112,119 @@ def euclidean_distance(n: Node) -> int:
     This heuristic computes the Euclidean distance of the tiles.
     '''
 
-    goal_states = n.board.generate_goal_states()
-    rows, cols = n.board.puzzle.shape
+    tiles, tables = _tiles(n)
+    distances = tables.euclidean[:, tiles, tables.positions]
+
+    # cumsum adds the distances one after the other in row-major order, which
+    # gives exactly the same float as summing them in a loop (np.sum does not)
+    return int(np.cumsum(distances, axis=1)[:, -1].min())
+
+
+def permutation_inversion(n: Node) -> int:
+    '''
+    This heuristic computes the permutation inversion of the tiles.
+    '''
+
+    tiles, tables = _tiles(n)
+    return int(tables.inversions[:, tiles, tables.positions].sum(axis=1).min())
 
-    total_euclidean = [0, 0]  # always exactly 2
 
-    for i in range(len(goal_states)):
-        state = goal_states[i].reshape(rows, cols)
-        puzzle = n.board.puzzle
+def pattern_database_distance(n: Node) -> int:
+    '''
+    This heuristic sums the costs stored in the additive pattern databases of
+    the board's shape (see pattern_db.py). The tables are built and saved to
+    disk the first time a shape is used.
+    '''
+    return pattern_db.default_database(n.board.shape)(n)
 
-        for y in range(puzzle.shape[0]):
-            for x in range(puzzle.shape[1]):
-                tile_value = puzzle[y, x]
-                if tile_value == 0:
-                    continue
 
-                goal_coordinate = np.where(state == tile_value)
-                y_goal = goal_coordinate[0][0]
-                x_goal = goal_coordinate[1][0]
-                distance = math.sqrt((y_goal - y)**2 + (x_goal-x)**2)
-                total_euclidean[i] += distance
+def _manhattan_components(board) -> tuple:
+    tables = shape_tables(board.shape)
+    return tuple(tables.manhattan[:, board.puzzle.flatten(), tables.positions].sum(axis=1).tolist())
 
-    return int(min(total_euclidean))
 
+def _manhattan_update(components: tuple, shape: tuple, tile: int, source: int, destination: int) -> tuple:
+    cols = shape[1]
+    updated = []
+    for total, goal in zip(components, shape_tables(shape).goal_index_tuples):
+        row, col = divmod(goal[tile], cols)
+        before = abs(row - source // cols) + abs(col - source % cols)
+        after = abs(row - destination // cols) + abs(col - destination % cols)
+        updated.append(total + after - before)
+    return tuple(updated)
 
-def permutation_inversion(n: Node) -> int:
+
+def _hamming_components(board) -> tuple:
+    return tuple((board.puzzle.flatten() != shape_tables(board.shape).goal_states).sum(axis=1).tolist())
+
+
+def _hamming_update(components: tuple, shape: tuple, tile: int, source: int, destination: int) -> tuple:
+    updated = []
+    for total, where in zip(components, shape_tables(shape).goal_index_tuples):
+        # before the move tile is at source and the blank at destination, then the opposite
+        before = (where[tile] != source) + (where[0] != destination)
+        after = (where[tile] != destination) + (where[0] != source)
+        updated.append(total + after - before)
+    return tuple(updated)
+
+
+def _inversion_components(board) -> tuple:
+    tables = shape_tables(board.shape)
+    return tuple(tables.inversions[:, board.puzzle.flatten(), tables.positions].sum(axis=1).tolist())
+
+
+def _inversion_update(components: tuple, shape: tuple, tile: int, source: int, destination: int) -> tuple:
+    updated = []
+    for total, where in zip(components, shape_tables(shape).goal_index_tuples):
+        before = abs(source - where[tile]) + abs(destination - where[0])
+        after = abs(destination - where[tile]) + abs(source - where[0])
+        updated.append(total + after - before)
+    return tuple(updated)
+
+
+def _squared_distance(shape: tuple, index: int, goal_index: int) -> int:
+    cols = shape[1]
+    return (index // cols - goal_index // cols)**2 + (index % cols - goal_index % cols)**2
+
+
+def _euclidean_components(board) -> tuple:
     '''
-    This heuristic computes the permutation inversion of the tiles.
+    Euclidean distances are irrational, so instead of float sums (which would
+    drift when updated) the components count the tiles at every squared
+    distance from their goal position.
     '''
+    tables = shape_tables(board.shape)
+    tiles = board.puzzle.flatten()
+    squared = tables.squared_distances[:, tiles[tiles != 0], tables.positions[tiles != 0]]
+    return tuple(tuple(np.bincount(row, minlength=tables.largest_squared_distance + 1).tolist()) for row in squared)
+
+
+def _euclidean_update(components: tuple, shape: tuple, tile: int, source: int, destination: int) -> tuple:
+    updated = []
+    for counts, where in zip(components, shape_tables(shape).goal_index_tuples):
+        counts = list(counts)
+        counts[_squared_distance(shape, source, where[tile])] -= 1
+        counts[_squared_distance(shape, destination, where[tile])] += 1
+        updated.append(tuple(counts))
+    return tuple(updated)
+
+
+def _euclidean_combine(components: tuple) -> int:
+    return int(min(sum(count * math.sqrt(squared) for squared, count in enumerate(counts) if count) for counts in components))
+
 
-    goal_states = n.board.generate_goal_states()
+def _min_of_components(components: tuple) -> int:
+    return int(min(components))
 
-    total = [0, 0]  # always exactly 2
 
-    for i in range(len(goal_states)):
-        for j in range(len(n.board.puzzle.flatten())):
-            total[i] += abs(j - np.where(goal_states[i] == n.board.puzzle.flatten()[j])[0][0])
+manhattan_distance.incremental = Incremental(_manhattan_components, _manhattan_update, _min_of_components)
+hamming_distance.incremental = Incremental(_hamming_components, _hamming_update, _min_of_components)
+permutation_inversion.incremental = Incremental(_inversion_components, _inversion_update, _min_of_components)
+euclidean_distance.incremental = Incremental(_euclidean_components, _euclidean_update, _euclidean_combine)
 
-    return int(min(total))
+# Heuristics that never overestimate the cost to the goal, whose A* results are
+# therefore optimal (see solution_cache.py). The others don't qualify: hamming and
+# row/col count the blank, so one move can lower them by 2, and a wrapping or
+# diagonal move carries a tile further than its cost on manhattan, euclidean and
+# inversion.
+pattern_database_distance.admissible = True
@@ -0,0 +1,75 @@
+'''
+When a search has to stop before it is done. Every search entry point takes
+
+    timeout:    seconds from the start of the search (0 or less: none)
+    deadline:   an absolute time.time() by which the search must return
+    cancel:     a cancellation token, any object with an is_set() method: a
+                threading.Event to cancel from another thread, a
+                multiprocessing Event (or a Manager's) from another process
+    max_nodes:  the largest number of nodes the search may hold in its open
+                and closed lists (its memory), None for no limit
+
+and builds a SearchLimits from them. Looking at the clock and the token on
+every node would cost more than some searches spend per node, so the loops
+only call check() when their visited count reaches next_check. The interval
+adapts to the measured cost per node so that checks happen about every
+CHECK_PERIOD seconds whatever the heuristic, and shrinks as the node limit
+gets close so that it isn't overrun by more than one expansion.
+'''
+from typing import Optional
+import time
+
+CHECK_PERIOD = 0.005    # seconds between two checks, overrunning a deadline by about as much
+MAX_INTERVAL = 10000    # most nodes visited between two checks
+MAX_BRANCHING = 8       # most children of an expansion (regular, wrapping and diagonal moves)
+
+
+class SearchLimits:
+
+    def __init__(self, timeout: float = 60, deadline: float = None, cancel=None, max_nodes: int = None):
+        self.start = time.time()
+        self.timeout = timeout
+        self.cancel = cancel
+        self.max_nodes = max_nodes
+
+        self.deadline = deadline
+        self.deadline_is_timeout = False    # which of the two is reached first decides the message
+        if timeout > 0 and (deadline is None or self.start + timeout < deadline):
+            self.deadline = self.start + timeout
+            self.deadline_is_timeout = True
+
+        self.next_check = 1         # the first node is checked, a deadline may already be over
+        self._last_check = self.start
+        self._last_visited = 0
+
+    def check(self, visited_nodes: int, stored_nodes: int = 0) -> Optional[str]:
+        '''
+        Returns why the search must stop (its result message), None if it can
+        go on, and schedules the next check.
+        '''
+        now = time.time()
+
+        if self.cancel is not None and self.cancel.is_set():
+            return 'cancelled'
+        if self.deadline is not None and now > self.deadline:
+            if self.deadline_is_timeout:
+                return f"timeout after {self.timeout} seconds"
+            return 'deadline reached'
+        if self.max_nodes is not None and stored_nodes >= self.max_nodes:
+            return f'node limit of {self.max_nodes} reached'
+
+        interval = max(1, visited_nodes - self._last_visited)
+        spent = now - self._last_check
+        if spent > 0:
+            interval = int(interval * CHECK_PERIOD / spent)
+        else:
+            interval *= 2       # faster than the clock's resolution
+        interval = max(1, min(MAX_INTERVAL, interval))
+
+        if self.max_nodes is not None:
+            interval = min(interval, max(1, (self.max_nodes - stored_nodes) // MAX_BRANCHING))
+
+        self._last_check = now
+        self._last_visited = visited_nodes
+        self.next_check = visited_nodes + interval
+        return None
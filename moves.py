@@ -0,0 +1,100 @@
+'''
+Precomputed move tables. The moves that can be performed on a board (and their
+cost) only depend on the shape of the board and on the position of the blank
+tile, so they are computed once per shape and shared by every board.
+
+Positions are row-major indices into the board. Every move is a pair
+(end, cost) where end is the index the blank tile moves to.
+'''
+from functools import lru_cache
+from typing import List, Tuple
+
+REGULAR_COST = 1
+WRAPPING_COST = 2
+DIAGONAL_COST = 3
+
+
+class MoveTable:
+
+    def __init__(self, shape: tuple):
+        self.shape = tuple(int(x) for x in shape)
+        rows, cols = self.shape
+        self.size = rows * cols
+
+        # position index -> (row, col), so that boards do not have to divmod
+        self.positions: Tuple[tuple] = tuple((i // cols, i % cols) for i in range(self.size))
+
+        self.regular = tuple(self._regular_moves(blank) for blank in self.positions)
+        self.wrapping = tuple(self._wrapping_moves(blank) for blank in self.positions)
+        self.diagonal = tuple(self._diagonal_moves(blank) for blank in self.positions)
+        self.all = tuple(self.regular[i] + self.wrapping[i] + self.diagonal[i] for i in range(self.size))
+
+        # end index -> [(start index, cost)], i.e. the moves that lead the blank to end
+        reverse: List[list] = [[] for _ in range(self.size)]
+        for start in range(self.size):
+            for end, cost in self.all[start]:
+                reverse[end].append((start, cost))
+        self.reverse = tuple(tuple(moves) for moves in reverse)
+
+    def index(self, position: tuple) -> int:
+        return int(position[0]) * self.shape[1] + int(position[1])
+
+    def _in_bounds(self, position: tuple) -> bool:
+        return 0 <= position[0] < self.shape[0] and 0 <= position[1] < self.shape[1]
+
+    def _regular_moves(self, blank: tuple) -> tuple:
+        row, col = blank
+        ends = [
+            (row - 1, col),  # up
+            (row + 1, col),  # down
+            (row, col - 1),  # left
+            (row, col + 1),  # right
+        ]
+        return tuple((self.index(end), REGULAR_COST) for end in ends if self._in_bounds(end))
+
+    def _corners(self, blank: tuple) -> tuple:
+        row, col = blank
+        last_row = self.shape[0] - 1
+        last_col = self.shape[1] - 1
+        top_left = row == 0 and col == 0
+        top_right = row == 0 and col == last_col
+        bottom_right = row == last_row and col == last_col
+        bottom_left = row == last_row and col == 0
+        return top_left, top_right, bottom_right, bottom_left
+
+    def _wrapping_moves(self, blank: tuple) -> tuple:
+        top_left, top_right, bottom_right, bottom_left = self._corners(blank)
+        rows = self.shape[0] - 1
+        cols = self.shape[1] - 1
+
+        can_be_performed = [
+            (top_left or bottom_left, (blank[0], cols)),                            # left
+            (top_right or bottom_right, (blank[0], 0)),                             # right
+            ((top_left or top_right) and 2 < self.shape[0], (rows, blank[1])),      # up
+            ((bottom_left or bottom_right) and 2 < self.shape[0], (0, blank[1])),   # down
+        ]
+        return tuple((self.index(end), WRAPPING_COST) for possible, end in can_be_performed if possible)
+
+    def _diagonal_moves(self, blank: tuple) -> tuple:
+        top_left, top_right, bottom_right, bottom_left = self._corners(blank)
+        rows = self.shape[0] - 1
+        cols = self.shape[1] - 1
+
+        can_be_performed = [
+            (top_left, [(1, 1), (rows, cols)]),             # bottom-right
+            (top_right, [(1, cols-1), (rows, 0)]),          # bottom-left
+            (bottom_left, [(rows-1, 1), (0, cols)]),        # top-right
+            (bottom_right, [(0, 0), (rows-1, cols-1)]),     # top-left
+        ]
+
+        moves = []
+        for possible, ends in can_be_performed:
+            if possible:
+                moves += [(self.index(end), DIAGONAL_COST) for end in ends if self._in_bounds(end)]
+        return tuple(moves)
+
+
+@lru_cache(maxsize=None)
+def move_table(shape: tuple) -> MoveTable:
+    '''Returns the (cached) move table of a board shape.'''
+    return MoveTable(shape)
@@ -1,6 +1,7 @@
 from __future__ import annotations  # in order to allow type hints for a class referring to itself
-from typing import List, Tuple
+from typing import Iterator, List, Tuple
 from board import Board
+from moves import move_table
 import numpy as np
 
 
@@ -36,10 +37,35 @@ class Node:
         self.parent: Board = parent
 
         if heuristic_func:
-            self.h_n = heuristic_func(self)
+            self.h_n = self._evaluate_heuristic(heuristic_func)
             self.g_n = self.total_cost
             self.f_n = self.g_n + self.h_n
 
+    h_source = None       # heuristic the per-goal components below belong to
+    h_components = None
+
+    def _evaluate_heuristic(self, heuristic_func) -> int:
+        '''
+        Heuristics that have an incremental description (see heuristics.py) are
+        computed from the parent's per-goal components and the one tile that
+        moved, the others are called on the whole node.
+        '''
+        incremental = getattr(heuristic_func, 'incremental', None)
+        if incremental is None:
+            return heuristic_func(self)
+
+        if not self.is_root and self.parent.h_source is heuristic_func:
+            shape = self.board.shape
+            source = self.end[0] * shape[1] + self.end[1]               # the tile moved from where the blank is now
+            destination = self.start[0] * shape[1] + self.start[1]      # to where the blank was
+            tile = self.board.tile(destination)
+            self.h_components = incremental.update(self.parent.h_components, shape, tile, source, destination)
+        else:
+            self.h_components = incremental.components(self.board)
+
+        self.h_source = heuristic_func
+        return incremental.combine(self.h_components)
+
     def successors(self, heuristic_func=None) -> List[Node]:
         moves: List[dict] = self.board.generate_all_moves()
         successors: List[Node] = []
@@ -50,6 +76,35 @@ class Node:
 
         return successors
 
+    def successor_moves(self) -> Iterator[Tuple[tuple, tuple, int]]:
+        '''
+        Lazily yields the (start, end, simple_cost) of every move that can be
+        performed from this node, without building any board. The move undoing
+        the one that produced this node is never generated since it would only
+        lead back to the parent configuration.
+
+        A search can check self.child_key(start, end) against its
+        closed list and only then build the child with make_child.
+        '''
+        table = move_table(self.board.shape)
+        blank = self.board.blank_index()
+        start = table.positions[blank]
+
+        for end, cost in table.all[blank]:
+            end = table.positions[end]
+            if not self.is_root and end == self.start:
+                continue
+            yield start, end, cost
+
+    def child_key(self, start: tuple, end: tuple):
+        '''Returns the key of the child reached by moving the blank tile from start to end, without building it.'''
+        return self.board.swapped_key(start, end)
+
+    def make_child(self, start: tuple, end: tuple, simple_cost: int, heuristic_func=None) -> Node:
+        '''Builds the child node (of the same class) reached by moving the blank tile from start to end.'''
+        move = {'start': start, 'end': end, 'board': self.board.swap(start, end), 'simple_cost': simple_cost}
+        return type(self)(move=move, parent=self, heuristic_func=heuristic_func)
+
     def is_goal_state(self) -> bool:
         return self.board.is_goal_state()
 
@@ -58,7 +113,7 @@ class Node:
         This function returns the strings needed to create the solution.txt and
         search.txt files. The algo parameter takes one of ['ucs' , 'gbf', 'a*'].
         '''
-        solution = ''
+        lines = []  # from the end of the path to the root, reversed once at the end
 
         current_node = self
 
@@ -68,11 +123,11 @@ class Node:
 
             board_as_string = current_node.board.line_representation()
 
-            solution = f'{moved_tile_value} {current_node.simple_cost} {board_as_string}\n' + solution
+            lines.append(f'{moved_tile_value} {current_node.simple_cost} {board_as_string}\n')
 
             current_node = current_node.parent
 
         root_node = current_node.board.line_representation()
-        solution = f'0 0 {root_node}\n' + solution
+        lines.append(f'0 0 {root_node}\n')
 
-        return solution
+        return ''.join(reversed(lines))
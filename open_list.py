@@ -0,0 +1,175 @@
+'''
+Open lists (frontiers) used by the search algorithms. They all share the same
+small interface: put(priority, item), get() -> (priority, item), empty() and
+len(). Entries with equal priority come out in insertion order, or in reverse
+insertion order when lifo=True.
+'''
+from collections import deque
+from numbers import Integral
+from typing import Any, List, Tuple
+import heapq
+
+MAX_BUCKETS = 1 << 16  # priorities above this are handled by a heap instead
+
+
+class HeapQueue:
+    '''A binary heap, for priorities that are not small integers.'''
+
+    def __init__(self, lifo: bool = False):
+        self.lifo = lifo
+        self.heap = []
+        self.counter = 0
+
+    def put(self, priority, item: Any):
+        self.counter += 1
+        tie = -self.counter if self.lifo else self.counter
+        heapq.heappush(self.heap, (priority, tie, item))
+
+    def get(self) -> Tuple[Any, Any]:
+        priority, _, item = heapq.heappop(self.heap)
+        return priority, item
+
+    def empty(self) -> bool:
+        return not self.heap
+
+    def __len__(self) -> int:
+        return len(self.heap)
+
+
+class BucketQueue:
+    '''
+    Dial's bucket queue: one FIFO bucket per integer priority and a cursor on
+    the lowest bucket that may be non-empty, so both put and get are O(1)
+    (amortized for get). Move costs are 1, 2 or 3 and the heuristics return
+    small integers, so f, g and h all fit in a handful of buckets.
+
+    If a priority that is not a non-negative integer is ever put, the content
+    is moved into a HeapQueue (keeping the order of the entries) and every
+    following operation is delegated to it.
+    '''
+
+    def __init__(self, lifo: bool = False):
+        self.lifo = lifo
+        self.buckets: List[deque] = []
+        self.minimum = 0    # no bucket below this index holds an entry
+        self.size = 0
+        self.heap: HeapQueue = None
+
+    def put(self, priority, item: Any):
+        if self.heap is None and not is_bucket_priority(priority):
+            self._fall_back_to_heap()
+
+        if self.heap is not None:
+            self.heap.put(priority, item)
+            return
+
+        priority = int(priority)
+        while len(self.buckets) <= priority:
+            self.buckets.append(deque())
+
+        self.buckets[priority].append(item)
+        self.size += 1
+        if priority < self.minimum:
+            self.minimum = priority
+
+    def get(self) -> Tuple[int, Any]:
+        if self.heap is not None:
+            return self.heap.get()
+
+        if self.size == 0:
+            raise IndexError('get from an empty open list')
+
+        while not self.buckets[self.minimum]:
+            self.minimum += 1
+
+        bucket = self.buckets[self.minimum]
+        item = bucket.pop() if self.lifo else bucket.popleft()
+        self.size -= 1
+
+        return self.minimum, item
+
+    def empty(self) -> bool:
+        return len(self) == 0
+
+    def __len__(self) -> int:
+        return len(self.heap) if self.heap is not None else self.size
+
+    def _fall_back_to_heap(self):
+        self.heap = HeapQueue(lifo=self.lifo)
+        for priority in range(self.minimum, len(self.buckets)):
+            for item in self.buckets[priority]:  # pushed in insertion order, so ties keep coming out in the same order
+                self.heap.put(priority, item)
+
+        self.buckets = []
+        self.size = 0
+
+
+def is_bucket_priority(priority) -> bool:
+    return isinstance(priority, Integral) and not isinstance(priority, bool) and 0 <= priority < MAX_BUCKETS
+
+
+def make_open_list(frontier: str = 'bucket', tie_breaking: str = 'fifo'):
+    '''
+    Returns an empty open list. frontier is one of ['bucket', 'heap'] and
+    tie_breaking one of ['fifo', 'lifo'] (order of nodes with equal priority).
+    '''
+    if tie_breaking not in ('fifo', 'lifo'):
+        raise ValueError(f'unknown tie breaking "{tie_breaking}", expected "fifo" or "lifo"')
+
+    lifo = tie_breaking == 'lifo'
+
+    if frontier == 'bucket':
+        return BucketQueue(lifo=lifo)
+    if frontier == 'heap':
+        return HeapQueue(lifo=lifo)
+
+    raise ValueError(f'unknown frontier "{frontier}", expected "bucket" or "heap"')
+
+
+class IndexedOpenList:
+    '''
+    Wraps one of the open lists above with an index from configuration key to
+    the best copy of that configuration currently in the open list, so that
+    duplicates can be dropped when they are generated instead of when they are
+    popped.
+
+    A copy is only put if no copy with a lower or equal g is already open.
+    When a cheaper copy is put, the previous one stays in the underlying queue
+    but is invalidated: it is skipped when it is eventually popped (lazy
+    decrease-key).
+    '''
+
+    def __init__(self, queue):
+        self.queue = queue
+        self.best = {}      # key -> (g, item) of the valid copy of that configuration
+        self.stale = 0      # number of invalidated entries still in the queue
+
+    def dominated(self, key, g) -> bool:
+        '''True if a copy of key with a lower or equal g is already open.'''
+        return key in self.best and self.best[key][0] <= g
+
+    def put(self, priority, item: Any, key, g) -> bool:
+        '''Puts item unless it is dominated, returns whether it was put.'''
+        if self.dominated(key, g):
+            return False
+
+        if key in self.best:
+            self.stale += 1
+
+        self.best[key] = (g, item)
+        self.queue.put(priority, (key, item))
+        return True
+
+    def get(self) -> Tuple[Any, Any]:
+        while True:
+            priority, (key, item) = self.queue.get()
+            if key in self.best and self.best[key][1] is item:
+                del self.best[key]
+                return priority, item
+            self.stale -= 1
+
+    def empty(self) -> bool:
+        return not self.best
+
+    def __len__(self) -> int:
+        return len(self.best)
@@ -0,0 +1,180 @@
+'''
+Exact distance oracle for whole shapes. A backward uniform cost search from
+both goal states over every configuration of a shape (8! = 40,320 for 2x4,
+9! = 362,880 for 3x3) gives the optimal cost to the closest goal and the best
+next move of every configuration. Both are stored in a binary file, indexed by
+the permutation rank of the configuration, and memory-mapped when loaded.
+
+The oracle answers optimal solutions without searching and is also a perfect
+heuristic.
+'''
+from board import Board, PackedBoard, permutation_rank
+from moves import move_table
+from node import Node
+from open_list import BucketQueue
+import math
+import numpy as np
+import os
+import struct
+import tempfile
+import time
+
+DEFAULT_DIRECTORY = 'oracles'
+MAX_CELLS = 9       # 10! configurations would already need several minutes to build
+MAGIC = b'XORC'
+VERSION = 1
+UNREACHED = 255
+
+_HEADER = struct.Struct('<4sBBB')   # magic, version, rows, cols
+
+
+class DistanceOracle:
+    '''
+    costs[rank] is the optimal cost of the configuration with that rank and
+    next_blank[rank] the row-major index the blank tile moves to on an optimal
+    path (UNREACHED for goals and unreachable configurations).
+    '''
+
+    __name__ = 'distance_oracle'
+
+    def __init__(self, shape: tuple, costs: np.array, next_blank: np.array):
+        self.shape = tuple(shape)
+        self.size = self.shape[0] * self.shape[1]
+        self.costs = costs
+        self.next_blank = next_blank
+
+    @classmethod
+    def build(cls, shape: tuple) -> 'DistanceOracle':
+        shape = tuple(int(x) for x in shape)
+        size = shape[0] * shape[1]
+        if size > MAX_CELLS:
+            raise ValueError(f'a {shape[0]}x{shape[1]} board has too many configurations for an oracle')
+
+        table = move_table(shape)
+        goal_board = PackedBoard(np.arange(size).reshape(shape))
+        bits, mask = goal_board.bits, goal_board.mask
+
+        costs = {}
+        next_blank = {}
+        open_list = BucketQueue()
+        for goal in goal_board.goal_keys():
+            costs[goal] = 0
+            open_list.put(0, (goal, size - 1))  # the blank is in the last cell of both goals
+
+        while not open_list.empty():
+            cost, (state, blank) = open_list.get()
+            if costs[state] < cost:
+                continue
+
+            # the blank moving from start to blank leads to state, so state is the next configuration of the predecessor
+            for start, move_cost in table.reverse[blank]:
+                tile = (state >> (start * bits)) & mask
+                predecessor = state ^ (tile << (start * bits)) ^ (tile << (blank * bits))
+                predecessor_cost = cost + move_cost
+
+                if predecessor_cost < costs.get(predecessor, math.inf):
+                    costs[predecessor] = predecessor_cost
+                    next_blank[predecessor] = blank
+                    open_list.put(predecessor_cost, (predecessor, start))
+
+        cost_array = np.full(math.factorial(size), UNREACHED, dtype=np.uint8)
+        next_array = np.full(math.factorial(size), UNREACHED, dtype=np.uint8)
+        for state, cost in costs.items():
+            rank = permutation_rank([(state >> (i * bits)) & mask for i in range(size)])
+            cost_array[rank] = min(cost, UNREACHED - 1)
+            next_array[rank] = next_blank.get(state, UNREACHED)
+
+        return cls(shape, cost_array, next_array)
+
+    def save(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # renamed onto path once complete, like PatternDatabase.save: concurrent builders never load half an oracle
+        descriptor, temporary = tempfile.mkstemp(dir=directory or '.', prefix=os.path.basename(path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, mode='wb') as f:
+                f.write(_HEADER.pack(MAGIC, VERSION, self.shape[0], self.shape[1]))
+                f.write(np.ascontiguousarray(self.costs, dtype=np.uint8).tobytes())
+                f.write(np.ascontiguousarray(self.next_blank, dtype=np.uint8).tobytes())
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> 'DistanceOracle':
+        with open(path, mode='rb') as f:
+            magic, version, rows, cols = _HEADER.unpack(f.read(_HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f'{path} is not a distance oracle file')
+
+        count = math.factorial(rows * cols)
+        costs = np.memmap(path, dtype=np.uint8, mode='r', offset=_HEADER.size, shape=(count,))
+        next_blank = np.memmap(path, dtype=np.uint8, mode='r', offset=_HEADER.size + count, shape=(count,))
+        return cls((rows, cols), costs, next_blank)
+
+    def rank(self, board: Board) -> int:
+        tiles = board.puzzle.flatten().tolist()
+        if sorted(tiles) != list(range(self.size)):
+            raise ValueError(f'{tiles} is not a configuration of a {self.shape[0]}x{self.shape[1]} board')
+        return permutation_rank(tiles)
+
+    def cost(self, board: Board) -> int:
+        '''Optimal cost from board to the closest goal state (None if it cannot be reached).'''
+        cost = int(self.costs[self.rank(board)])
+        return None if cost == UNREACHED else cost
+
+    def __call__(self, n: Node) -> int:
+        return self.cost(n.board)
+
+    def solve(self, board: Board) -> dict:
+        '''Returns an optimal solution in the same format as the search algorithms.'''
+        start_time = time.time()
+        table = move_table(self.shape)
+
+        current_node = Node(is_root=True, board=board)
+        success = board.is_permutation() and self.cost(board) is not None
+        visited_nodes = 1
+
+        while success and not current_node.is_goal_state():
+            blank = current_node.board.blank_index()
+            end = int(self.next_blank[self.rank(current_node.board)])
+            cost = min(cost for move_end, cost in table.all[blank] if move_end == end)
+            current_node = current_node.make_child(table.positions[blank], table.positions[end], cost)
+            visited_nodes += 1
+
+        return {
+            'algo': 'ORACLE',
+            'current_node': current_node,
+            'runtime': round(time.time() - start_time, 2),
+            'visited_nodes': visited_nodes,
+            'created_nodes': visited_nodes,
+            'search_space': [],
+            'success': success,
+            'message': 'solution found' if success else 'the board cannot reach a goal state'
+        }
+
+
+_oracles = {}
+
+
+def default_path(shape: tuple) -> str:
+    return os.path.join(DEFAULT_DIRECTORY, f'{shape[0]}x{shape[1]}.oracle')
+
+
+def default_oracle(shape: tuple) -> DistanceOracle:
+    '''
+    Returns the oracle of a shape, loading it from DEFAULT_DIRECTORY or building
+    and saving it the first time.
+    '''
+    shape = tuple(int(x) for x in shape)
+    if shape not in _oracles:
+        path = default_path(shape)
+        if not os.path.isfile(path):
+            DistanceOracle.build(shape).save(path)
+        _oracles[shape] = DistanceOracle.load(path)
+
+    return _oracles[shape]
@@ -0,0 +1,197 @@
+'''
+Additive pattern databases. The tiles are split into disjoint patterns and, for
+every pattern and both goal states, a table gives the exact cost of bringing
+the tiles of the pattern to their goal position, counting only the moves of
+those tiles (moves of the other tiles are free). Since each move moves a single
+tile, the costs of the patterns can be added and the sum is still admissible.
+
+An abstract state is the position of every tile of a pattern plus the position
+of the blank, encoded in base rows*cols (the blank being the most significant
+digit). The tables only keep the pattern positions, minimized over the blank
+position, so a table holds (rows*cols)**len(pattern) bytes.
+
+Tables are saved to a single binary file and memory-mapped when loaded.
+'''
+from moves import move_table
+from node import Node
+from open_list import BucketQueue
+from typing import List, Tuple
+import numpy as np
+import os
+import struct
+import tempfile
+
+DEFAULT_DIRECTORY = 'pattern_databases'
+MAGIC = b'XPDB'
+VERSION = 1
+UNREACHED = 255
+
+_HEADER = struct.Struct('<4sBBBBB')     # magic, version, rows, cols, number of goals, number of patterns
+
+
+def default_patterns(shape: tuple, max_size: int = 4) -> List[tuple]:
+    '''Splits the tiles 1..rows*cols-1 in row-major order into patterns of at most max_size tiles.'''
+    tiles = list(range(1, shape[0] * shape[1]))
+    return [tuple(tiles[i:i + max_size]) for i in range(0, len(tiles), max_size)]
+
+
+def goal_positions(shape: tuple) -> List[np.array]:
+    '''For both goal states, an array giving the goal index of every tile value.'''
+    size = shape[0] * shape[1]
+    goal_state1 = np.concatenate((np.arange(1, size), np.array([0])))
+    goal_state2 = goal_state1.reshape(shape[1], shape[0]).T.flatten()
+
+    positions = []
+    for goal in (goal_state1, goal_state2):
+        where = np.empty(size, dtype=np.int64)
+        where[goal] = np.arange(size)
+        positions.append(where)
+    return positions
+
+
+def build_table(shape: tuple, pattern: tuple, goal_where: np.array) -> np.array:
+    '''
+    Runs a backward uniform cost search (over the reverse moves, since the
+    diagonal moves are not symmetric) from the goal placement of pattern and
+    returns the table of costs indexed by the code of the pattern positions.
+    '''
+    table = move_table(shape)
+    size = table.size
+    k = len(pattern)
+    powers = [size ** i for i in range(k + 1)]
+    blank_power = powers[k]
+
+    goal_code = sum(int(goal_where[tile]) * powers[i] for i, tile in enumerate(pattern))
+    goal_code += int(goal_where[0]) * blank_power
+
+    costs = bytearray([UNREACHED]) * (size ** (k + 1))
+    costs[goal_code] = 0
+    open_list = BucketQueue()
+    open_list.put(0, goal_code)
+
+    while not open_list.empty():
+        cost, code = open_list.get()
+        if costs[code] < cost:
+            continue
+
+        positions = [(code // powers[i]) % size for i in range(k)]
+        blank = code // blank_power
+
+        # a forward move of the blank from start to blank leads to code, so the
+        # tile now at start was at blank before the move
+        for start, move_cost in table.reverse[blank]:
+            if start in positions:
+                i = positions.index(start)
+                predecessor = code + (blank - start) * powers[i] + (start - blank) * blank_power
+                predecessor_cost = cost + move_cost
+            else:
+                predecessor = code + (start - blank) * blank_power
+                predecessor_cost = cost
+
+            if predecessor_cost < costs[predecessor]:
+                costs[predecessor] = min(predecessor_cost, UNREACHED - 1)
+                open_list.put(predecessor_cost, predecessor)
+
+    return np.frombuffer(bytes(costs), dtype=np.uint8).reshape(size, size ** k).min(axis=0)
+
+
+class PatternDatabase:
+    '''
+    A set of additive pattern database tables for one board shape. Instances are
+    callable with the usual heuristic signature H(node).
+    '''
+
+    __name__ = 'pattern_database'
+
+    def __init__(self, shape: tuple, patterns: List[tuple], tables: List[List[np.array]]):
+        self.shape = tuple(shape)
+        self.size = self.shape[0] * self.shape[1]
+        self.patterns = [tuple(pattern) for pattern in patterns]
+        self.tables = tables    # tables[goal][pattern]
+        self.tiles = [np.array(pattern, dtype=np.int64) for pattern in self.patterns]
+        self.powers = [self.size ** np.arange(len(pattern), dtype=np.int64) for pattern in self.patterns]
+
+    @classmethod
+    def build(cls, shape: tuple, patterns: List[tuple] = None) -> 'PatternDatabase':
+        shape = tuple(int(x) for x in shape)
+        patterns = patterns if patterns is not None else default_patterns(shape)
+        tables = [[build_table(shape, pattern, where) for pattern in patterns] for where in goal_positions(shape)]
+        return cls(shape, patterns, tables)
+
+    def save(self, path: str):
+        header = _HEADER.pack(MAGIC, VERSION, self.shape[0], self.shape[1], len(self.tables), len(self.patterns))
+        for pattern in self.patterns:
+            header += struct.pack(f'<B{len(pattern)}B', len(pattern), *pattern)
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # written next to path and renamed onto it, so that processes building the same
+        # database at once (run.py --jobs, service or HDA* workers) never load a partial file
+        descriptor, temporary = tempfile.mkstemp(dir=directory or '.', prefix=os.path.basename(path) + '.', suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, mode='wb') as f:
+                f.write(header)
+                for goal_tables in self.tables:
+                    for table in goal_tables:
+                        f.write(np.ascontiguousarray(table, dtype=np.uint8).tobytes())
+            os.chmod(temporary, 0o644)
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+
+    @classmethod
+    def load(cls, path: str) -> 'PatternDatabase':
+        with open(path, mode='rb') as f:
+            magic, version, rows, cols, goals, count = _HEADER.unpack(f.read(_HEADER.size))
+            if magic != MAGIC or version != VERSION:
+                raise ValueError(f'{path} is not a pattern database file')
+
+            patterns = []
+            for _ in range(count):
+                k = f.read(1)[0]
+                patterns.append(tuple(f.read(k)))
+            offset = f.tell()
+
+        size = rows * cols
+        tables = []
+        for _ in range(goals):
+            goal_tables = []
+            for pattern in patterns:
+                length = size ** len(pattern)
+                goal_tables.append(np.memmap(path, dtype=np.uint8, mode='r', offset=offset, shape=(length,)))
+                offset += length
+            tables.append(goal_tables)
+
+        return cls((rows, cols), patterns, tables)
+
+    def __call__(self, n: Node) -> int:
+        where = np.empty(self.size, dtype=np.int64)
+        where[n.board.puzzle.flatten()] = np.arange(self.size)
+
+        codes = [int(where[tiles] @ powers) for tiles, powers in zip(self.tiles, self.powers)]
+        return min(sum(int(table[code]) for table, code in zip(goal_tables, codes)) for goal_tables in self.tables)
+
+
+_databases = {}
+
+
+def default_path(shape: tuple) -> str:
+    return os.path.join(DEFAULT_DIRECTORY, f'{shape[0]}x{shape[1]}.pdb')
+
+
+def default_database(shape: tuple) -> PatternDatabase:
+    '''
+    Returns the pattern database of a shape with the default patterns, loading
+    it from DEFAULT_DIRECTORY or building and saving it the first time.
+    '''
+    shape = tuple(int(x) for x in shape)
+    if shape not in _databases:
+        path = default_path(shape)
+        if not os.path.isfile(path):
+            PatternDatabase.build(shape).save(path)
+        _databases[shape] = PatternDatabase.load(path)
+
+    return _databases[shape]
@@ -0,0 +1,206 @@
+'''
+Optional instrumentation of uniform_cost, greedy_best_first and a_star. With
+profile=True, a search wraps its open list, closed list, heuristic and nodes
+in the timed versions below, so its loop stays the same and nothing is timed
+when profiling is off. The result dict then has a 'profile' entry:
+
+    phases:         time (seconds) and calls of move_generation, board_copy,
+                    heuristic, open_push, open_pop, closed_lookup and goal_test
+    other:          the rest of the search time (the loop itself, tracing...)
+    peak_open:      largest number of configurations in the open list
+    peak_closed:    largest number of configurations in the closed list
+    re_expansions:  expansions of a configuration that was already closed,
+                    reached again with a lower cost
+
+Checking whether a child is dominated by a copy already in the open list
+counts as open_push, computing a child's key as move_generation. Building a
+child counts as board_copy, minus the time spent in its heuristic.
+
+With store='arena', goal tests, moves and children are inlined in the search
+loop, so only the heuristic and the open and closed lists are timed.
+'''
+from __future__ import annotations
+from heuristics import Incremental
+from node import Node
+from time import perf_counter
+from typing import Any, Callable
+
+PHASES = ('move_generation', 'board_copy', 'heuristic', 'open_push', 'open_pop', 'closed_lookup', 'goal_test')
+
+
+class SearchProfile:
+    '''Accumulates the time and calls of every phase of one search.'''
+
+    def __init__(self):
+        self.start = perf_counter()
+        self.times = dict.fromkeys(PHASES, 0.0)
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.peak_open = 0
+        self.peak_closed = 0
+        self.re_expansions = 0
+
+    def add(self, phase: str, started: float, calls: int = 1):
+        '''Adds the time elapsed since started (a perf_counter value) to phase.'''
+        self.times[phase] += perf_counter() - started
+        self.calls[phase] += calls
+
+    def report(self) -> dict:
+        total = perf_counter() - self.start
+        return {
+            'phases': {phase: {'time': self.times[phase], 'calls': self.calls[phase]} for phase in PHASES},
+            'other': max(0.0, total - sum(self.times.values())),
+            'peak_open': self.peak_open,
+            'peak_closed': self.peak_closed,
+            're_expansions': self.re_expansions,
+        }
+
+
+class ProfiledOpenList:
+    '''An IndexedOpenList whose operations are timed.'''
+
+    def __init__(self, open_list, profile: SearchProfile):
+        self.open_list = open_list
+        self.profile = profile
+
+    def dominated(self, key, g) -> bool:
+        started = perf_counter()
+        dominated = self.open_list.dominated(key, g)
+        self.profile.add('open_push', started, calls=0)
+        return dominated
+
+    def put(self, priority, item: Any, key, g) -> bool:
+        started = perf_counter()
+        put = self.open_list.put(priority, item, key, g)
+        self.profile.add('open_push', started)
+        self.profile.peak_open = max(self.profile.peak_open, len(self.open_list))
+        return put
+
+    def get(self):
+        started = perf_counter()
+        entry = self.open_list.get()
+        self.profile.add('open_pop', started)
+        return entry
+
+    def empty(self) -> bool:
+        return self.open_list.empty()
+
+    def __len__(self) -> int:
+        return len(self.open_list)
+
+
+class ProfiledClosedList:
+    '''A closed list (dict, set or DenseClosedList) whose lookups and insertions are timed.'''
+
+    def __init__(self, closed_list, profile: SearchProfile):
+        self.closed_list = closed_list
+        self.profile = profile
+
+    def __contains__(self, key) -> bool:
+        started = perf_counter()
+        contained = key in self.closed_list
+        self.profile.add('closed_lookup', started)
+        return contained
+
+    def __getitem__(self, key):
+        started = perf_counter()
+        value = self.closed_list[key]
+        self.profile.add('closed_lookup', started, calls=0)     # always right after the lookup of the same key
+        return value
+
+    def get(self, key, default=None):
+        started = perf_counter()
+        value = self.closed_list.get(key, default)
+        self.profile.add('closed_lookup', started)
+        return value
+
+    def __setitem__(self, key, value):
+        started = perf_counter()
+        if key in self.closed_list:
+            self.profile.re_expansions += 1
+        self.closed_list[key] = value
+        self.profile.add('closed_lookup', started)
+        self.profile.peak_closed = max(self.profile.peak_closed, len(self.closed_list))
+
+    def add(self, key):
+        started = perf_counter()
+        self.closed_list.add(key)
+        self.profile.add('closed_lookup', started)
+        self.profile.peak_closed = max(self.profile.peak_closed, len(self.closed_list))
+
+    def __len__(self) -> int:
+        return len(self.closed_list)
+
+
+def _timed(func: Callable, profile: SearchProfile, calls: int) -> Callable:
+    def timed(*args):
+        started = perf_counter()
+        value = func(*args)
+        profile.add('heuristic', started, calls)
+        return value
+    timed.__name__ = func.__name__
+    return timed
+
+
+def profiled_heuristic(H: Callable, profile: SearchProfile) -> Callable:
+    '''
+    Returns H timed as the heuristic phase. The incremental description of H,
+    if any, is timed as well, an evaluation being counted once (when its
+    components are combined).
+    '''
+    if H is None:
+        return None
+
+    timed = _timed(H, profile, 1)
+    incremental = getattr(H, 'incremental', None)
+    if incremental is not None:
+        timed.incremental = Incremental(_timed(incremental.components, profile, 0),
+                                        _timed(incremental.update, profile, 0),
+                                        _timed(incremental.combine, profile, 1))
+    return timed
+
+
+def profiled_node_class(profile: SearchProfile) -> type:
+    '''Returns a Node class whose goal tests, move generation and children creation are timed.'''
+
+    class ProfiledNode(Node):
+
+        def is_goal_state(self) -> bool:
+            started = perf_counter()
+            goal = super().is_goal_state()
+            profile.add('goal_test', started)
+            return goal
+
+        def successor_moves(self):
+            started = perf_counter()
+            moves = list(super().successor_moves())
+            profile.add('move_generation', started)
+            return iter(moves)
+
+        def child_key(self, start: tuple, end: tuple):
+            started = perf_counter()
+            key = super().child_key(start, end)
+            profile.add('move_generation', started, calls=0)
+            return key
+
+        def make_child(self, start: tuple, end: tuple, simple_cost: int, heuristic_func=None) -> ProfiledNode:
+            started = perf_counter()
+            heuristic_time = profile.times['heuristic']
+            child = super().make_child(start, end, simple_cost, heuristic_func)
+            profile.add('board_copy', started)
+            profile.times['board_copy'] -= profile.times['heuristic'] - heuristic_time
+            return child
+
+    return ProfiledNode
+
+
+def instrument(profile: SearchProfile, H: Callable, open_list, closed_list) -> tuple:
+    '''
+    Returns the heuristic, node class, open list and closed list a search
+    should use: timed versions of them when profile is a SearchProfile,
+    unchanged ones (and Node) when it is None.
+    '''
+    if profile is None:
+        return H, Node, open_list, closed_list
+
+    return (profiled_heuristic(H, profile), profiled_node_class(profile),
+            ProfiledOpenList(open_list, profile), ProfiledClosedList(closed_list, profile))
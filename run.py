@@ -1,10 +1,16 @@
 import search
+import argparse
+import multiprocessing
 import os
 import glob
 import numpy as np
 from board import Board
 import heuristics
+import oracle
+import binary_trace
+import search_trace
 import shutil
+import solution_cache
 
 
 def write_report(search_length: tuple, sol_length: tuple, time: tuple, costs: tuple, timeouts: tuple):
@@ -48,6 +54,8 @@ def compute_cost_stats(costs: list) -> tuple:
     '''
     The following function returns a tuple of the total and average cost.
     '''
+    if not costs:   # no job reported a cost
+        return (0, 0)
     total_cost = np.sum(costs)
     avg_cost = np.average(costs)
 
@@ -75,8 +83,14 @@ def compute_length_stats(fileType: str) -> tuple:
     num_of_lines = 0
     num_of_files = 0
     for fileName in glob.glob(f"results/*{fileType}*"):
-        num_of_lines += sum(1 for line in open(fileName))
+        if fileName.endswith('.bin'):       # fixed-width records, counted from the file size
+            num_of_lines += binary_trace.count_records(fileName)
+        else:
+            with open(fileName) as f:
+                num_of_lines += sum(1 for line in f)
         num_of_files += 1
+    if num_of_files == 0:   # nothing was traced at this level
+        return (0, 0)
     avg_length_solution = num_of_lines / num_of_files
     return (avg_length_solution, num_of_lines)
 
@@ -97,7 +111,8 @@ def generate_analysis_report(results: list):
     time_taken_values = []
     for puzzles in results:
         timeout_values.append(puzzles["success"])
-        cost_values.append(puzzles["current_node"].g_n)
+        if puzzles["cost"] is not None:     # unknown when the worker of a job was given up on
+            cost_values.append(puzzles["cost"])
         time_taken_values.append(puzzles["runtime"])
 
     avg_timeouts, total_timeouts = compute_timeouts(timeout_values)
@@ -182,11 +197,128 @@ def prompt_user() -> list:
     return puzzles
 
 
-def main(chosen_heurisitics=[heuristics.manhattan_distance, heuristics.row_col_out_of_place]):
+ALGORITHMS = {
+    # "UCS":   search.uniform_cost,
+    "GBF":   search.greedy_best_first,
+    "A*": search.a_star,
+}
+
+TIMEOUT_GRACE = 10  # seconds a worker is given on top of the search timeout before its job is given up
+
+
+def solve_job(job: dict) -> dict:
+    '''
+    Solves one (puzzle, algorithm, heuristic) combination, streams its search
+    and solution files to results/ (as much of them as the job's trace level
+    asks for) and returns a summary of the result dict. The summary doesn't
+    hold any node so that it can be sent back cheaply from a worker process.
+    '''
+    board = Board(puzzle=job['puzzle'])
+    heuristic = None if job['heuristic'] is None else f"h{job['heuristic']}"
+    fmt = job.get('format', search_trace.TEXT)
+    solution_path, search_path = search.result_paths(job['algo'], job['index'], heuristic, fmt=fmt)
+
+    cache = solution_cache.SolutionCache(job['cache']) if job.get('cache') else None
+
+    try:
+        with search_trace.TraceWriter(job.get('trace', search_trace.TRACE_FULL), search_path, solution_path, fmt, board.shape) as trace:
+            if job['algo'] == 'ORACLE':
+                result = oracle.default_oracle(board.shape).solve(board)
+                if cache is not None:
+                    cache.store(board, result, timeout=job['timeout'], optimal=True)
+            elif cache is not None:     # a cached result has no search to write
+                result = solution_cache.cached_search(cache, ALGORITHMS[job['algo']], board, job['H'], job['timeout'], trace=trace)
+            else:
+                result = ALGORITHMS[job['algo']](board, H=job['H'], timeout=job['timeout'], trace=trace)
+
+            trace.solution(result['current_node'], result['algo'])
+    finally:
+        if cache is not None:
+            cache.close()
+
+    return {
+        'algo': result['algo'],
+        'cost': result['current_node'].total_cost,
+        'runtime': result['runtime'],
+        'visited_nodes': result['visited_nodes'],
+        'created_nodes': result['created_nodes'],
+        'success': result['success'],
+        'message': result['message'],
+    }
+
+
+def generate_jobs(puzzles: list, chosen_heurisitics: list, use_oracle: bool, timeout: int, trace: str = search_trace.TRACE_FULL,
+                  fmt: str = search_trace.TEXT, cache: str = None) -> list:
+    '''Lists the jobs of a batch in the order their results are reported.'''
+    jobs = []
+    for index, p in enumerate(puzzles):
+        puzzle = p.reshape(2, 4)
+        if use_oracle:
+            jobs.append({'index': index, 'puzzle': puzzle, 'algo': 'ORACLE', 'heuristic': None, 'H': None, 'timeout': timeout, 'trace': trace, 'format': fmt, 'cache': cache})
+
+        for i in range(len(chosen_heurisitics)):
+            for algo in ALGORITHMS:
+                jobs.append({'index': index, 'puzzle': puzzle, 'algo': algo, 'heuristic': i+1, 'H': chosen_heurisitics[i], 'timeout': timeout, 'trace': trace, 'format': fmt, 'cache': cache})
+
+    return jobs
+
+
+def solve_jobs(jobs: list, processes: int = 1):
+    '''
+    Yields the summary of every job, in order. With more than one process the
+    jobs are sent to a process pool. Each search enforces its own timeout, and
+    a job whose worker doesn't answer within TIMEOUT_GRACE more seconds is
+    reported as timed out, with an unknown (None) cost: the pool is then
+    terminated, so that the hung worker can't write its result files after
+    its summary, and the jobs it hadn't finished are sent to a new pool.
+    '''
+    if processes <= 1:
+        for job in jobs:
+            yield solve_job(job)
+        return
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        pending = [pool.apply_async(solve_job, (job,)) for job in jobs]
+        for position, job in enumerate(jobs):
+            try:
+                yield pending[position].get(timeout=job['timeout'] + TIMEOUT_GRACE if job['timeout'] > 0 else None)
+            except multiprocessing.TimeoutError:
+                pool.terminate()
+                pool.join()
+                pool = multiprocessing.Pool(processes)
+                pending[position + 1:] = [result if result.ready() else pool.apply_async(solve_job, (later,))
+                                          for result, later in zip(pending[position + 1:], jobs[position + 1:])]
+                yield {
+                    'algo': job['algo'],
+                    'cost': None,
+                    'runtime': job['timeout'] + TIMEOUT_GRACE,
+                    'visited_nodes': 0,
+                    'created_nodes': 0,
+                    'success': False,
+                    'message': f"timeout after {job['timeout']} seconds",
+                }
+    finally:
+        pool.terminate()
+
+
+def main(chosen_heurisitics=[heuristics.manhattan_distance, heuristics.row_col_out_of_place], use_oracle=False, processes=1, timeout=60, trace=search_trace.TRACE_FULL,
+         fmt=search_trace.TEXT, cache=None):
+    '''
+    Solves every puzzle with every algorithm and heuristic. With use_oracle, the
+    optimal solution of each puzzle is also read from the distance oracle of
+    its shape (built once and saved under oracles/). With more than one
+    process, the jobs are solved in parallel; the output is the same. trace
+    selects which result files are written (see search_trace.py) and fmt
+    whether they are text or binary (see binary_trace.py). cache is the path
+    of a solution cache (see solution_cache.py) to reuse and fill, if any.
+    '''
     puzzles = prompt_user()
     print('Solving...')
     search_output = ""
     res = []
+    summaries = solve_jobs(generate_jobs(puzzles, chosen_heurisitics, use_oracle, timeout, trace, fmt, cache), processes)
+
     for index, p in enumerate(puzzles):
         start_puzzle: Board = Board(puzzle=p.reshape(2, 4))
         print('\n'+'*'*80)
@@ -194,37 +326,21 @@ def main(chosen_heurisitics=[heuristics.manhattan_distance, heuristics.row_col_o
         print(f'Puzzle {index+1}:\n{start_puzzle}')
         search_output += f'Puzzle {index+1}:\n{start_puzzle}\n'
 
+        if use_oracle:
+            result = next(summaries)
+            res.append(result)
+            print(f"\n{result['algo']}\tfound with cost = {result['cost']}\tin {result['runtime']} seconds")
+            search_output += f"\n{result['algo']}\tfound with cost = {result['cost']}\tin {result['runtime']} seconds\n"
+
         for i in range(len(chosen_heurisitics)):
-            experiments = {
-                # "UCS":   search.uniform_cost,
-                "GBF":   search.greedy_best_first,
-                "A*": search.a_star,
-            }
             print(f'\nUsing heuristic "{chosen_heurisitics[i].__name__}":')
             search_output+= f'\nUsing heuristic "{chosen_heurisitics[i].__name__}":\n'
 
-            results = []
-
-            for algo in experiments:
-                # if algo == 'UCS':
-                #     if i == 1:
-                #         continue
-                # results.append(experiments[algo](start_puzzle))
-                # else:
-                # results.append(experiments[algo](start_puzzle, H=chosen_heurisitics[i]))
-                results.append(experiments[algo](start_puzzle, H=chosen_heurisitics[i]))
-
-            for result in results:
+            for _ in ALGORITHMS:
+                result = next(summaries)
                 res.append(result)
-                print(f"{result['algo']}\tfound with cost = {result['current_node'].total_cost}\tin {result['runtime']} seconds")
-                search_output += f"{result['algo']}\t\tfound with cost = {result['current_node'].total_cost}\tin {result['runtime']} seconds\n"
-                # print(f"\n\t{result['algo']} found with cost = {result['current_node'].total_cost} in {result['runtime']} seconds:\n{result['current_node'].board}\n")
-                solution_str = result['current_node'].generate_solution_string(result['algo'])
-                search_str = search.generate_search_string(result['search_space'], result['algo'])
-                if result['algo'] == "UCS":
-                    search.write_results_to_disk(solution_str, search_str, result['algo'], index)
-                else:
-                    search.write_results_to_disk(solution_str, search_str, result['algo'], index, f'h{i+1}')
+                print(f"{result['algo']}\tfound with cost = {result['cost']}\tin {result['runtime']} seconds")
+                search_output += f"{result['algo']}\t\tfound with cost = {result['cost']}\tin {result['runtime']} seconds\n"
 
     report_message = generate_analysis_report(res)
     print(f'\n{report_message}')
@@ -238,4 +354,16 @@ def main(chosen_heurisitics=[heuristics.manhattan_distance, heuristics.row_col_o
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Solves X-puzzles with every search algorithm and heuristic.')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='number of worker processes (default: 1, solve serially)')
+    parser.add_argument('--timeout', type=int, default=60, help='timeout of every search in seconds (default: 60)')
+    parser.add_argument('--oracle', action='store_true', help='also read the optimal solution of every puzzle from the distance oracle')
+    parser.add_argument('--trace', choices=search_trace.TRACE_LEVELS, default=search_trace.TRACE_FULL,
+                        help='result files to write: none, only the solutions or also the searches (default: full)')
+    parser.add_argument('--format', choices=search_trace.FORMATS, default=search_trace.TEXT,
+                        help='format of the result files, convert binary ones with python binary_trace.py (default: text)')
+    parser.add_argument('--cache', nargs='?', const=solution_cache.DEFAULT_PATH, metavar='PATH',
+                        help=f'reuse and store results in a solution cache (default path: {solution_cache.DEFAULT_PATH})')
+    args = parser.parse_args()
+
+    main(use_oracle=args.oracle, processes=args.jobs, timeout=args.timeout, trace=args.trace, fmt=args.format, cache=args.cache)
@@ -1,231 +1,818 @@
 import numpy as np
-from board import Board
+from board import Board, PackedBoard
 from node import Node
-from queue import PriorityQueue
+from arena import ArenaSearchSpace, NodeArena, NO_PARENT
+from limits import SearchLimits
+from closed_list import ABSENT, DenseClosedList, make_closed_list
+from profiling import SearchProfile, instrument
+from moves import move_table
+from open_list import IndexedOpenList, make_open_list
+from search_trace import search_line
+from solution_cache import SolutionCache
+from typing import Callable
+import binary_trace
+import search_trace
+import heapq
+import math
+import operator
 import os
 import time
 import heuristics
 import shutil
+import solvability
 
 
-def uniform_cost(board: Board, timeout=60) -> Node:
+REOPEN = ('never', 'if_cheaper', 'unless_costlier')
+PREFERENCES = (None, 'high_g', 'low_h')
 
-    start_time = time.time()
+
+def priority_key(priority: Callable, prefer: str = None) -> Callable:
+    '''
+    Returns the (g, h) -> open list priority of a search ordering its nodes by
+    priority(g, h), equal priorities being ordered by highest g (prefer='high_g',
+    i.e. deepest first) or lowest h (prefer='low_h') first, or left to the open
+    list's tie breaking (prefer=None). Preferences make the priorities tuples,
+    which are kept in a heap.
+    '''
+    if prefer is None:
+        return priority
+    if prefer == 'high_g':
+        return lambda g, h: (priority(g, h), -g)
+    if prefer == 'low_h':
+        return lambda g, h: (priority(g, h), h)
+
+    raise ValueError(f'unknown preference "{prefer}", expected None, "high_g" or "low_h"')
+
+
+def best_first(board: Board, H=None, priority: Callable = lambda g, h: g + h, reopen='if_cheaper', algo='A*', timeout=60, frontier='bucket',
+               tie_breaking='fifo', prefer=None, trace=None, store='nodes', closed='auto', profile=False, cache=None, deadline=None, cancel=None,
+               max_nodes=None) -> dict:
+    '''
+    The best-first search behind uniform_cost, greedy_best_first, a_star and
+    weighted_a_star: nodes are expanded in the order of priority(g, h) (h being
+    0 without H), see priority_key for prefer. reopen says what happens to a
+    configuration reached again after it was expanded:
+
+        'never':            it is ignored, and so is the cost of the paths
+                            (greedy best first)
+        'if_cheaper':       it is expanded again only if reached with a lower
+                            g, and ignored copies aren't counted as visited (A*)
+        'unless_costlier':  it is expanded again unless reached with a higher
+                            g (uniform cost)
+
+    closed is the kind of closed list, see closed_list.make_closed_list: by
+    default ('auto') the rank-indexed array of small shapes when the board's
+    shape has one, a dict otherwise. algo names the search in the result dict
+    and in the traces.
+    cache (a solution_cache.SolutionCache) is only meaningful for searches that
+    follow path costs, with either store. timeout, deadline, cancel and
+    max_nodes stop the search early, see limits.py.
+    '''
+    if reopen not in REOPEN:
+        raise ValueError(f'unknown reopen policy "{reopen}", expected one of {", ".join(REOPEN)}')
+    key = priority_key(priority, prefer)
+    limits = SearchLimits(timeout, deadline, cancel, max_nodes)
+
+    rejected = solvability.rejection(board)
+    if rejected:
+        return _rejected(algo, board, rejected)
+    if store == 'arena':
+        return _arena_search(board, H, algo, key, reopen, limits, frontier, tie_breaking, trace, closed, profile, cache)
+
+    start_time = limits.start
     elapsed = start_time
 
-    root = Node(is_root=True, board=board)
+    path_costs = reopen != 'never'
+    beaten = operator.le if reopen == 'if_cheaper' else operator.lt      # beaten(closed g, g): a copy reached with g needn't be expanded
 
-    open_list = PriorityQueue()     # even though not python list, naming is kept for consistency with state space search theory
-    closed_list = {}                # even though not python list, naming is kept for consistency with state space search theory
-    search_space = []               # Used to reconstructed the order in which nodes were traversed
+    open_list = IndexedOpenList(make_open_list(frontier, tie_breaking))    # even though not python list, naming is kept for consistency with state space search theory
+    closed_list = make_closed_list(board, closed, as_set=not path_costs)  # even though not python list, naming is kept for consistency with state space search theory
+    stats = SearchProfile() if profile else None
+    H, node_class, open_list, closed_list = instrument(stats, H, open_list, closed_list)
+    closed_get = closed_list.get if path_costs else None     # one call to look a key up and read its g
+
+    root = node_class(is_root=True, board=board, heuristic_func=H)
+    search_space = []               # Used to reconstructed the order in which nodes were traversed, unless a trace sink (see search_trace.py) is given
 
     created_nodes = 1
-    open_list.put((root.total_cost, created_nodes, root))
+    known = cache.known_costs(board) if cache is not None else {}
+    if root.board.key() in known:       # already solved optimally, its goal is the only node to expand
+        created_nodes += _put_known_goal(open_list, root, cache, known, key, H)
+    else:
+        open_list.put(key(0, root.h_n if H is not None else 0), root, root.board.key(), 0)
     current_node = None
     visited_nodes = 0
 
+    def result(success: bool, message: str) -> dict:
+        return _with_profile({
+            'algo': algo,
+            'current_node': current_node,
+            'runtime': elapsed,
+            'visited_nodes': visited_nodes,
+            'created_nodes': created_nodes,
+            'search_space':  search_space,
+            'success': success,
+            'message': message
+        }, stats)
+
     while not open_list.empty():
 
-        _, _, current_node = open_list.get()
+        _, current_node = open_list.get()
         visited_nodes += 1
 
         if current_node.is_goal_state():
             elapsed = round(time.time() - start_time, 2)
-            return {
-                'algo': 'UCS',
-                'current_node': current_node,
-                'runtime': elapsed,
-                'visited_nodes': visited_nodes,
-                'created_nodes': created_nodes,
-                'search_space':  search_space,
-                'success': True,
-                'message': 'solution found'
-            }
+            return result(True, 'solution found')
 
         #--------This is only related to time execution--------#
-        if visited_nodes % 10000 == 0 and timeout > 0:
-            elapsed = round(time.time() - start_time, 2)
-            if elapsed > timeout:
-                return {
-                    'algo': 'UCS',
-                    'current_node': current_node,
-                    'runtime': elapsed,
-                    'visited_nodes': visited_nodes,
-                    'created_nodes': created_nodes,
-                    'search_space':  search_space,
-                    'success': False,
-                    'message': f"timeout after {timeout} seconds"
-                }
+        if visited_nodes >= limits.next_check:
+            stop = limits.check(visited_nodes, len(open_list) + len(closed_list))
+            if stop:
+                elapsed = round(time.time() - start_time, 2)
+                return result(False, stop)
         #--------This is only related to time execution--------#
 
-        hashed_node = tuple(current_node.board.puzzle.flatten())
+        hashed_node = current_node.board.key()
+        g = current_node.total_cost if path_costs else 0
+
+        if path_costs:
+            closed_g = closed_get(hashed_node)
+            ignored = closed_g is not None and beaten(closed_g, g)     # we previously got to this configuration with a lower cost so ignore
+        else:
+            ignored = hashed_node in closed_list
+        if ignored:
+            if reopen == 'if_cheaper':
+                visited_nodes -= 1          # we don't consider a node visited if you don't expand it (i.e generate it's children)
+            continue
 
-        if hashed_node in closed_list:
-            if closed_list[hashed_node].total_cost < current_node.total_cost:   # we previously got to this configuration with lower cost than we do right now so ignore
+        if path_costs:
+            closed_list[hashed_node] = g
+        else:
+            closed_list.add(hashed_node)
+        if trace is None:
+            search_space.append(current_node)
+        else:
+            trace.expanded(current_node, algo)   # streamed instead of kept in memory
+
+        for start, end, cost in current_node.successor_moves():
+            child_hash = current_node.child_key(start, end)
+            child_cost = g + cost if path_costs else 0
+            if path_costs:
+                closed_g = closed_get(child_hash)
+                if closed_g is not None and beaten(closed_g, child_cost):     # would be ignored when popped anyway, so don't create it
+                    continue
+            elif child_hash in closed_list:
+                continue
+            if open_list.dominated(child_hash, child_cost):                         # a copy at least as cheap is already waiting to be expanded
                 continue
 
-        closed_list[hashed_node] = current_node
-        search_space.append(current_node)
-        for s in current_node.successors():
+            s = current_node.make_child(start, end, cost, heuristic_func=H)
             created_nodes += 1
-            open_list.put((s.total_cost, created_nodes, s))
+            open_list.put(key(s.total_cost, s.h_n if H is not None else 0), s, child_hash, child_cost)
+            if child_hash in known:
+                created_nodes += _put_known_goal(open_list, s, cache, known, key, H)
+
+    return result(False, 'no more nodes in open list')
+
+
+def uniform_cost(board: Board, timeout=60, frontier='bucket', tie_breaking='fifo', trace=None, store='nodes', closed='auto', profile=False, cache=None,
+                 deadline=None, cancel=None, max_nodes=None) -> dict:
+    return best_first(board, None, lambda g, h: g, 'unless_costlier', 'UCS', timeout, frontier, tie_breaking, None, trace, store, closed, profile, cache,
+                      deadline, cancel, max_nodes)
 
+
+def greedy_best_first(board: Board, H, timeout=60, frontier='bucket', tie_breaking='fifo', trace=None, store='nodes', closed='auto', profile=False,
+                      deadline=None, cancel=None, max_nodes=None) -> dict:
+    return best_first(board, H, lambda g, h: h, 'never', 'GBF', timeout, frontier, tie_breaking, None, trace, store, closed, profile, None,
+                      deadline, cancel, max_nodes)
+
+
+def a_star(board: Board, H, timeout=60, frontier='bucket', tie_breaking='fifo', trace=None, store='nodes', closed='auto', profile=False, cache=None,
+           prefer=None, deadline=None, cancel=None, max_nodes=None) -> dict:
+    return best_first(board, H, lambda g, h: g + h, 'if_cheaper', 'A*', timeout, frontier, tie_breaking, prefer, trace, store, closed, profile, cache,
+                      deadline, cancel, max_nodes)
+
+
+def weighted_a_star(board: Board, H, weight=2, timeout=60, frontier='bucket', tie_breaking='fifo', prefer='high_g', trace=None, store='nodes',
+                    closed='auto', profile=False, cache=None, deadline=None, cancel=None, max_nodes=None) -> dict:
+    '''
+    A* expanding nodes by f = g + weight*h: a weight above 1 trades optimality
+    for speed, the cost found being at most weight times the optimal one when
+    H is admissible. Equal f are broken by highest g by default, which heads
+    for the goal rather than widening the search.
+    '''
+    if weight < 1:
+        raise ValueError(f'the weight of weighted A* must be at least 1, got {weight}')
+    return best_first(board, H, lambda g, h: g + weight * h, 'if_cheaper', 'wA*', timeout, frontier, tie_breaking, prefer, trace, store, closed,
+                      profile, cache, deadline, cancel, max_nodes)
+
+
+def _put_known_goal(open_list, node: Node, cache: SolutionCache, known: dict, key: Callable, H=None) -> int:
+    '''
+    Puts in the open list the goal reached by following the cached optimal
+    path of node's configuration (see solution_cache.py), with the priority
+    key(g, 0) of its exact cost: it is expanded once nothing cheaper is left,
+    so the search stops there. Returns the number of nodes created.
+    '''
+    goal = cache.complete(node, known, H)
+    open_list.put(key(goal.total_cost, 0), goal, goal.board.key(), goal.total_cost)
+
+    created = 0
+    while goal is not node:
+        goal = goal.parent
+        created += 1
+    return created
+
+
+def _rejected(algo: str, board: Board, message: str) -> dict:
+    '''The result dict of a search given a board that can't reach a goal state (see solvability.py).'''
     return {
-        'algo': 'UCS',
-        'current_node': current_node,
-        'runtime': elapsed,
-        'visited_nodes': visited_nodes,
-        'created_nodes': created_nodes,
-        'search_space':  search_space,
+        'algo': algo,
+        'current_node': Node(is_root=True, board=board),
+        'runtime': 0,
+        'visited_nodes': 0,
+        'created_nodes': 1,
+        'search_space':  [],
         'success': False,
-        'message': 'no more nodes in open list'
+        'message': message
     }
 
 
-def greedy_best_first(board: Board, H, timeout=60) -> Node:
+def _with_profile(result: dict, stats) -> dict:
+    '''Adds the 'profile' entry (see profiling.py) to the result dict of a profiled search.'''
+    if stats is not None:
+        result['profile'] = stats.report()
+    return result
 
-    start_time = time.time()
-    elapsed = start_time
 
-    root = Node(is_root=True, board=board, heuristic_func=H)
-    # goal_states = root.board.generate_goal_states()
+def _arena_search(board: Board, H, algo: str, key: Callable, reopen: str, limits: SearchLimits, frontier: str, tie_breaking: str, trace, closed: str,
+                  profile: bool, cache: SolutionCache = None) -> dict:
+    '''
+    best_first with store='arena' (key being its priority_key): the nodes are
+    kept in a NodeArena (see arena.py) and the search works on their ids. It
+    expands the same nodes in the same order as the search over Node objects,
+    and the returned nodes are ArenaNodes.
+
+    Only a single Node is ever built, for the heuristic of the root. Children
+    get their heuristic from the parent's incremental components when the
+    heuristic has them, recomputed once per expanded node; other heuristics are
+    called on a Node wrapping the child's board.
+    '''
+    start_time = limits.start
+    elapsed = start_time
 
-    open_list = PriorityQueue()       # even though not python list, naming is kept for consistency with state space search theory
-    closed_list = set()               # even though not python list, naming is kept for consistency with state space search theory
-    search_space = []               # Used to reconstructed the order in which nodes were traversed
+    packed = board.pack()
+    shape, bits, mask = packed.shape, packed.bits, packed.mask
+    table = move_table(shape)
+    goals = packed.goal_keys()
+
+    path_costs = reopen != 'never'
+    beaten = operator.le if reopen == 'if_cheaper' else operator.lt
+
+    open_list = IndexedOpenList(make_open_list(frontier, tie_breaking))
+    closed_list = make_closed_list(packed, closed, as_set=not path_costs)     # packed state -> g of the expanded copy
+    stats = SearchProfile() if profile else None
+    H, _, open_list, closed_list = instrument(stats, H, open_list, closed_list)    # goal tests, moves and children are inlined, so not timed
+    closed_get = closed_list.get if path_costs else None
+    dense = closed_list if type(closed_list) is DenseClosedList else None
+    if dense is not None:       # children are looked up in it directly, a method call per child costs as much as the ranking
+        dense_costs, prefix, suffix, low_mask, shift = dense.costs, dense.prefix, dense.suffix, dense.low_mask, dense.shift
+    incremental = getattr(H, 'incremental', None)
+
+    arena = NodeArena(shape, bits)
+    root_h = Node(is_root=True, board=packed, heuristic_func=H).h_n if H is not None else 0
+    root = arena.add(packed.state, NO_PARENT, 0, root_h, packed.blank, 0)
+    search_space = ArenaSearchSpace(arena)     # ids of the expanded nodes, unless a trace is given
 
     created_nodes = 1
-    open_list.put((root.h_n, created_nodes, root))
-    current_node = None
+    known = cache.known_costs(packed) if cache is not None else {}
+    if packed.state in known:
+        created_nodes += _put_known_goal_in_arena(open_list, arena, root, cache, known, key, H)
+    else:
+        open_list.put(key(0, root_h), root, packed.state, 0)
+    current = None
     visited_nodes = 0
 
+    def result(success: bool, message: str) -> dict:
+        return _with_profile({
+            'algo': algo,
+            'current_node': arena.node(current) if current is not None else None,
+            'runtime': elapsed,
+            'visited_nodes': visited_nodes,
+            'created_nodes': created_nodes,
+            'search_space':  search_space,
+            'success': success,
+            'message': message
+        }, stats)
+
     while not open_list.empty():
-        _, _, current_node = open_list.get()
+
+        _, current = open_list.get()
         visited_nodes += 1
+        state = arena.states[current]
 
-        if current_node.is_goal_state():
+        if state in goals:
             elapsed = round(time.time() - start_time, 2)
-            return {
-                'algo': 'GBF',
-                'current_node': current_node,
-                'runtime': elapsed,
-                'visited_nodes': visited_nodes,
-                'created_nodes': created_nodes,
-                'search_space':  search_space,
-                'success': True,
-                'message': 'solution found'
-            }
+            return result(True, 'solution found')
+
+        if visited_nodes >= limits.next_check:
+            stop = limits.check(visited_nodes, len(open_list) + len(closed_list))
+            if stop:
+                elapsed = round(time.time() - start_time, 2)
+                return result(False, stop)
+
+        g = arena.g[current] if path_costs else 0
+        if path_costs:
+            closed_g = closed_get(state)
+            ignored = closed_g is not None and beaten(closed_g, g)
+        else:
+            ignored = state in closed_list
+        if ignored:
+            if reopen == 'if_cheaper':
+                visited_nodes -= 1
+            continue
 
-        #--------This is only related to time execution--------#
-        if visited_nodes % 10000 == 0 and timeout > 0:
-            elapsed = round(time.time() - start_time, 2)
-            if elapsed > timeout:
-                return {
-                    'algo': 'GBF',
-                    'current_node': current_node,
-                    'runtime': elapsed,
-                    'visited_nodes': visited_nodes,
-                    'created_nodes': created_nodes,
-                    'search_space':  search_space,
-                    'success': False,
-                    'message': f"timeout after {timeout} seconds"
-                }
-        #--------This is only related to time execution--------#
+        if path_costs:
+            closed_list[state] = g
+        else:
+            closed_list.add(state)
+        if trace is None:
+            search_space.append(current)
+        else:
+            trace.expanded(arena.node(current), algo)
+
+        blank = arena.blanks[current]
+        parent = arena.parents[current]
+        previous = arena.blanks[parent] if parent != NO_PARENT else None     # moving back there would undo the last move
+        if incremental is not None:
+            components = incremental.components(arena.board(current))
+
+        for end, cost in table.all[blank]:
+            if end == previous:
+                continue
 
-        hashed_node = tuple(current_node.board.puzzle.flatten())
+            tile = (state >> (end * bits)) & mask
+            child_state = state ^ (tile << (end * bits)) ^ (tile << (blank * bits))
+            child_g = arena.g[current] + cost
+            open_g = child_g if path_costs else 0   # g as far as the closed and open lists are concerned
+
+            if dense is not None:
+                closed_g = dense_costs[prefix[child_state & low_mask] + suffix[child_state >> shift]]
+                if closed_g != ABSENT and (not path_costs or beaten(closed_g, open_g)):
+                    continue
+            elif path_costs:
+                closed_g = closed_get(child_state)
+                if closed_g is not None and beaten(closed_g, open_g):
+                    continue
+            elif child_state in closed_list:
+                continue
+            if open_list.dominated(child_state, open_g):
+                continue
 
-        if hashed_node in closed_list:
-            continue
+            if H is None:
+                h = 0
+            elif incremental is not None:
+                h = incremental.combine(incremental.update(components, shape, tile, end, blank))
+            else:
+                h = H(Node(is_root=True, board=PackedBoard.from_state(child_state, shape, bits, end)))
 
-        closed_list.add(hashed_node)
-        search_space.append(current_node)
-        for s in current_node.successors(heuristic_func=H):
+            child = arena.add(child_state, current, child_g, h, end, cost)
             created_nodes += 1
-            open_list.put((s.h_n, created_nodes, s))
 
+            open_list.put(key(child_g, h), child, child_state, open_g)
+            if child_state in known:
+                created_nodes += _put_known_goal_in_arena(open_list, arena, child, cache, known, key, H)
+
+    return result(False, 'no more nodes in open list')
+
+
+def _put_known_goal_in_arena(open_list, arena: NodeArena, node_id: int, cache: SolutionCache, known: dict, key: Callable, H=None) -> int:
+    '''_put_known_goal for _arena_search: the nodes of the cached path are added to the arena.'''
+    start = Node(is_root=True, board=arena.board(node_id))
+    goal = cache.complete(start, known, H)
+    path = []
+    while goal is not start:
+        path.append(goal)
+        goal = goal.parent
+
+    g = arena.g[node_id]
+    for node in reversed(path):
+        node_id = arena.add(node.board.state, node_id, g + node.total_cost, node.h_n if H is not None else 0, node.board.blank, node.simple_cost)
+    goal_g = arena.g[node_id]
+    open_list.put(key(goal_g, 0), node_id, arena.states[node_id], goal_g)
+    return len(path)
+
+
+class _SearchStopped(Exception):
+    '''Raised by the recursion of ida_star with the reason it has to stop.'''
+
+
+def ida_star(board: Board, H, timeout=60, deadline=None, cancel=None, max_nodes=None) -> dict:
+    '''
+    Iterative-deepening A*: depth-first searches bounded by f = g + h, the
+    bound being raised to the smallest f that exceeded it after every
+    iteration. Only the current path is kept and moves are performed and
+    undone in place on a single puzzle, so memory is linear in the depth of the
+    solution. Nodes are not stored, so search_space is always empty, and
+    max_nodes limits the depth of the path.
+    '''
+    limits = SearchLimits(timeout, deadline, cancel, max_nodes)
+    rejected = solvability.rejection(board)
+    if rejected:
+        return _rejected('IDA*', board, rejected)
+
+    start_time = limits.start
+    elapsed = 0
+
+    puzzle = np.array(board.puzzle)                 # the only configuration, modified in place
+    tiles = puzzle.reshape(-1)
+    probe = Node(is_root=True, board=Board(puzzle))  # handed to H, always reflects the current configuration
+    table = move_table(puzzle.shape)
+
+    packed = PackedBoard(puzzle)
+    goal_keys = packed.goal_keys()
+    bits = packed.bits
+    state = packed.state
+    blank = packed.blank
+
+    path = []           # (start, end, cost) of the moves performed from the root, as row-major indices
+    on_path = {state}   # configurations on the current path, to avoid cycles
+    visited_nodes = 0
+    created_nodes = 1
+    found = object()
+
+    incremental = getattr(H, 'incremental', None)   # see heuristics.Incremental
+
+    def bounded_search(g: int, h: int, components, bound, previous_blank: int):
+        nonlocal state, blank, visited_nodes, created_nodes
+
+        f = g + h
+        if f > bound:
+            return f
+        if state in goal_keys:
+            return found
+
+        visited_nodes += 1
+        if visited_nodes >= limits.next_check:
+            stop = limits.check(visited_nodes, len(path))
+            if stop:
+                raise _SearchStopped(stop)
+
+        minimum = math.inf
+        start = blank
+
+        for end, cost in table.all[start]:
+            if end == previous_blank:   # undoing the previous move
+                continue
+
+            tile = int(tiles[end])
+            child_state = state ^ (tile << (start * bits)) ^ (tile << (end * bits))  # the blank is 0 so xor moves the tile
+            if child_state in on_path:
+                continue
+
+            tiles[start], tiles[end] = tile, 0
+            state, blank = child_state, end
+            on_path.add(state)
+            path.append((start, end, cost))
+            created_nodes += 1
+
+            if incremental:
+                child_components = incremental.update(components, puzzle.shape, tile, end, start)
+                child_h = incremental.combine(child_components)
+            else:
+                child_components, child_h = None, H(probe)
+
+            result = bounded_search(g + cost, child_h, child_components, bound, start)
+            if result is found:
+                return found
+
+            path.pop()
+            on_path.discard(state)
+            tiles[start], tiles[end] = 0, tile
+            state, blank = state ^ (tile << (start * bits)) ^ (tile << (end * bits)), start
+
+            minimum = min(minimum, result)
+
+        return minimum
+
+    def path_to_node() -> Node:
+        node = Node(is_root=True, board=board, heuristic_func=H)
+        for start, end, cost in path:
+            node = node.make_child(table.positions[start], table.positions[end], cost, heuristic_func=H)
+        return node
+
+    root_components = incremental.components(probe.board) if incremental else None
+    root_h = incremental.combine(root_components) if incremental else H(probe)
+    bound = root_h
+    success = False
+    message = 'no more nodes in open list'
+
+    try:
+        while True:
+            result = bounded_search(0, root_h, root_components, bound, -1)
+            if result is found:
+                success = True
+                message = 'solution found'
+                break
+            if result == math.inf:
+                break
+            bound = result
+
+    except _SearchStopped as stop:
+        message = str(stop)
+
+    elapsed = round(time.time() - start_time, 2)
     return {
-        'algo': 'GBF',
-        'current_node': current_node,
+        'algo': 'IDA*',
+        'current_node': path_to_node(),
         'runtime': elapsed,
         'visited_nodes': visited_nodes,
         'created_nodes': created_nodes,
-        'search_space':  search_space,
-        'success': False,
-        'message': 'no more nodes in open list'
+        'search_space':  [],
+        'success': success,
+        'message': message
     }
 
 
-def a_star(board: Board, H, timeout=60) -> Node:
-
-    start_time = time.time()
-    elapsed = start_time
-
-    root = Node(is_root=True, board=board, heuristic_func=H)
+def bidirectional(board: Board, H=None, timeout=60, deadline=None, cancel=None, max_nodes=None) -> dict:
+    '''
+    Bidirectional search: a forward search from board and a backward search
+    from both goal states at once, always expanding the side with the smaller
+    open list. Every generated configuration is looked up in the other side's
+    costs to maintain the cheapest complete path found so far (mu).
+
+    Without H both sides are uniform cost and the search stops once the lowest
+    g of both open lists add up to at least mu, which makes it optimal. With
+    H the forward side is an A* (the backward side stays uniform cost since
+    the heuristics estimate the distance to the goals, not to board) and the
+    search stops once mu is not greater than the lowest f forward or the
+    lowest g backward, which is optimal when H is admissible: an inconsistent
+    H can reach an expanded configuration again with a lower g, it is then
+    reopened and expanded again (as by a_star).
+
+    Configurations are handled as packed integers and no Node is built until
+    the solution path is reconstructed, so search_space is always empty.
+    '''
+    algo = 'BD-A*' if H else 'BD-UCS'
+    limits = SearchLimits(timeout, deadline, cancel, max_nodes)
+    rejected = solvability.rejection(board)
+    if rejected:
+        return _rejected(algo, board, rejected)
+
+    start_time = limits.start
+    elapsed = 0
+
+    packed = board.pack()
+    shape, bits = packed.shape, packed.bits
+    table = move_table(shape)
+
+    def heuristic(state: int, blank: int):
+        if not H:
+            return 0
+        return H(Node(is_root=True, board=PackedBoard.from_state(state, shape, bits, blank)))
+
+    def moved(state: int, start: int, end: int) -> int:
+        tile = (state >> (end * bits)) & packed.mask
+        return state ^ (tile << (start * bits)) ^ (tile << (end * bits))  # the blank is 0 so xor moves the tile
+
+    # forward: g is the cost from board, backward: g is the cost to the closest goal.
+    # parents map a configuration to (configuration it was reached from, blank start, blank end, cost)
+    # where start -> end is always the forward move, whatever the direction of the search.
+    g_forward = {packed.state: 0}
+    g_backward = {}
+    parents_forward = {packed.state: None}
+    parents_backward = {}
+    closed_forward = set()
+    closed_backward = set()
+    open_forward = [(heuristic(packed.state, packed.blank), 0, packed.state, packed.blank)]
+    open_backward = []
 
-    open_list = PriorityQueue()     # even though not python list, naming is kept for consistency with state space search theory
-    closed_list = {}                # even though not python list, naming is kept for consistency with state space search theory
-    search_space = []               # Used to reconstructed the order in which nodes were traversed
     created_nodes = 1
-    open_list.put((root.f_n, created_nodes, root))
-    current_node = None
-    visited_nodes = 0
+    for goal in packed.goal_keys():
+        if goal not in g_backward:
+            created_nodes += 1
+            g_backward[goal] = 0
+            parents_backward[goal] = None
+            open_backward.append((0, 0, goal, table.size - 1))  # the blank is in the last cell of both goals
 
-    while not open_list.empty():
+    best_cost = 0 if packed.state in g_backward else math.inf
+    meeting = packed.state if best_cost == 0 else None
+    visited_nodes = 0
+    message = 'no more nodes in open list'
+
+    def clean(open_list: list, g: dict, closed: set):
+        '''Pops the entries that were superseded by a cheaper copy or already expanded with their g.'''
+        while open_list and (open_list[0][2] in closed or open_list[0][1] != g[open_list[0][2]]):
+            heapq.heappop(open_list)
+
+    while True:
+        clean(open_forward, g_forward, closed_forward)
+        clean(open_backward, g_backward, closed_backward)
+        if not open_forward or not open_backward:
+            break
+
+        if H:
+            lower_bound = max(open_forward[0][0], open_backward[0][0])
+        else:
+            lower_bound = open_forward[0][0] + open_backward[0][0]
+        if best_cost <= lower_bound:
+            message = 'solution found'
+            break
 
-        _, _, current_node = open_list.get()
         visited_nodes += 1
+        if visited_nodes >= limits.next_check:
+            stop = limits.check(visited_nodes, len(g_forward) + len(g_backward))
+            if stop:
+                message = stop
+                break
+
+        forward = len(open_forward) <= len(open_backward)
+        if forward:
+            _, g, state, blank = heapq.heappop(open_forward)
+            closed_forward.add(state)
+            moves = [(blank, end, cost) for end, cost in table.all[blank]]
+            g_this, g_other, parents, open_list, closed = g_forward, g_backward, parents_forward, open_forward, closed_forward
+        else:
+            _, g, state, blank = heapq.heappop(open_backward)
+            closed_backward.add(state)
+            moves = [(start, blank, cost) for start, cost in table.reverse[blank]]
+            g_this, g_other, parents, open_list, closed = g_backward, g_forward, parents_backward, open_backward, closed_backward
+
+        for start, end, cost in moves:
+            child_blank = end if forward else start
+            child = moved(state, blank, child_blank)
+            child_g = g + cost
+
+            if child in g_this and g_this[child] <= child_g:
+                continue
 
-        if current_node.is_goal_state():
-            elapsed = round(time.time() - start_time, 2)
-            return {
-                'algo': 'A*',
-                'current_node': current_node,
-                'runtime': elapsed,
-                'visited_nodes': visited_nodes,
-                'created_nodes': created_nodes,
-                'search_space':  search_space,
-                'success': True,
-                'message': 'solution found'
-            }
+            g_this[child] = child_g
+            parents[child] = (state, start, end, cost)
+            closed.discard(child)       # reached again more cheaply after its expansion, it is expanded again
+            created_nodes += 1
+            priority = child_g + heuristic(child, child_blank) if forward else child_g
+            heapq.heappush(open_list, (priority, child_g, child, child_blank))
+
+            if child in g_other and child_g + g_other[child] < best_cost:
+                best_cost = child_g + g_other[child]
+                meeting = child
+
+    # moves from board to the meeting configuration, then from there to the goal
+    path = []
+    if meeting is not None:
+        state = meeting
+        while parents_forward[state] is not None:
+            state, start, end, cost = parents_forward[state]
+            path.insert(0, (start, end, cost))
+        state = meeting
+        while parents_backward[state] is not None:
+            state, start, end, cost = parents_backward[state]
+            path.append((start, end, cost))
+
+    if message != 'solution found':
+        path = []
+
+    current_node = Node(is_root=True, board=board, heuristic_func=H)
+    for start, end, cost in path:
+        current_node = current_node.make_child(table.positions[start], table.positions[end], cost, heuristic_func=H)
+
+    elapsed = round(time.time() - start_time, 2)
+    return {
+        'algo': algo,
+        'current_node': current_node,
+        'runtime': elapsed,
+        'visited_nodes': visited_nodes,
+        'created_nodes': created_nodes,
+        'search_space':  [],
+        'success': message == 'solution found',
+        'message': message
+    }
 
-        #--------This is only related to time execution--------#
-        if visited_nodes % 10000 == 0 and timeout > 0:
-            elapsed = round(time.time() - start_time, 2)
-            if elapsed > timeout:
-                return {
-                    'algo': 'A*',
-                    'current_node': current_node,
-                    'runtime': elapsed,
-                    'visited_nodes': visited_nodes,
-                    'created_nodes': created_nodes,
-                    'search_space':  search_space,
-                    'success': False,
-                    'message': f"timeout after {timeout} seconds"
-                }
-        #--------This is only related to time execution--------#
 
-        hashed_node = tuple(current_node.board.puzzle.flatten())
+def ara_star(board: Board, H, timeout=60, initial_weight=3.0, weight_step=0.5, tie_breaking='fifo', trace=None, deadline=None, cancel=None,
+             max_nodes=None) -> dict:
+    '''
+    Anytime Repairing A* (Likhachev, Gordon & Thrun, 2003). A weighted A*
+    (f = g + w*h, w = initial_weight) finds a first solution quickly, then it
+    is improved by searching again with w lowered by weight_step down to 1,
+    until the timeout. Every search reuses the work of the previous one: the g
+    of every configuration is kept, the open list is reordered for the new
+    weight, and the configurations whose g improved after they were expanded
+    (inconsistent ones) are put back in it instead of being searched again
+    from scratch. A search ends as soon as no open node can beat the best
+    solution found.
+
+    The result holds the best solution found, even when stopped early (see
+    limits.py for timeout, deadline, cancel and max_nodes), along with
+    'bound': its cost is at most bound times the optimal cost (if H is
+    consistent: a search doesn't expand a configuration twice, so an
+    admissible but inconsistent H can break the bound; 1 means optimal) and
+    'solutions': the (cost, weight, bound, runtime) of every improvement.
+    '''
+    limits = SearchLimits(timeout, deadline, cancel, max_nodes)
+    rejected = solvability.rejection(board)
+    if rejected:
+        result = _rejected('ARA*', board, rejected)
+        result.update(bound=math.inf, solutions=[])
+        return result
 
-        if hashed_node in closed_list:
-            if closed_list[hashed_node].g_n <= current_node.g_n:     # we previously got to this configuration with lower f_n than we do right now so ignore
-                visited_nodes -= 1                                   # we don't consider a node visited if you don't expand it (i.e generate it's children)
-                continue
+    start_time = limits.start
 
-        closed_list[hashed_node] = current_node
-        search_space.append(current_node)
-        for s in current_node.successors(heuristic_func=H):
-            created_nodes += 1
-            open_list.put((s.f_n, created_nodes, s))
+    root = Node(is_root=True, board=board, heuristic_func=H)
+    search_space = []               # Used to reconstructed the order in which nodes were traversed, unless a trace sink (see search_trace.py) is given
+    g = {root.board.key(): 0}       # lowest cost found to every configuration, across searches
+    inconsistent = {}               # key -> node improved after its configuration was expanded by the current search
+    incumbent = root if root.is_goal_state() else None
+    weight = max(initial_weight, 1)
+    bound = 1 if incumbent is not None else math.inf
+    solutions = [(0, weight, 1, 0.0)] if incumbent is not None else []
+    visited_nodes = 0
+    created_nodes = 1
+    current_node = root
+    stop = None                     # why the searches were cut short
+
+    open_list = IndexedOpenList(make_open_list('heap', tie_breaking))    # weighted priorities are not integers
+    open_list.put(root.g_n + weight * root.h_n, root, root.board.key(), 0)
+
+    while incumbent is None or bound > 1:
+        closed = set()
+
+        while not open_list.empty():
+            priority, current_node = open_list.get()
+            if incumbent is not None and priority >= incumbent.total_cost:      # nothing left that could improve it
+                open_list.put(priority, current_node, current_node.board.key(), current_node.g_n)
+                break
+
+            visited_nodes += 1
+            if visited_nodes >= limits.next_check:
+                stop = limits.check(visited_nodes, len(g))
+                if stop:
+                    break
+
+            closed.add(current_node.board.key())
+            if trace is None:
+                search_space.append(current_node)
+            else:
+                trace.expanded(current_node, 'ARA*')   # streamed instead of kept in memory
+
+            for start, end, cost in current_node.successor_moves():
+                child_hash = current_node.child_key(start, end)
+                child_cost = current_node.g_n + cost
+                if child_hash in g and g[child_hash] <= child_cost:
+                    continue
+
+                g[child_hash] = child_cost
+                s = current_node.make_child(start, end, cost, heuristic_func=H)
+                created_nodes += 1
+                if s.is_goal_state():
+                    if incumbent is None or s.total_cost < incumbent.total_cost:
+                        incumbent = s
+                elif child_hash in closed:
+                    inconsistent[child_hash] = s
+                else:
+                    open_list.put(s.g_n + weight * s.h_n, s, child_hash, child_cost)
+
+        if stop or incumbent is None:
+            break
+
+        # the cost of the incumbent over a lower bound of the optimal cost: the lowest g + h still to expand
+        waiting = [node for _, node in open_list.best.values()] + list(inconsistent.values())
+        lowest = min((node.g_n + node.h_n for node in waiting), default=math.inf)
+        improved = max(1, min(weight, incumbent.total_cost / lowest)) if lowest > 0 else weight
+        if not solutions or incumbent.total_cost < solutions[-1][0] or improved < bound:
+            bound = min(bound, improved)
+            solutions.append((incumbent.total_cost, weight, bound, round(time.time() - start_time, 2)))
+
+        if weight <= 1 or not waiting:
+            bound = 1
+            break
+
+        weight = max(1, weight - weight_step)
+        reordered = IndexedOpenList(make_open_list('heap', tie_breaking))
+        for node in waiting:
+            reordered.put(node.g_n + weight * node.h_n, node, node.board.key(), node.g_n)
+        open_list = reordered
+        inconsistent = {}
+
+    elapsed = round(time.time() - start_time, 2)
+    if incumbent is None:
+        message = stop or 'no more nodes in open list'
+    elif stop:
+        message = f"{stop}, best solution found is within {bound:.2f} times the optimal cost"
+    else:
+        message = 'solution found'
 
     return {
-        'algo': 'A*',
-        'current_node': current_node,
+        'algo': 'ARA*',
+        'current_node': incumbent if incumbent is not None else current_node,
         'runtime': elapsed,
         'visited_nodes': visited_nodes,
         'created_nodes': created_nodes,
         'search_space':  search_space,
-        'success': False,
-        'message': 'no more nodes in open list'
+        'success': incumbent is not None,
+        'message': message,
+        'bound': bound,
+        'solutions': solutions,
     }
 
 
@@ -234,44 +821,44 @@ def generate_search_string(search_space: list, algo: str) -> str:
     Generates the search string given closed_list (actually a dict) which is
     returned by a search algorithm.
     '''
-    search_str = ''
-    algo = algo.upper()
-    for node in search_space:
-        board_as_str = node.board.line_representation()
-
-        if node.is_root:
-            search_str += f'0 0 0 {board_as_str}\n'
-            continue
-
-        f = node.f_n if algo == 'A*' else 0
-        g = 0 if algo == 'GBF' else node.g_n
-        h = 0 if algo == 'UCS' else node.h_n
+    return ''.join(search_line(node, algo) for node in search_space)
 
-        search_str += f'{f} {g} {h} {board_as_str}\n'
 
-    return search_str
-
-
-def write_results_to_disk(solution: str, search: str, algo_name: str, puzzle_number: int, heuristic: str = None) -> bool:
+def write_results_to_disk(solution: str, search: str, algo_name: str, puzzle_number: int, heuristic: str = None,
+                          fmt: str = search_trace.TEXT, shape: tuple = None) -> bool:
     '''
-    Writes the contents of the solution and search strings for puzzle_number using algo_name and heurisic
+    Writes the contents of the solution and search strings for puzzle_number using algo_name and heurisic.
+    With fmt='binary' they are converted to binary traces (see binary_trace.py) of boards of the given shape.
     '''
-    algo_name = algo_name.lower()
-    heuristic_string = f'_{heuristic}_' if heuristic != None else '_'
-    sol_name = f'{puzzle_number}_{algo_name}{heuristic_string}solution.txt'
-    search_name = f'{puzzle_number}_{algo_name}{heuristic_string}search.txt'
+    sol_path, search_path = result_paths(algo_name, puzzle_number, heuristic, fmt=fmt)
 
-    result_dir = 'results'
+    if fmt == search_trace.BINARY:
+        binary_trace.write_text(solution, sol_path, binary_trace.SOLUTION, shape)
+        binary_trace.write_text(search, search_path, binary_trace.SEARCH, shape)
+        return True
 
-    with open(os.path.join(result_dir, sol_name), mode='w') as f:
+    with open(sol_path, mode='w') as f:
         f.write(solution)
 
-    with open(os.path.join(result_dir, search_name), mode='w') as f:
+    with open(search_path, mode='w') as f:
         f.write(search)
 
     return True
 
 
+def result_paths(algo_name: str, puzzle_number: int, heuristic: str = None, result_dir: str = 'results', fmt: str = search_trace.TEXT) -> tuple:
+    '''
+    Returns the paths of the solution and search files for puzzle_number using algo_name and heurisic
+    '''
+    algo_name = algo_name.lower()
+    heuristic_string = f'_{heuristic}_' if heuristic != None else '_'
+    extension = search_trace.EXTENSIONS[fmt]
+    sol_name = f'{puzzle_number}_{algo_name}{heuristic_string}solution.{extension}'
+    search_name = f'{puzzle_number}_{algo_name}{heuristic_string}search.{extension}'
+
+    return os.path.join(result_dir, sol_name), os.path.join(result_dir, search_name)
+
+
 def main(chosen_heurisitics=[heuristics.manhattan_distance, heuristics.row_col_out_of_place]):
     puzzles = [
         np.array([
@@ -0,0 +1,117 @@
+'''
+Streaming writer for the search and solution files of a search. Instead of
+keeping every expanded node in search_space and building the whole search
+string at the end, a search given a trace sink hands it each node as it is
+expanded and the line is written right away to a buffered file.
+'''
+from node import Node
+from typing import Optional
+import binary_trace
+
+TRACE_NONE = 'none'             # nothing is written
+TRACE_SOLUTION = 'solution'     # only the solution file is written
+TRACE_FULL = 'full'             # both the search and the solution files are written
+TRACE_LEVELS = (TRACE_NONE, TRACE_SOLUTION, TRACE_FULL)
+
+TEXT = 'text'
+BINARY = 'binary'               # see binary_trace.py
+FORMATS = (TEXT, BINARY)
+EXTENSIONS = {TEXT: 'txt', BINARY: 'bin'}
+
+BUFFER_SIZE = 1 << 16
+
+
+def search_values(node: Node, algo: str) -> tuple:
+    '''Returns the f, g and h written for an expanded node, those the algorithm doesn't use being 0.'''
+    if node.is_root:
+        return 0, 0, 0
+
+    algo = algo.upper()
+    f = 0 if algo in ('UCS', 'GBF') else node.f_n
+    g = 0 if algo == 'GBF' else node.g_n
+    h = 0 if algo == 'UCS' else node.h_n
+
+    return f, g, h
+
+
+def search_line(node: Node, algo: str) -> str:
+    '''Returns the "f g h board" line of an expanded node, as found in the search files.'''
+    f, g, h = search_values(node, algo)
+    return f'{f} {g} {h} {node.board.line_representation()}\n'
+
+
+def solution_steps(node: Node) -> list:
+    '''Returns the (moved tile, cost, board) steps from the root to node, the root's tile and cost being 0.'''
+    steps = []
+    while node.parent != None:
+        steps.append((int(node.board.puzzle[node.start]), node.simple_cost, node.board))
+        node = node.parent
+    steps.append((0, 0, node.board))
+
+    return steps[::-1]
+
+
+class TraceWriter:
+    '''
+    Trace sink accepted by uniform_cost, greedy_best_first and a_star. The
+    level is one of TRACE_LEVELS; search_path is only needed for TRACE_FULL
+    and solution_path for anything but TRACE_NONE. The files are written as
+    text, or in the binary format of binary_trace.py for fmt=BINARY, in which
+    case the shape of the boards must be given.
+    '''
+
+    def __init__(self, level: str = TRACE_FULL, search_path: Optional[str] = None, solution_path: Optional[str] = None,
+                 fmt: str = TEXT, shape: Optional[tuple] = None):
+        if level not in TRACE_LEVELS:
+            raise ValueError(f'unknown trace level "{level}", expected one of {TRACE_LEVELS}')
+        if fmt not in FORMATS:
+            raise ValueError(f'unknown trace format "{fmt}", expected one of {FORMATS}')
+        if fmt == BINARY and shape is None:
+            raise ValueError('binary traces need the shape of the boards')
+
+        self.level = level
+        self.fmt = fmt
+        self.shape = shape
+        self.solution_path = solution_path
+        self.search_file = None
+        self.expanded_nodes = 0
+
+        if level == TRACE_FULL:
+            if fmt == BINARY:
+                self.search_file = binary_trace.BinaryTraceWriter(search_path, binary_trace.SEARCH, shape)
+            else:
+                self.search_file = open(search_path, mode='w', buffering=BUFFER_SIZE)
+
+    def expanded(self, node: Node, algo: str):
+        '''Called by the searches for every node they expand.'''
+        self.expanded_nodes += 1
+        if self.search_file is None:
+            return
+        if self.fmt == BINARY:
+            self.search_file.write(node.board, *search_values(node, algo))
+        else:
+            self.search_file.write(search_line(node, algo))
+
+    def solution(self, node: Node, algo: str):
+        '''Writes the path from the root to node as the solution file.'''
+        if self.level == TRACE_NONE:
+            return
+
+        if self.fmt == BINARY:
+            with binary_trace.BinaryTraceWriter(self.solution_path, binary_trace.SOLUTION, self.shape) as writer:
+                for tile, cost, board in solution_steps(node):
+                    writer.write(board, tile, cost, 0)
+        else:
+            with open(self.solution_path, mode='w', buffering=BUFFER_SIZE) as f:
+                f.write(node.generate_solution_string(algo))
+
+    def close(self):
+        if self.search_file is not None:
+            self.search_file.close()
+            self.search_file = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
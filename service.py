@@ -0,0 +1,358 @@
+'''
+Long-running solver service. Puzzles are sent over a TCP or Unix socket as
+JSON lines and solved by a pool of worker processes that stay up between
+requests, so that interpreter and numpy startup, move tables, heuristic
+tables and pattern databases are paid for once per worker instead of once
+per puzzle.
+
+    python service.py --port 8472 --workers 4 --warm 3x3 4x4
+    python service.py --unix /tmp/xpuzzle.sock
+
+A request is one JSON object per line:
+
+    {"id": 1, "puzzle": [[1, 0, 3], [7, 2, 5], [4, 8, 6]], "algorithm": "A*",
+     "heuristic": "manhattan_distance", "timeout": 10}
+
+puzzle is either rows of tiles or a flat list along with "shape": [rows, cols].
+algorithm is one of ALGORITHMS (A* by default) and heuristic the name of a
+function of heuristics.py (required by the algorithms that need one). timeout
+(seconds, 60 by default), deadline (an absolute time.time()) and max_nodes
+limit the search, see limits.py; "weight" is passed on to wA*.
+
+Every request gets one response line, in the order the searches finish, with
+its id and the keys of the search.py result dicts (see result_to_json), or
+{"id": ..., "error": "..."} if the request is invalid. Requests wait in a
+bounded queue: once it is full the service stops reading from the clients
+that send more, which makes them wait (backpressure) instead of piling up
+requests in memory, and so does a client that doesn't read its responses.
+Requests still queued when their connection is closed are dropped.
+'''
+from board import Board
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from node import Node
+from search_trace import TRACE_NONE, TraceWriter, solution_steps
+from typing import Optional
+import argparse
+import asyncio
+import heuristics
+import json
+import numpy as np
+import os
+import search
+
+QUEUE_SIZE = 64
+LINE_LIMIT = 1 << 20    # longest request line, in bytes
+
+# name -> (search function, whether it needs a heuristic, whether it accepts a trace)
+ALGORITHMS = {
+    'UCS': (lambda board, H, **options: search.uniform_cost(board, **options), False, True),
+    'GBF': (search.greedy_best_first, True, True),
+    'A*': (search.a_star, True, True),
+    'wA*': (search.weighted_a_star, True, True),
+    'ARA*': (search.ara_star, True, True),
+    'IDA*': (search.ida_star, True, False),
+    'BD': (search.bidirectional, None, False),
+}
+
+HEURISTICS = {H.__name__: H for H in [
+    heuristics.hamming_distance,
+    heuristics.manhattan_distance,
+    heuristics.row_col_out_of_place,
+    heuristics.euclidean_distance,
+    heuristics.permutation_inversion,
+    heuristics.pattern_database_distance,
+]}
+
+
+class RequestError(ValueError):
+    pass
+
+
+def parse_request(request: dict) -> tuple:
+    '''Returns the (board, search, H, options) of a request, raises RequestError if it is invalid.'''
+    if not isinstance(request, dict):
+        raise RequestError('a request must be a JSON object')
+
+    try:
+        puzzle = np.array(request['puzzle'], dtype=int)
+        if 'shape' in request:
+            puzzle = puzzle.reshape(tuple(request['shape']))
+    except KeyError:
+        raise RequestError('missing "puzzle"')
+    except (TypeError, ValueError) as e:
+        raise RequestError(f'invalid puzzle: {e}')
+    if puzzle.ndim != 2 or puzzle.size < 2:
+        raise RequestError('a puzzle must have rows and columns, give a flat list along with "shape"')
+
+    algorithm = request.get('algorithm', 'A*')
+    if algorithm not in ALGORITHMS:
+        raise RequestError(f'unknown algorithm "{algorithm}", expected one of {", ".join(ALGORITHMS)}')
+    func, needs_heuristic, accepts_trace = ALGORITHMS[algorithm]
+
+    name = request.get('heuristic')
+    if name is not None and name not in HEURISTICS:
+        raise RequestError(f'unknown heuristic "{name}", expected one of {", ".join(HEURISTICS)}')
+    if needs_heuristic and name is None:
+        raise RequestError(f'{algorithm} needs a heuristic')
+    H = HEURISTICS[name] if name is not None and needs_heuristic is not False else None
+
+    options = {'timeout': request.get('timeout', 60)}
+    for key in ('deadline', 'max_nodes'):
+        if request.get(key) is not None:
+            options[key] = request[key]
+    if algorithm == 'wA*' and 'weight' in request:
+        options['weight'] = request['weight']
+    if accepts_trace:
+        options['trace'] = TraceWriter(TRACE_NONE)      # expanded nodes are counted, not kept
+
+    return Board(puzzle=puzzle), func, H, options
+
+
+def result_to_json(result: dict) -> dict:
+    '''
+    The JSON form of a search.py result dict: current_node becomes its tiles
+    (row-major), cost and path from the root as [moved tile, cost, tiles]
+    steps, search_space is left empty, and the other keys are kept.
+    '''
+    node = result['current_node']
+    converted = {key: value for key, value in result.items() if key not in ('current_node', 'search_space')}
+    converted['current_node'] = {
+        'tiles': [int(tile) for tile in node.board.puzzle.flatten()],
+        'cost': int(node.total_cost),
+        'path': [[int(tile), int(cost), [int(t) for t in board.puzzle.flatten()]] for tile, cost, board in solution_steps(node)],
+    }
+    converted['search_space'] = []
+    return converted
+
+
+def solve_request(request: dict) -> dict:
+    '''Solves one request in a worker process and returns its response.'''
+    try:
+        board, func, H, options = parse_request(request)
+        response = result_to_json(func(board, H, **options))
+    except RequestError as e:
+        response = {'error': str(e)}
+    except Exception as e:      # a worker must answer whatever happened
+        response = {'error': f'{type(e).__name__}: {e}'}
+
+    response['id'] = request.get('id') if isinstance(request, dict) else None
+    return response
+
+
+def warm_worker(shapes: list, heuristic_names: list):
+    '''Process pool initializer: loads the tables of the given shapes and heuristics.'''
+    for shape in shapes:
+        goal = np.concatenate((np.arange(1, shape[0] * shape[1]), [0])).reshape(shape)
+        root = Node(is_root=True, board=Board(puzzle=goal))
+        for name in heuristic_names:
+            HEURISTICS[name](root)
+
+
+class SolverService:
+    '''
+    The asyncio server. Every connection reads request lines into the shared
+    bounded queue, from which one dispatcher per worker process sends them to
+    the pool and hands the responses to the connection they came from, whose
+    own task writes them: a client that doesn't read its responses only holds
+    up itself, and stops being read once queue_size of its requests are
+    waiting to be answered or written.
+    A worker that dies fails the requests it was given with an error response,
+    and the pool is replaced by a new (warmed up) one.
+    '''
+
+    def __init__(self, workers: int = None, queue_size: int = QUEUE_SIZE, warm_shapes: list = (), warm_heuristics: list = ()):
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.warm_shapes = [tuple(shape) for shape in warm_shapes]
+        self.warm_heuristics = list(warm_heuristics)
+        self.pool = None
+        self.queue = None
+        self.server = None
+        self.dispatchers = []
+        self.connections = set()    # tasks serving a connection
+
+    async def start(self, host: str = '127.0.0.1', port: int = 0, path: Optional[str] = None):
+        '''Starts the workers and listens on host:port (port 0: any free port), or on the Unix socket path.'''
+        self.pool = self._new_pool()
+        self.queue = asyncio.Queue(self.queue_size)
+        self.dispatchers = [asyncio.create_task(self._dispatch()) for _ in range(self.workers)]
+
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self._serve_connection, path, limit=LINE_LIMIT)
+        else:
+            self.server = await asyncio.start_server(self._serve_connection, host, port, limit=LINE_LIMIT)
+        return self
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(self.workers, initializer=warm_worker, initargs=(self.warm_shapes, self.warm_heuristics))
+
+    @property
+    def address(self):
+        '''(host, port) or Unix socket path the service listens on.'''
+        return self.server.sockets[0].getsockname()
+
+    async def serve_forever(self):
+        await self.server.serve_forever()
+
+    async def close(self):
+        '''Stops listening, drops the connections and their pending requests and stops the workers.'''
+        self.server.close()
+        tasks = self.dispatchers + list(self.connections)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.server.wait_closed()
+        self.pool.shutdown(cancel_futures=True)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _serve_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        loop = asyncio.get_running_loop()
+        responses = asyncio.Queue()     # finished responses (None for a dropped request), sent by send_responses
+        pending = asyncio.Semaphore(self.queue_size)    # requests of this connection not answered yet
+        answered = []
+        task = asyncio.current_task()
+        self.connections.add(task)
+
+        async def send_responses():
+            while True:
+                response = await responses.get()
+                try:
+                    if response is not None and not writer.is_closing():
+                        writer.write(json.dumps(response).encode() + b'\n')
+                        await writer.drain()
+                except (ConnectionError, OSError):
+                    writer.close()
+                finally:
+                    pending.release()
+                    responses.task_done()
+
+        async def respond(response: dict):
+            await pending.acquire()
+            responses.put_nowait(response)
+
+        sending = asyncio.create_task(send_responses())
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ConnectionError:
+                    break
+                except ValueError:      # longer than LINE_LIMIT
+                    await respond({'id': None, 'error': f'request lines are limited to {LINE_LIMIT} bytes'})
+                    break
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    await respond({'id': None, 'error': f'invalid JSON: {e}'})
+                    continue
+
+                await pending.acquire()     # a client that doesn't read its responses stops being read
+                done = loop.create_future()
+                answered.append(done)
+                await self.queue.put((request, writer, responses, done))    # waits while the queue is full
+
+            await asyncio.gather(*answered)
+            await responses.join()
+        except asyncio.CancelledError:     # the service is closing
+            pass
+        finally:
+            self.connections.discard(task)
+            sending.cancel()
+            writer.close()
+
+    async def _dispatch(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            request, writer, responses, done = await self.queue.get()
+            response = None
+            try:
+                if writer.is_closing():     # nobody to answer to any more
+                    continue
+                pool = self.pool
+                request_id = request.get('id') if isinstance(request, dict) else None
+                try:
+                    response = await loop.run_in_executor(pool, solve_request, request)
+                except BrokenProcessPool as e:     # a worker died (killed, out of memory, crashed)
+                    response = {'id': request_id, 'error': f'the worker solving it died: {e}'}
+                    if self.pool is pool:       # the other dispatchers of the broken pool don't replace it again
+                        self.pool = self._new_pool()
+                        pool.shutdown(wait=False)
+                except Exception as e:
+                    response = {'id': request_id, 'error': f'{type(e).__name__}: {e}'}
+            finally:
+                responses.put_nowait(response)      # never waits: the connection sends it when its client reads
+                if not done.done():
+                    done.set_result(None)
+                self.queue.task_done()
+
+
+async def query(requests: list, host: str = '127.0.0.1', port: int = None, path: str = None) -> list:
+    '''
+    Sends requests to a running service over one connection and returns the
+    responses in the order of the requests (which need distinct ids).
+    '''
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path, limit=LINE_LIMIT)
+    else:
+        reader, writer = await asyncio.open_connection(host, port, limit=LINE_LIMIT)
+
+    async def send():
+        for request in requests:
+            writer.write(json.dumps(request).encode() + b'\n')
+            await writer.drain()
+
+    sending = asyncio.create_task(send())      # responses are read meanwhile, or a full queue would block both sides
+    responses = {}
+    while len(responses) < len(requests):
+        line = await reader.readline()
+        if not line:
+            break
+        response = json.loads(line)
+        responses[response['id']] = response
+    await sending
+
+    writer.close()
+    await writer.wait_closed()
+    return [responses.get(request.get('id')) for request in requests]
+
+
+def parse_shape(text: str) -> tuple:
+    rows, cols = text.lower().split('x')
+    return int(rows), int(cols)
+
+
+async def main(argv: list = None):
+    parser = argparse.ArgumentParser(description='Serves X-puzzle searches over a socket, one JSON request or response per line.')
+    parser.add_argument('--host', default='127.0.0.1', help='address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8472, help='TCP port to listen on (default: 8472)')
+    parser.add_argument('--unix', metavar='PATH', help='listen on this Unix socket instead of TCP')
+    parser.add_argument('--workers', type=int, default=None, help='number of worker processes (default: one per core)')
+    parser.add_argument('--queue', type=int, default=QUEUE_SIZE, help=f'requests waiting for a worker before clients are made to wait (default: {QUEUE_SIZE})')
+    parser.add_argument('--warm', nargs='*', type=parse_shape, default=[], metavar='RxC', help='shapes whose tables the workers load at startup')
+    parser.add_argument('--warm-heuristics', nargs='*', choices=list(HEURISTICS), default=['manhattan_distance'],
+                        help='heuristics whose tables are loaded for the --warm shapes (default: manhattan_distance)')
+    args = parser.parse_args(argv)
+
+    service = SolverService(args.workers, args.queue, args.warm, args.warm_heuristics)
+    await service.start(args.host, args.port, args.unix)
+    print(f'listening on {service.address} with {service.workers} workers', flush=True)
+    async with service:
+        await service.serve_forever()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
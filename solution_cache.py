@@ -0,0 +1,247 @@
+'''
+Persistent cache of search results, stored in an sqlite database.
+
+Results are keyed by (shape, configuration, algorithm, heuristic, timeout
+class) and keep the moves of the solution path along with the summary of the
+result dict (runtime, visited and created nodes, success, message), so that
+solving the same board again with the same search only rebuilds the path.
+
+For optimal results (uniform cost, the oracle, or A*-like searches with an
+admissible heuristic, see is_optimal) the optimal cost to the goal and the
+next move of every configuration on the solution path are stored as well.
+uniform_cost and a_star (with either store) take the cache as cache=: when
+they generate one of those configurations, they append its known optimal path
+and put the goal reached that way in the open list like any other node, so the
+search stops as soon as it would have expanded that goal. A board that is
+itself known is answered without expanding anything else.
+
+Both tables are bounded and evict their least recently used rows, a row of
+optimal being used whenever a search follows it.
+'''
+from __future__ import annotations
+from board import Board, PackedBoard
+from moves import move_table
+from node import Node
+from typing import Optional
+import json
+import math
+import sqlite3
+import time
+
+DEFAULT_PATH = 'solution_cache.sqlite'
+MAX_RESULTS = 10000
+MAX_STATES = 200000
+
+OPTIMAL_ALGORITHMS = {'UCS', 'BD-UCS', 'ORACLE'}
+OPTIMAL_WITH_ADMISSIBLE_HEURISTIC = {'A*', 'IDA*', 'BD-A*'}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    shape TEXT, state TEXT, algo TEXT, heuristic TEXT, timeout_class TEXT,
+    moves TEXT, summary TEXT, used REAL,
+    PRIMARY KEY (shape, state, algo, heuristic, timeout_class)
+);
+CREATE TABLE IF NOT EXISTS optimal (
+    shape TEXT, state TEXT, cost_to_goal INTEGER, next_blank INTEGER, move_cost INTEGER, used REAL,
+    PRIMARY KEY (shape, state)
+);
+CREATE INDEX IF NOT EXISTS results_used ON results (used);
+CREATE INDEX IF NOT EXISTS optimal_used ON optimal (used);
+'''
+
+
+def is_optimal(algo: str, H=None) -> bool:
+    '''Whether results of algo with heuristic H are optimal: heuristics declare admissibility with an admissible attribute.'''
+    return algo in OPTIMAL_ALGORITHMS or (algo in OPTIMAL_WITH_ADMISSIBLE_HEURISTIC and getattr(H, 'admissible', False))
+
+
+def timeout_class(timeout: int) -> str:
+    '''Timeouts are grouped by powers of 2 seconds, a result found within 40s being as good as one within 60s.'''
+    if timeout <= 0:
+        return 'none'
+    return f'{2 ** math.ceil(math.log2(timeout))}s'
+
+
+def _shape(board: Board) -> str:
+    return f'{board.shape[0]}x{board.shape[1]}'
+
+
+def path_moves(node: Node) -> list:
+    '''The (blank end index, cost) of every move from the root to node.'''
+    moves = []
+    while not node.is_root:
+        moves.append((move_table(node.board.shape).index(node.end), int(node.simple_cost)))
+        node = node.parent
+    return moves[::-1]
+
+
+def replay(board: Board, moves: list, H=None) -> Node:
+    '''Rebuilds the nodes of a path from board by performing moves.'''
+    table = move_table(board.shape)
+    node = Node(is_root=True, board=board, heuristic_func=H)
+    for end, cost in moves:
+        node = node.make_child(table.positions[node.board.blank_index()], table.positions[end], cost, heuristic_func=H)
+    return node
+
+
+class SolutionCache:
+
+    def __init__(self, path: str = DEFAULT_PATH, max_results: int = MAX_RESULTS, max_states: int = MAX_STATES):
+        self.path = path
+        self.max_results = max_results
+        self.max_states = max_states
+        self.connection = sqlite3.connect(path, timeout=30)     # several worker processes may share the file
+        self.connection.executescript(SCHEMA)
+        self._known = {}        # (shape, bits) -> known_costs, loaded once
+        self._consulted = set()     # (shape, state) of the optimal rows followed since their used time was last written
+
+    def close(self):
+        self._write_consulted()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def lookup(self, board: Board, algo: str, heuristic: str = None, timeout: int = 60) -> Optional[dict]:
+        '''Returns the cached result dict of that search, with 'cached' set and an empty search_space, or None.'''
+        key = (_shape(board), board.line_representation(), algo, heuristic or '', timeout_class(timeout))
+        row = self.connection.execute('SELECT moves, summary FROM results WHERE shape=? AND state=? AND algo=? AND heuristic=? AND timeout_class=?',
+                                      key).fetchone()
+        if row is None:
+            return None
+
+        with self.connection:
+            self.connection.execute('UPDATE results SET used=? WHERE shape=? AND state=? AND algo=? AND heuristic=? AND timeout_class=?',
+                                    (time.time(),) + key)
+
+        result = json.loads(row[1])
+        result['current_node'] = replay(board, json.loads(row[0]))
+        result['search_space'] = []
+        result['cached'] = True
+        return result
+
+    def store(self, board: Board, result: dict, heuristic: str = None, timeout: int = 60, optimal: bool = False):
+        '''
+        Stores the result of a search from board. With optimal (see is_optimal),
+        the configurations of a successful result's path are stored as well.
+        '''
+        moves = path_moves(result['current_node'])
+        summary = {key: result[key] for key in ('algo', 'runtime', 'visited_nodes', 'created_nodes', 'success', 'message')}
+        now = time.time()
+
+        self._write_consulted()
+        with self.connection:
+            self.connection.execute('INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                    (_shape(board), board.line_representation(), result['algo'], heuristic or '', timeout_class(timeout),
+                                     json.dumps(moves), json.dumps(summary), now))
+            self._evict('results', self.max_results)
+
+            if optimal and result['success']:
+                self._store_path(board, moves, now)
+                self._evict('optimal', self.max_states)
+
+    def _store_path(self, board: Board, moves: list, now: float):
+        node = replay(board, moves)
+        total = node.total_cost
+        path = []
+        while node is not None:
+            path.append(node)
+            node = node.parent
+        path.reverse()
+
+        rows = []
+        for i, node in enumerate(path):
+            if i + 1 < len(path):
+                next_blank, move_cost = moves[i]
+            else:
+                next_blank, move_cost = -1, 0       # the goal
+            rows.append((_shape(board), node.board.line_representation(), total - node.total_cost, next_blank, move_cost, now))
+
+        self.connection.executemany('INSERT OR REPLACE INTO optimal VALUES (?, ?, ?, ?, ?, ?)', rows)
+        self._known = {key: known for key, known in self._known.items() if key[0] != tuple(board.shape)}
+
+    def _write_consulted(self):
+        '''Sets the used time of the optimal rows followed by complete, which searches call too often to write each time.'''
+        if self._consulted:
+            now = time.time()
+            with self.connection:
+                self.connection.executemany('UPDATE optimal SET used=? WHERE shape=? AND state=?',
+                                            [(now, shape, state) for shape, state in self._consulted])
+            self._consulted.clear()
+
+    def _evict(self, table: str, max_rows: int):
+        count = self.connection.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+        if count > max_rows:
+            self.connection.execute(f'DELETE FROM {table} WHERE rowid IN (SELECT rowid FROM {table} ORDER BY used LIMIT ?)', (count - max_rows,))
+
+    def known_costs(self, board: Board) -> dict:
+        '''
+        The configurations of board's shape whose optimal path is known, keyed
+        like board's own keys: {key: (cost to goal, next blank index, move cost)}.
+        '''
+        bits = board.bits if isinstance(board, PackedBoard) else None
+        cache_key = (tuple(board.shape), bits)
+        if cache_key not in self._known:
+            known = {}
+            for state, cost, next_blank, move_cost in self.connection.execute(
+                    'SELECT state, cost_to_goal, next_blank, move_cost FROM optimal WHERE shape=?', (_shape(board),)):
+                tiles = [int(tile) for tile in state.split()]
+                if bits is None:
+                    key = tuple(tiles)
+                else:
+                    key = 0
+                    for i, tile in enumerate(tiles):
+                        key |= tile << (i * bits)
+                known[key] = (cost, next_blank, move_cost)
+            self._known[cache_key] = known
+        return self._known[cache_key]
+
+    def complete(self, node: Node, known: dict, H=None) -> Node:
+        '''
+        Returns the goal node reached from node (whose configuration must be in
+        known, see known_costs) by following its known optimal path. The rows
+        followed count as used, their used time is written by the next store
+        or close.
+        '''
+        table = move_table(node.board.shape)
+        shape = _shape(node.board)
+        self._consulted.add((shape, node.board.line_representation()))
+        _, next_blank, move_cost = known[node.board.key()]
+        while next_blank != -1:
+            node = node.make_child(table.positions[node.board.blank_index()], table.positions[next_blank], move_cost, heuristic_func=H)
+            self._consulted.add((shape, node.board.line_representation()))
+            _, next_blank, move_cost = known[node.board.key()]
+        return node
+
+
+def cached_search(cache: SolutionCache, search, board: Board, H=None, timeout: int = 60, **kwargs) -> dict:
+    '''
+    Runs search(board, H, timeout=timeout) (without H for uniform_cost) through
+    cache: a cached result is returned if there is one, otherwise the search
+    runs (using the known optimal paths when it supports them) and its result
+    is stored. Only uniform_cost, greedy_best_first, a_star, ida_star and
+    bidirectional are cached: the results of the others (weighted_a_star,
+    ara_star) depend on weights the key doesn't hold, so they are just run.
+    '''
+    algo = {'uniform_cost': 'UCS', 'greedy_best_first': 'GBF', 'a_star': 'A*', 'ida_star': 'IDA*',
+            'bidirectional': 'BD-A*' if H is not None else 'BD-UCS'}.get(search.__name__)
+    if algo is None:
+        return search(board, H, timeout=timeout, **kwargs)
+
+    heuristic = H.__name__ if H is not None else None
+    result = cache.lookup(board, algo, heuristic, timeout)
+    if result is not None:
+        return result
+
+    if search.__name__ in ('uniform_cost', 'a_star'):
+        kwargs['cache'] = cache
+    if search.__name__ == 'uniform_cost':
+        result = search(board, timeout=timeout, **kwargs)
+    else:
+        result = search(board, H, timeout=timeout, **kwargs)
+
+    cache.store(board, result, heuristic, timeout, optimal=is_optimal(result['algo'], H))
+    return result
@@ -0,0 +1,207 @@
+'''
+Decides, before searching, whether a board can reach a goal state at all, so
+that the searches can reject impossible inputs right away instead of
+exhausting the state space or running into their timeout.
+
+For the classic 15-puzzle every move swaps the blank with a neighbour, i.e. it
+is a transposition that also moves the blank to a cell of the other colour of
+a checkerboard. The parity of the permutation plus the colour of the blank is
+therefore invariant and only half of the configurations are reachable.
+
+analyze() derives whether such an invariant exists for the move set of a
+shape (regular, wrapping and diagonal moves, see moves.py): it does if and
+only if every move joins two cells of different colours of some 2-colouring,
+i.e. if the move graph is bipartite. When it isn't, Wilson's theorem (1974)
+on sliding puzzles over 2-connected graphs that aren't cycles says that every
+permutation is reachable; the grid graphs of boards of at least 2 rows and 2
+columns other than 2x2 are such graphs. The remaining shapes (2x2 and single
+rows or columns) are settled by an exhaustive backward search from the goals
+when they are small enough, and left undecided otherwise. verify() runs that
+exhaustive search for any small shape, to check the analysis.
+
+On the boards of this repository the diagonal moves of the corners join cells
+of the same colour, so there is no invariant and the only boards rejected are
+those that aren't permutations of the tiles.
+'''
+from board import Board, PackedBoard, permutation_rank, permutation_unrank
+from functools import lru_cache
+from moves import move_table
+from typing import Optional
+import math
+import numpy as np
+
+EXHAUSTIVE_MAX_CELLS = 9    # 9! configurations take a few seconds to enumerate
+
+
+class ShapeAnalysis:
+    '''
+    What is known about the reachability of the configurations of a shape:
+
+        colours:    a 2-colouring of the cells every move respects, None if
+                    the move graph isn't bipartite (no parity invariant)
+        method:     'invariant' (decided by the parity invariant or its
+                    absence), 'exhaustive' (by enumerating the configurations
+                    that can reach a goal) or 'unknown'
+        unreachable: the ranks of the configurations that cannot reach a goal,
+                    for the exhaustive method
+    '''
+
+    def __init__(self, shape: tuple):
+        self.shape = tuple(int(x) for x in shape)
+        rows, cols = self.shape
+        self.size = rows * cols
+        self.colours = _two_colouring(self.shape)
+        self.unreachable = None
+
+        goals = [list(goal) for goal in Board(puzzle=_goal_puzzle(self.shape)).generate_goal_states()]
+        self.goal_invariants = {self._invariant(goal) for goal in goals} if self.colours is not None else None
+
+        if rows >= 2 and cols >= 2 and self.size > 4:
+            self.method = 'invariant'
+        elif self.size <= EXHAUSTIVE_MAX_CELLS:
+            self.method = 'exhaustive'
+            self.unreachable = unreachable_ranks(self.shape)
+        else:
+            self.method = 'unknown'
+
+    def _invariant(self, tiles: list) -> int:
+        return (_permutation_parity(tiles) + self.colours[tiles.index(0)]) % 2
+
+    def reachable(self, tiles: list) -> Optional[bool]:
+        '''Whether the permutation tiles (row-major) can reach a goal, None if that can't be decided.'''
+        if self.method == 'exhaustive':
+            return permutation_rank(tiles) not in self.unreachable
+        if self.method == 'unknown':
+            return None
+        if self.colours is None:
+            return True
+        return self._invariant(tiles) in self.goal_invariants
+
+    def reachable_fraction(self) -> Optional[float]:
+        '''Fraction of the configurations of the shape that can reach a goal.'''
+        if self.method == 'exhaustive':
+            return 1 - len(self.unreachable) / math.factorial(self.size)
+        if self.method == 'unknown':
+            return None
+        if self.colours is None:
+            return 1.0
+        return len(self.goal_invariants) / 2
+
+
+def _goal_puzzle(shape: tuple) -> np.array:
+    rows, cols = shape
+    return np.concatenate((np.arange(1, rows * cols), [0])).reshape(shape)
+
+
+def _two_colouring(shape: tuple) -> Optional[tuple]:
+    '''A colouring (0 or 1 per cell) such that every move joins two cells of different colours, None if there is none.'''
+    table = move_table(shape)
+    colours = [None] * table.size
+
+    for first in range(table.size):
+        if colours[first] is not None:
+            continue
+        colours[first] = 0
+        stack = [first]
+        while stack:
+            cell = stack.pop()
+            neighbours = [end for end, _ in table.all[cell]] + [start for start, _ in table.reverse[cell]]
+            for neighbour in neighbours:
+                if colours[neighbour] is None:
+                    colours[neighbour] = 1 - colours[cell]
+                    stack.append(neighbour)
+                elif colours[neighbour] == colours[cell]:
+                    return None
+
+    return tuple(colours)
+
+
+def _permutation_parity(tiles: list) -> int:
+    '''0 for an even permutation, 1 for an odd one (counted by cycles).'''
+    seen = [False] * len(tiles)
+    transpositions = 0
+    for start in range(len(tiles)):
+        length = 0
+        i = start
+        while not seen[i]:
+            seen[i] = True
+            i = tiles[i]
+            length += 1
+        if length:
+            transpositions += length - 1
+    return transpositions % 2
+
+
+def unreachable_ranks(shape: tuple) -> frozenset:
+    '''
+    Enumerates the configurations that can reach a goal with a backward search
+    from both goal states and returns the ranks of all the others.
+    '''
+    rows, cols = shape
+    size = rows * cols
+    table = move_table(shape)
+    goal = PackedBoard(_goal_puzzle(shape))
+    bits, mask = goal.bits, goal.mask
+
+    seen = set(goal.goal_keys())
+    frontier = list(seen)
+    while frontier:
+        next_frontier = []
+        for state in frontier:
+            blank = next(i for i in range(size) if (state >> (i * bits)) & mask == 0)
+            for start, _ in table.reverse[blank]:   # the blank came from start
+                tile = (state >> (start * bits)) & mask
+                previous = state ^ (tile << (start * bits)) ^ (tile << (blank * bits))
+                if previous not in seen:
+                    seen.add(previous)
+                    next_frontier.append(previous)
+        frontier = next_frontier
+
+    reached = {permutation_rank([(state >> (i * bits)) & mask for i in range(size)]) for state in seen}
+    return frozenset(set(range(math.factorial(size))) - reached)
+
+
+@lru_cache(maxsize=None)
+def analyze(shape: tuple) -> ShapeAnalysis:
+    '''Returns the (cached) reachability analysis of a shape.'''
+    return ShapeAnalysis(tuple(int(x) for x in shape))
+
+
+def verify(shape: tuple) -> bool:
+    '''Checks the analysis of a small shape against an exhaustive enumeration.'''
+    analysis = analyze(shape)
+    unreachable = unreachable_ranks(shape)
+    size = shape[0] * shape[1]
+
+    if analysis.method == 'unknown':
+        return False
+    for rank in range(math.factorial(size)):
+        tiles = permutation_unrank(rank, size)
+        if analysis.reachable(tiles) != (rank not in unreachable):
+            return False
+    return True
+
+
+def rejection(board: Board) -> Optional[str]:
+    '''
+    Returns why board can never reach a goal state, None if it can (or if
+    that can't be decided for its shape).
+    '''
+    rows, cols = board.shape
+    if not board.is_permutation():
+        return f'unsolvable: the tiles of a {rows}x{cols} board must be 0 to {rows * cols - 1}, each exactly once'
+
+    if analyze(board.shape).reachable([board.tile(i) for i in range(rows * cols)]) is False:
+        return f'unsolvable: no sequence of moves leads this {rows}x{cols} board to a goal state'
+
+    return None
+
+
+if __name__ == '__main__':
+    import sys
+    shape = (int(sys.argv[1]), int(sys.argv[2]))
+    analysis = analyze(shape)
+    print(f'{shape[0]}x{shape[1]}: parity invariant: {analysis.colours is not None}, method: {analysis.method}, '
+          f'reachable fraction: {analysis.reachable_fraction()}')
+    if shape[0] * shape[1] <= EXHAUSTIVE_MAX_CELLS:
+        print(f'exhaustive check agrees: {verify(shape)}')
@@ -0,0 +1,34 @@
+from board import Board
+from search import a_star, ara_star
+import heuristics
+import numpy as np
+
+
+def test_ara_star_converges_to_the_optimal_cost():
+    for puzzle in [[[4, 1, 7, 0], [3, 6, 2, 5]], [[3, 0, 1, 4], [2, 6, 5, 7]], [[1, 2, 3, 4], [5, 6, 7, 0]]]:
+        board = Board(puzzle=np.array(puzzle))
+        for H in [heuristics.pattern_database_distance, heuristics.manhattan_distance]:
+            result = ara_star(board, H)
+            optimal = a_star(board, H)
+            print(H.__name__, result['current_node'].total_cost, result['solutions'])
+
+            assert result['success'] and result['message'] == 'solution found'
+            assert result['current_node'].total_cost == optimal['current_node'].total_cost
+            assert result['current_node'].is_goal_state() and result['bound'] == 1
+
+            costs = [cost for cost, _, _, _ in result['solutions']]
+            bounds = [bound for _, _, bound, _ in result['solutions']]
+            assert costs == sorted(costs, reverse=True) and bounds == sorted(bounds, reverse=True)
+            assert costs[-1] == result['current_node'].total_cost
+
+
+def test_ara_star_returns_its_best_solution_on_timeout():
+    board = Board(puzzle=np.array([[15, 1, 3, 9], [2, 4, 5, 7], [10, 14, 11, 6], [13, 0, 12, 8]]))
+    result = ara_star(board, heuristics.manhattan_distance, timeout=1)
+    print(result['message'], result['solutions'])
+
+    assert result['success'] and result['message'].startswith('timeout')
+    assert result['current_node'].is_goal_state()
+    assert result['current_node'].total_cost == result['solutions'][-1][0]
+    assert 1 < result['bound'] <= 3
+    assert not a_star(board, heuristics.manhattan_distance, timeout=1)['success']
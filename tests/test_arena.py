@@ -0,0 +1,52 @@
+from arena import ArenaNode, ArenaSearchSpace, NodeArena
+from node import Node
+from board import Board, PackedBoard
+from search import uniform_cost, greedy_best_first, a_star, generate_search_string
+import heuristics
+import numpy as np
+
+
+def test_arena_columns():
+    board = PackedBoard(np.array([[1, 2, 3], [4, 5, 6], [7, 0, 8]]))
+    arena = NodeArena(board.shape)
+    root = arena.add(board.state, -1, 0, 1, board.blank, 0)
+    child = board.swap((2, 1), (2, 2))
+    child_id = arena.add(child.state, root, 1, 0, child.blank, 1)
+
+    node = arena.node(child_id)
+    print(node.board)
+    assert isinstance(node, ArenaNode) and len(arena) == 2
+    assert node.parent == arena.node(root) and node.parent.is_root and not node.is_root
+    assert node.start == (2, 1) and node.end == (2, 2)
+    assert node.board == child and node.is_goal_state()
+    assert (node.g_n, node.h_n, node.f_n, node.total_cost, node.simple_cost) == (1, 0, 1, 1, 1)
+    assert node.generate_solution_string('A*') == '0 0 1 2 3 4 5 6 7 0 8\n8 1 1 2 3 4 5 6 7 8 0\n'
+
+    children = node.successors(heuristics.manhattan_distance)
+    expected = Node(is_root=True, board=child).successors(heuristics.manhattan_distance)
+    assert sorted(c.board.key() for c in children) == sorted(c.board.key() for c in expected)
+    assert all(type(c) is Node and c.parent is node and c.total_cost == 1 + c.simple_cost for c in children)
+
+
+def test_arena_search_matches_nodes():
+    boards = [Board(puzzle=np.array([[3, 0, 1, 4], [2, 6, 5, 7]])), Board(puzzle=np.array([[8, 1, 3], [4, 0, 2], [7, 6, 5]]))]
+    searches = [
+        (uniform_cost, {}),
+        (greedy_best_first, {'H': heuristics.manhattan_distance}),
+        (a_star, {'H': heuristics.manhattan_distance}),
+        (a_star, {'H': heuristics.row_col_out_of_place}),
+    ]
+
+    for board in boards:
+        for search, kwargs in searches:
+            expected = search(board, **kwargs)
+            actual = search(board, store='arena', **kwargs)
+            print(f"{actual['algo']}: {actual['visited_nodes']} visited, {actual['created_nodes']} created")
+
+            assert isinstance(actual['current_node'], ArenaNode)
+            assert isinstance(actual['search_space'], ArenaSearchSpace) and len(actual['search_space']) == len(expected['search_space'])
+            for key in ['algo', 'visited_nodes', 'created_nodes', 'success', 'message']:
+                assert actual[key] == expected[key]
+            assert actual['current_node'].total_cost == expected['current_node'].total_cost
+            assert generate_search_string(actual['search_space'], actual['algo']) == generate_search_string(expected['search_space'], expected['algo'])
+            assert actual['current_node'].generate_solution_string(actual['algo']) == expected['current_node'].generate_solution_string(expected['algo'])
@@ -0,0 +1,38 @@
+import benchmark
+import copy
+import heuristics
+import numpy as np
+
+
+def test_corpus_is_reproducible():
+    first = benchmark.load_corpus()
+    second = benchmark.load_corpus()
+    print(f'{len(first)} instances')
+
+    assert [name for name, _ in first] == [name for name, _ in second]
+    assert all(np.array_equal(a, b) for (_, a), (_, b) in zip(first, second))
+    assert {puzzle.shape for _, puzzle in first} == {(2, 4), (3, 3), (4, 4)}
+    assert len(benchmark.load_corpus(quick=True)) < len(first)
+
+
+def test_run_and_compare():
+    corpus = [(name, puzzle) for name, puzzle in benchmark.load_corpus(quick=True) if name in ('input-1', 'walk3x3-20-1')]
+    chosen = benchmark.pairs(['A*', 'BD'], ['manhattan_distance'])
+    assert [(name, H) for name, _, H in chosen] == [('A*', heuristics.manhattan_distance), ('BD', None), ('BD', heuristics.manhattan_distance)]
+    assert [(name, H) for name, _, H in benchmark.pairs(['wA*'], ['hamming_distance'])] == [('wA*', heuristics.hamming_distance)]
+
+    report = benchmark.run_benchmark(corpus, chosen, timeout=10, memory=True, log=None)
+    assert len(report['runs']) == 6
+    for run in report['runs']:
+        print(run)
+        assert run['success'] and run['expanded'] > 0 and run['peak_memory'] > 0
+
+    slower = copy.deepcopy(report)
+    slower['runs'][0]['wall_time'] *= 2
+    slower['runs'][1]['cost'] += 1
+
+    rows = benchmark.compare(report, slower)
+    assert len(rows) == 6
+    assert rows[0]['time_ratio'] == 2 and rows[0]['changed'] == []
+    assert rows[1]['changed'] == ['cost']
+    assert all(not row['changed'] for row in benchmark.compare(report, report))
@@ -0,0 +1,61 @@
+from board import Board
+from search import a_star, best_first, greedy_best_first, uniform_cost, weighted_a_star
+import heuristics
+import numpy as np
+import pytest
+
+puzzles = [np.array([[4, 1, 7, 0], [3, 6, 2, 5]]), np.array([[3, 0, 1, 4], [2, 6, 5, 7]]), np.array([[1, 0, 3], [7, 2, 5], [4, 8, 6]])]
+
+
+def expanded(result) -> list:
+    return [node.board.line_representation() for node in result['search_space']]
+
+
+def test_wrappers_are_the_engine():
+    board = Board(puzzle=puzzles[1])
+    H = heuristics.manhattan_distance
+    for wrapped, direct in [(uniform_cost(board), best_first(board, None, lambda g, h: g, 'unless_costlier', 'UCS')),
+                            (greedy_best_first(board, H), best_first(board, H, lambda g, h: h, 'never', 'GBF')),
+                            (a_star(board, H), best_first(board, H))]:
+        print(wrapped['algo'], wrapped['visited_nodes'], direct['visited_nodes'])
+        assert expanded(wrapped) == expanded(direct)
+        assert wrapped['created_nodes'] == direct['created_nodes'] and wrapped['algo'] == direct['algo']
+
+
+def test_weighted_a_star_trades_cost_for_expansions():
+    H = heuristics.pattern_database_distance
+    for puzzle in puzzles:
+        board = Board(puzzle=puzzle)
+        optimal = a_star(board, H)
+        cost = optimal['current_node'].total_cost
+        assert weighted_a_star(board, H, weight=1, prefer=None)['current_node'].total_cost == cost
+
+        for weight in [1.5, 2, 5]:
+            result = weighted_a_star(board, H, weight=weight)
+            arena = weighted_a_star(board.pack(), H, weight=weight, store='arena')
+            print(weight, result['current_node'].total_cost, cost, result['visited_nodes'], optimal['visited_nodes'])
+
+            assert result['success'] and result['algo'] == 'wA*'
+            assert cost <= result['current_node'].total_cost <= weight * cost
+            assert arena['visited_nodes'] == result['visited_nodes'] and arena['current_node'].total_cost == result['current_node'].total_cost
+
+
+def test_tie_breaking_preferences_keep_a_star_optimal():
+    H = heuristics.pattern_database_distance
+    for puzzle in puzzles:
+        board = Board(puzzle=puzzle)
+        cost = a_star(board, H)['current_node'].total_cost
+        for prefer in ['high_g', 'low_h']:
+            result = a_star(board, H, prefer=prefer)
+            print(prefer, result['visited_nodes'])
+            assert result['current_node'].total_cost == cost
+
+
+def test_invalid_parameters_are_rejected():
+    board = Board(puzzle=puzzles[0])
+    with pytest.raises(ValueError):
+        best_first(board, reopen='always')
+    with pytest.raises(ValueError):
+        a_star(board, heuristics.hamming_distance, prefer='low_g')
+    with pytest.raises(ValueError):
+        weighted_a_star(board, heuristics.hamming_distance, weight=0.5)
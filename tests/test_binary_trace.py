@@ -0,0 +1,46 @@
+from board import Board
+from search import a_star, uniform_cost, generate_search_string, write_results_to_disk, result_paths
+import binary_trace
+import heuristics
+import numpy as np
+import os
+import search_trace
+
+
+def test_text_round_trip(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('results')
+
+    for board in [Board(puzzle=np.array([[3, 0, 1, 4], [2, 6, 5, 7]])), Board(puzzle=np.array([[8, 1, 3], [4, 0, 2], [7, 6, 5]]))]:
+        result = a_star(board, heuristics.manhattan_distance)
+        solution_str = result['current_node'].generate_solution_string(result['algo'])
+        search_str = generate_search_string(result['search_space'], result['algo'])
+
+        write_results_to_disk(solution_str, search_str, result['algo'], 0, 'h1', fmt='binary', shape=board.shape)
+        solution_path, search_path = result_paths(result['algo'], 0, 'h1', fmt='binary')
+
+        print(f'{board.shape}: {len(search_str)} bytes of text, {os.path.getsize(search_path)} bytes of records')
+        assert binary_trace.count_records(search_path) == len(result['search_space'])
+        assert binary_trace.TraceFile(search_path).to_text() == search_str
+        assert binary_trace.TraceFile(solution_path).to_text() == solution_str
+        assert os.path.getsize(search_path) < len(search_str)
+
+
+def test_streamed_binary_trace(tmp_path):
+    board = Board(puzzle=np.array([[4, 1, 7, 0], [3, 6, 2, 5]]))
+    in_memory = uniform_cost(board)
+
+    search_path, solution_path = str(tmp_path / 'search.bin'), str(tmp_path / 'solution.bin')
+    with search_trace.TraceWriter(search_trace.TRACE_FULL, search_path, solution_path, fmt='binary', shape=board.shape) as trace:
+        result = uniform_cost(board.pack(), trace=trace)
+        trace.solution(result['current_node'], result['algo'])
+
+    trace_file = binary_trace.TraceFile(search_path)
+    assert trace_file.shape == (2, 4)
+    assert len(trace_file) == len(in_memory['search_space'])
+    assert trace_file.to_text() == generate_search_string(in_memory['search_space'], 'UCS')
+    assert binary_trace.TraceFile(solution_path).to_text() == in_memory['current_node'].generate_solution_string('UCS')
+
+    text_path = binary_trace.convert_to_text(solution_path)
+    assert text_path.endswith('solution.txt')
+    assert open(text_path).read() == in_memory['current_node'].generate_solution_string('UCS')
@@ -1,4 +1,4 @@
-from board import Board
+from board import Board, PackedBoard
 import numpy as np
 
 def test_is_goal_state():
@@ -386,3 +386,46 @@ def test_move_row_out_of_bounds():  # numpy indices characterization test
         assert True
 
     assert True, 'Assertion not caught'
+
+
+def test_packed_board():
+    print()
+    print(35*"=")
+    print("Testing packed boards")
+    print(35*"=")
+
+    puzzles = [
+        np.array([[7, 0, 1, 6], [2, 5, 3, 4]]),
+        np.array([[4, 1, 7], [3, 0, 2], [6, 5, 8]]),
+        np.array([[1, 2, 3, 4], [5, 6, 0, 7], [33, 44, 55, 66], [11, 22, 77, 88]]),
+    ]
+
+    for puzzle in puzzles:
+        board = Board(puzzle=puzzle)
+        packed = PackedBoard(puzzle=puzzle)
+        print(f'\npacked puzzle\n{packed}')
+
+        assert np.array_equal(packed.puzzle, puzzle), "unpacking should give back the original puzzle"
+        assert packed.line_representation() == board.line_representation()
+        assert packed == board.pack(), "packing the same puzzle twice should give equal boards"
+        assert hash(packed) == hash(board.pack())
+
+        def move_sorter(dict_el): return dict_el['end']
+
+        expected_moves = sorted(board.generate_all_moves(), key=move_sorter)
+        actual_moves = sorted(packed.generate_all_moves(), key=move_sorter)
+
+        assert len(actual_moves) == len(expected_moves), "Number of moves generated should be equal"
+        for i in range(len(actual_moves)):
+            assert actual_moves[i]["start"] == expected_moves[i]["start"],              "start position should be equal"
+            assert actual_moves[i]["end"] == expected_moves[i]["end"],                  "end position should be equal"
+            assert actual_moves[i]["simple_cost"] == expected_moves[i]["simple_cost"],  "simple_cost should be equal"
+            assert isinstance(actual_moves[i]["board"], PackedBoard),                   "children of a packed board should be packed"
+            assert np.array_equal(actual_moves[i]["board"].puzzle, expected_moves[i]["board"].puzzle)
+
+    assert PackedBoard(puzzle=np.array([[1, 2, 3, 4], [5, 6, 7, 0]])).is_goal_state()
+    assert PackedBoard(puzzle=np.array([[1, 3, 5, 7], [2, 4, 6, 0]])).is_goal_state()
+    assert not PackedBoard(puzzle=np.arange(8).reshape(2, 4)).is_goal_state()
+
+    assert PackedBoard(puzzle=np.arange(16).reshape(4, 4)).bits == 4
+    assert PackedBoard(puzzle=np.arange(25).reshape(5, 5)).bits == 5
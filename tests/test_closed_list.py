@@ -0,0 +1,69 @@
+from board import Board, PackedBoard, permutation_rank, permutation_unrank
+from closed_list import DenseClosedList, RankTable, make_closed_list
+from search import uniform_cost, greedy_best_first, a_star, generate_search_string
+import heuristics
+import math
+import numpy as np
+import pytest
+
+
+def test_board_ranks():
+    for rank in [0, 1, 5039, 20000, 40319]:
+        tiles = permutation_unrank(rank, 8)
+        board = Board(puzzle=np.array(tiles).reshape(2, 4))
+        print(rank, tiles)
+        assert board.is_permutation()
+        assert board.rank() == rank
+        assert board.pack().rank() == rank
+
+    assert not Board(puzzle=np.array([[1, 1], [2, 0]])).is_permutation()
+
+
+def test_rank_tables():
+    for size in [4, 8, 9]:
+        packed, tuples = RankTable.of(size, 4), RankTable.of(size)
+        for rank in range(0, math.factorial(size), 97):
+            tiles = permutation_unrank(rank, size)
+            state = sum(tile << (i * 4) for i, tile in enumerate(tiles))
+            assert packed.rank(state) == tuples.rank(tuple(tiles)) == permutation_rank(tiles) == rank
+        print(size, len(packed.prefix), len(packed.suffix))
+
+
+def test_dense_closed_list():
+    board = Board(puzzle=np.array([[3, 0, 1, 4], [2, 6, 5, 7]]))
+    packed = board.pack()
+
+    for key, closed in [(board.key(), make_closed_list(board)), (packed.key(), make_closed_list(packed))]:
+        assert isinstance(closed, DenseClosedList)
+        assert key not in closed and len(closed) == 0
+        with pytest.raises(KeyError):
+            closed[key]
+
+        closed[key] = 7
+        assert key in closed and closed[key] == 7 and len(closed) == 1
+        closed[key] = 3
+        assert closed[key] == 3 and len(closed) == 1
+
+        closed.add(key)
+        assert closed[key] == 3, "adding an already closed key keeps its cost"
+
+    assert isinstance(make_closed_list(board, 'hash'), dict)
+    assert isinstance(make_closed_list(board, 'hash', as_set=True), set)
+    assert isinstance(make_closed_list(Board(puzzle=np.arange(12).reshape(3, 4))), dict), "too many configurations"
+    with pytest.raises(ValueError):
+        make_closed_list(Board(puzzle=np.array([[1, 1], [2, 0]])), 'dense')
+
+
+def test_dense_search_matches_hash():
+    board = Board(puzzle=np.array([[4, 1, 7, 0], [3, 6, 2, 5]]))
+    searches = [(uniform_cost, {}), (greedy_best_first, {'H': heuristics.manhattan_distance}), (a_star, {'H': heuristics.manhattan_distance})]
+
+    for search, kwargs in searches:
+        for store in ['nodes', 'arena']:
+            expected = search(board, closed='hash', store=store, **kwargs)
+            actual = search(board, closed='dense', store=store, **kwargs)
+            print(f"{actual['algo']} ({store}): {actual['visited_nodes']} visited")
+
+            assert actual['visited_nodes'] == expected['visited_nodes']
+            assert actual['created_nodes'] == expected['created_nodes']
+            assert generate_search_string(actual['search_space'], actual['algo']) == generate_search_string(expected['search_space'], expected['algo'])
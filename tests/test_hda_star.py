@@ -0,0 +1,57 @@
+from board import Board
+from hda_star import hda_star, owner
+from search import a_star
+import heuristics
+import multiprocessing
+import numpy as np
+import pytest
+
+
+def path_cost(node) -> int:
+    cost = 0
+    while not node.is_root:
+        assert node.parent.board.swap(node.start, node.end).key() == node.board.key()
+        cost += node.simple_cost
+        node = node.parent
+    return cost
+
+
+def test_hda_star_finds_the_optimal_cost():
+    puzzles = [[[4, 1, 7, 0], [3, 6, 2, 5]], [[3, 0, 1, 4], [2, 6, 5, 7]], [[1, 0, 3], [7, 2, 5], [4, 8, 6]], [[8, 6, 7], [2, 5, 4], [3, 0, 1]]]
+    for puzzle in puzzles:
+        board = Board(puzzle=np.array(puzzle))
+        optimal = a_star(board, heuristics.pattern_database_distance)['current_node'].total_cost
+        for H, workers in [(heuristics.pattern_database_distance, 3), (None, 2)]:
+            result = hda_star(board, H, workers=workers)
+            print(puzzle, optimal, result['current_node'].total_cost, result['visited_nodes'], result['runtime'])
+
+            assert result['success'] and result['message'] == 'solution found' and result['workers'] == workers
+            assert result['current_node'].is_goal_state()
+            assert result['current_node'].total_cost == path_cost(result['current_node']) == optimal
+
+
+def test_hda_star_stops_and_rejects():
+    board = Board(puzzle=np.array([[15, 1, 3, 9], [2, 4, 5, 7], [10, 14, 11, 6], [13, 0, 12, 8]]))
+    result = hda_star(board, heuristics.manhattan_distance, workers=2, timeout=1)
+    print(result['message'], result['runtime'])
+    assert not result['success'] and result['message'] == 'timeout after 1 seconds' and result['runtime'] < 3
+
+    result = hda_star(board, heuristics.manhattan_distance, workers=2, max_nodes=2000)
+    assert not result['success'] and result['message'] == 'node limit of 2000 reached'
+
+    unsolvable = Board(puzzle=np.array([[1, 1, 2, 3], [4, 5, 6, 0]]))
+    assert hda_star(unsolvable, workers=2)['message'].startswith('unsolvable')
+
+    with multiprocessing.Pool(1) as pool:       # daemonic workers, like the ones of run.py --jobs
+        with pytest.raises(RuntimeError, match='daemonic'):
+            pool.apply(hda_star, (board, heuristics.manhattan_distance))
+
+
+def test_owner_spreads_states():
+    board = Board(puzzle=np.array([[1, 0, 3], [7, 2, 5], [4, 8, 6]])).pack()
+    counts = [0] * 3
+    for child in board.generate_all_moves():
+        for grandchild in child['board'].generate_all_moves():
+            counts[owner(grandchild['board'].state, 3)] += 1
+    print(counts)
+    assert min(counts) > 0
@@ -0,0 +1,48 @@
+from board import Board, PackedBoard
+from node import Node
+import heuristics
+import numpy as np
+
+INCREMENTAL_HEURISTICS = [
+    heuristics.manhattan_distance,
+    heuristics.hamming_distance,
+    heuristics.permutation_inversion,
+    heuristics.euclidean_distance,
+]
+
+
+def test_heuristic_values():
+    expected_values = [  # hamming, manhattan, row/col, euclidean, permutation inversion
+        (np.array([[7, 0, 1, 6], [2, 5, 3, 4]]), [7, 13, 11, 10, 24]),
+        (np.array([[4, 1, 7], [3, 0, 2], [6, 5, 8]]), [8, 8, 9, 8, 18]),
+        (np.array([[1, 3, 5, 7], [2, 4, 6, 0]]), [0, 0, 0, 0, 0]),
+    ]
+
+    for puzzle, expected in expected_values:
+        node = Node(is_root=True, board=Board(puzzle=puzzle))
+        actual = [
+            heuristics.hamming_distance(node),
+            heuristics.manhattan_distance(node),
+            heuristics.row_col_out_of_place(node),
+            heuristics.euclidean_distance(node),
+            heuristics.permutation_inversion(node),
+        ]
+        print(f'\n{puzzle}\n{actual}')
+        assert actual == expected
+
+
+def test_incremental_heuristics():
+    puzzles = [
+        Board(puzzle=np.array([[7, 0, 1, 6], [2, 5, 3, 4]])),
+        PackedBoard(puzzle=np.array([[4, 1, 7], [3, 0, 2], [6, 5, 8]])),
+        Board(puzzle=np.array([[5, 1, 2, 3], [0, 6, 7, 4], [9, 10, 11, 8], [13, 14, 15, 12]])),
+    ]
+
+    for H in INCREMENTAL_HEURISTICS:
+        for board in puzzles:
+            frontier = [Node(is_root=True, board=board, heuristic_func=H)]
+            for _ in range(3):  # compare three generations of children with a full evaluation
+                frontier = [child for node in frontier for child in node.successors(heuristic_func=H)]
+                for child in frontier:
+                    assert child.h_source is H, "children should be evaluated incrementally"
+                    assert child.h_n == H(child), f"{H.__name__} differs from a full evaluation"
@@ -0,0 +1,67 @@
+from board import Board
+from limits import MAX_BRANCHING
+from search import a_star, ara_star, bidirectional, greedy_best_first, ida_star, uniform_cost, weighted_a_star
+import heuristics
+import numpy as np
+import threading
+import time
+
+hard = Board(puzzle=np.array([[15, 1, 3, 9], [2, 4, 5, 7], [10, 14, 11, 6], [13, 0, 12, 8]]))
+H = heuristics.manhattan_distance
+
+searches = [
+    lambda board, **limits: uniform_cost(board, **limits),
+    lambda board, **limits: uniform_cost(board.pack(), store='arena', **limits),
+    lambda board, **limits: greedy_best_first(board, heuristics.hamming_distance, **limits),
+    lambda board, **limits: a_star(board, H, **limits),
+    lambda board, **limits: weighted_a_star(board, H, weight=1, **limits),
+    lambda board, **limits: ida_star(board, H, **limits),
+    lambda board, **limits: bidirectional(board, **limits),
+    lambda board, **limits: ara_star(board, H, initial_weight=1, **limits),
+]
+
+
+def slow_manhattan(n) -> int:
+    time.sleep(0.001)
+    return heuristics.manhattan_distance(n)
+
+
+def test_every_search_can_be_cancelled():
+    cancelled = threading.Event()
+    cancelled.set()
+    for search in searches:
+        result = search(hard, cancel=cancelled)
+        print(result['algo'], result['message'], result['visited_nodes'])
+        assert not result['success'] and result['message'] == 'cancelled'
+        assert result['visited_nodes'] <= 1
+
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    start = time.time()
+    result = a_star(hard, H, timeout=0, cancel=cancel)
+    assert result['message'] == 'cancelled' and time.time() - start < 1
+
+
+def test_deadlines_are_met_with_slow_heuristics():
+    for search in [lambda **limits: a_star(hard, slow_manhattan, **limits), lambda **limits: ida_star(hard, slow_manhattan, **limits)]:
+        start = time.time()
+        result = search(timeout=0.3)
+        overrun = time.time() - start - 0.3
+        print(result['algo'], result['message'], result['visited_nodes'], f'{overrun:.3f}s late')
+        assert result['message'] == 'timeout after 0.3 seconds' and overrun < 0.1
+
+        start = time.time()
+        result = search(deadline=start + 0.3, timeout=60)
+        assert result['message'] == 'deadline reached' and time.time() - start < 0.4
+
+
+def test_node_limit_bounds_memory():
+    for search in searches:
+        result = search(hard, max_nodes=2000)
+        print(result['algo'], result['message'], result['visited_nodes'])
+        if result['algo'] != 'IDA*':        # only holds the current path
+            assert result['message'] == 'node limit of 2000 reached'
+
+    result = a_star(hard, H, max_nodes=2000, profile=True)
+    profile = result['profile']
+    assert profile['peak_open'] + profile['peak_closed'] <= 2000 + 2 * MAX_BRANCHING
@@ -0,0 +1,25 @@
+from moves import move_table, REGULAR_COST, WRAPPING_COST, DIAGONAL_COST
+
+
+def test_move_table_2x4():
+    table = move_table((2, 4))
+
+    assert table is move_table((2, 4)), "tables should be built once per shape"
+    assert table.positions[5] == (1, 1)
+
+    # blank at the top-left corner: down, right, wrap left, two diagonals
+    assert table.all[0] == ((4, REGULAR_COST), (1, REGULAR_COST), (3, WRAPPING_COST), (5, DIAGONAL_COST), (7, DIAGONAL_COST))
+
+    # blank in the middle of a 2-row board: no wrapping or diagonal moves
+    assert table.wrapping[5] == () and table.diagonal[5] == ()
+    assert sorted(table.regular[5]) == [(1, 1), (4, 1), (6, 1)]
+
+
+def test_move_table_reverse():
+    for shape in [(2, 4), (3, 3), (4, 4)]:
+        table = move_table(shape)
+        for start in range(table.size):
+            for end, cost in table.all[start]:
+                assert (start, cost) in table.reverse[end], "every move should be in the reverse table"
+
+        assert sum(len(moves) for moves in table.all) == sum(len(moves) for moves in table.reverse)
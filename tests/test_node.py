@@ -68,3 +68,24 @@ def test_successors():
         assert moves.total_cost == expected_child_results[index]["total_cost"], "The costs are not matching!"
         assert np.array_equal(moves.board.puzzle, expected_child_results[index]["board"].puzzle)
         index += 1
+
+
+def test_lazy_successors():
+    b = Board(puzzle=np.array([[0, 1, 3, 4], [5, 6, 7, 8]]))
+    root = Node(parent=None, board=b, is_root=True)
+
+    eager = root.successors()
+    lazy = list(root.successor_moves())
+
+    assert len(eager) == len(lazy), "the root has no inverse move to skip"
+    for child, (start, end, cost) in zip(eager, lazy):
+        assert (child.start, child.end, child.simple_cost) == (start, end, cost)
+        assert b.swapped_key(start, end) == child.board.key(), "the key should be computed without building the board"
+        assert np.array_equal(root.make_child(start, end, cost).board.puzzle, child.board.puzzle)
+
+    child = root.make_child(*lazy[0])
+    grandchildren = [child.make_child(*move) for move in child.successor_moves()]
+
+    assert len(grandchildren) == len(child.successors()) - 1, "only the inverse move should be skipped"
+    for grandchild in grandchildren:
+        assert grandchild.board.key() != b.key(), "the inverse move should not be generated"
@@ -0,0 +1,70 @@
+from open_list import BucketQueue, HeapQueue, IndexedOpenList, make_open_list
+import pytest
+
+
+def drain(open_list) -> list:
+    items = []
+    while not open_list.empty():
+        items.append(open_list.get())
+    return items
+
+
+def test_bucket_queue_matches_heap():
+    entries = [(3, 'a'), (1, 'b'), (3, 'c'), (0, 'd'), (1, 'e'), (7, 'f'), (3, 'g')]
+
+    for tie_breaking in ['fifo', 'lifo']:
+        bucket = make_open_list('bucket', tie_breaking)
+        heap = make_open_list('heap', tie_breaking)
+        for priority, item in entries:
+            bucket.put(priority, item)
+            heap.put(priority, item)
+
+        assert len(bucket) == len(heap) == len(entries)
+        assert drain(bucket) == drain(heap)
+
+
+def test_bucket_queue_order():
+    queue = BucketQueue()
+    queue.put(5, 'a')
+    queue.put(2, 'b')
+    assert queue.get() == (2, 'b')
+
+    queue.put(1, 'c')  # lower than the last popped priority (e.g. greedy best first)
+    queue.put(1, 'd')
+    assert queue.get() == (1, 'c')
+    assert queue.get() == (1, 'd')
+    assert queue.get() == (5, 'a')
+
+    with pytest.raises(IndexError):
+        queue.get()
+
+
+def test_bucket_queue_falls_back_to_heap():
+    for lifo in [False, True]:
+        queue = BucketQueue(lifo=lifo)
+        heap = HeapQueue(lifo=lifo)
+        for priority, item in [(2, 'a'), (1, 'b'), (2, 'c'), (1.5, 'd'), (1, 'e'), (2, 'f')]:
+            queue.put(priority, item)
+            heap.put(priority, item)
+
+        assert queue.heap is not None, "a non integer priority should switch to a heap"
+        assert drain(queue) == drain(heap)
+
+
+def test_indexed_open_list():
+    open_list = IndexedOpenList(make_open_list('bucket'))
+
+    assert open_list.put(10, 'first copy', key='state', g=8)
+    assert not open_list.put(11, 'more expensive copy', key='state', g=9), "dominated copies should be dropped"
+    assert open_list.dominated('state', 8)
+    assert not open_list.dominated('state', 7)
+
+    assert open_list.put(9, 'cheaper copy', key='state', g=7), "cheaper copies should replace the open one"
+    assert open_list.put(12, 'other', key='other state', g=3)
+    assert len(open_list) == 2
+    assert open_list.stale == 1
+
+    assert open_list.get() == (9, 'cheaper copy')
+    assert open_list.get() == (12, 'other'), "the invalidated copy should be skipped"
+    assert open_list.empty()
+    assert open_list.stale == 0
@@ -0,0 +1,63 @@
+from oracle import DistanceOracle
+from search import a_star, bidirectional
+from board import Board, PackedBoard, permutation_rank, permutation_unrank
+from node import Node
+import itertools
+import numpy as np
+import os
+import pytest
+
+
+def test_permutation_rank():
+    for size in range(1, 6):
+        for rank, permutation in enumerate(itertools.permutations(range(size))):
+            assert permutation_rank(permutation) == rank, "ranks should follow the lexicographic order"
+            assert permutation_unrank(rank, size) == list(permutation)
+
+
+def test_distance_oracle(tmp_path):
+    path = str(tmp_path / '2x4.oracle')
+    DistanceOracle.build((2, 4)).save(path)
+    oracle = DistanceOracle.load(path)
+
+    assert isinstance(oracle.costs, np.memmap), "tables should be memory-mapped"
+    assert oracle.cost(Board(puzzle=np.array([[1, 2, 3, 4], [5, 6, 7, 0]]))) == 0
+    assert oracle.cost(Board(puzzle=np.array([[1, 3, 5, 7], [2, 4, 6, 0]]))) == 0
+
+    puzzles = [
+        np.array([[7, 0, 1, 6], [2, 5, 3, 4]]),
+        np.array([[4, 1, 7, 0], [3, 6, 2, 5]]),
+        np.array([[3, 0, 1, 4], [2, 6, 5, 7]]),
+    ]
+
+    for puzzle in puzzles:
+        board = PackedBoard(puzzle=puzzle)
+        optimal_cost = bidirectional(board)["current_node"].total_cost
+
+        result = oracle.solve(board)
+        print(result["current_node"].generate_solution_string('oracle'))
+        assert result["success"]
+        assert result["current_node"].is_goal_state(), "The board could not be solved!"
+        assert result["current_node"].total_cost == oracle.cost(board) == optimal_cost
+
+        result = a_star(board, oracle)  # the oracle is a perfect heuristic
+        assert result["current_node"].total_cost == optimal_cost
+
+
+def test_save_replaces_the_file_whole(tmp_path, monkeypatch):
+    oracle = DistanceOracle.build((2, 3))
+    path = str(tmp_path / '2x3.oracle')
+    oracle.save(path)
+    size = os.path.getsize(path)
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+    monkeypatch.setattr(np, 'ascontiguousarray', fail)
+    with pytest.raises(OSError):
+        oracle.save(path)
+    monkeypatch.undo()
+
+    print(os.listdir(tmp_path))
+    assert os.listdir(tmp_path) == ['2x3.oracle'], "no temporary file is left behind"
+    assert os.path.getsize(path) == size, "a failed save leaves the previous file as it was"
+    assert (DistanceOracle.load(path).costs == oracle.costs).all()
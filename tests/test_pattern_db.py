@@ -0,0 +1,61 @@
+from pattern_db import PatternDatabase, default_patterns
+from search import a_star, bidirectional
+from board import Board
+from node import Node
+import numpy as np
+import os
+import pytest
+
+
+def test_default_patterns():
+    assert default_patterns((2, 4)) == [(1, 2, 3, 4), (5, 6, 7)]
+    assert default_patterns((3, 3), max_size=3) == [(1, 2, 3), (4, 5, 6), (7, 8)]
+
+
+def test_pattern_database(tmp_path):
+    database = PatternDatabase.build((2, 4))
+    path = str(tmp_path / '2x4.pdb')
+    database.save(path)
+    loaded = PatternDatabase.load(path)
+
+    assert loaded.patterns == database.patterns
+    assert isinstance(loaded.tables[0][0], np.memmap), "tables should be memory-mapped"
+
+    goals = [np.array([[1, 2, 3, 4], [5, 6, 7, 0]]), np.array([[1, 3, 5, 7], [2, 4, 6, 0]])]
+    for goal in goals:
+        assert loaded(Node(is_root=True, board=Board(puzzle=goal))) == 0
+
+    puzzles = [
+        np.array([[7, 0, 1, 6], [2, 5, 3, 4]]),
+        np.array([[4, 1, 7, 0], [3, 6, 2, 5]]),
+        np.array([[3, 0, 1, 4], [2, 6, 5, 7]]),
+    ]
+
+    for puzzle in puzzles:
+        board = Board(puzzle=puzzle)
+        h = loaded(Node(is_root=True, board=board))
+        optimal_cost = bidirectional(board)["current_node"].total_cost
+        print(f'\n{board}\nh = {h}, optimal cost = {optimal_cost}')
+
+        assert h == database(Node(is_root=True, board=board))
+        assert 0 < h <= optimal_cost, "the heuristic should be admissible"
+        assert a_star(board, loaded)["current_node"].total_cost == optimal_cost
+
+
+def test_save_replaces_the_file_whole(tmp_path, monkeypatch):
+    database = PatternDatabase.build((2, 3))
+    path = str(tmp_path / '2x3.pdb')
+    database.save(path)
+    size = os.path.getsize(path)
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+    monkeypatch.setattr(np, 'ascontiguousarray', fail)
+    with pytest.raises(OSError):
+        database.save(path)
+    monkeypatch.undo()
+
+    print(os.listdir(tmp_path))
+    assert os.listdir(tmp_path) == ['2x3.pdb'], "no temporary file is left behind"
+    assert os.path.getsize(path) == size, "a failed save leaves the previous file as it was"
+    assert PatternDatabase.load(path).patterns == database.patterns
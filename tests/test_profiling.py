@@ -0,0 +1,43 @@
+from board import Board
+from search import uniform_cost, greedy_best_first, a_star
+import heuristics
+import numpy as np
+import profiling
+
+
+def test_profile_entry():
+    board = Board(puzzle=np.array([[4, 1, 7, 0], [3, 6, 2, 5]]))
+    searches = [(uniform_cost, {}), (greedy_best_first, {'H': heuristics.manhattan_distance}), (a_star, {'H': heuristics.manhattan_distance}),
+                (a_star, {'H': heuristics.row_col_out_of_place})]
+
+    for search, kwargs in searches:
+        plain = search(board, **kwargs)
+        profiled = search(board, profile=True, **kwargs)
+        assert 'profile' not in plain
+
+        profile = profiled['profile']
+        phases = profile['phases']
+        print(profiled['algo'], {phase: phases[phase]['calls'] for phase in profiling.PHASES}, profile['peak_open'], profile['peak_closed'])
+
+        assert set(phases) == set(profiling.PHASES)
+        assert profiled['visited_nodes'] == plain['visited_nodes'] and profiled['created_nodes'] == plain['created_nodes']
+        assert profiled['current_node'].total_cost == plain['current_node'].total_cost
+
+        assert phases['open_push']['calls'] == profiled['created_nodes']
+        assert phases['goal_test']['calls'] == phases['open_pop']['calls']
+        assert phases['board_copy']['calls'] == profiled['created_nodes'] - 1
+        assert phases['heuristic']['calls'] == (profiled['created_nodes'] if 'H' in kwargs else 0)
+        assert profile['peak_closed'] == phases['move_generation']['calls'] - profile['re_expansions']
+        assert 0 < profile['peak_open'] <= profiled['created_nodes']
+        assert all(phase['time'] >= 0 for phase in phases.values()) and profile['other'] >= 0
+
+
+def test_profile_arena():
+    board = Board(puzzle=np.array([[3, 0, 1, 4], [2, 6, 5, 7]]))
+    nodes = a_star(board, heuristics.manhattan_distance, profile=True)['profile']
+    arena = a_star(board, heuristics.manhattan_distance, profile=True, store='arena')['profile']
+
+    for phase in ['heuristic', 'open_push', 'open_pop', 'closed_lookup']:
+        assert arena['phases'][phase]['calls'] == nodes['phases'][phase]['calls']
+    assert arena['phases']['goal_test']['calls'] == 0
+    assert (arena['peak_open'], arena['peak_closed']) == (nodes['peak_open'], nodes['peak_closed'])
@@ -0,0 +1,53 @@
+import heuristics
+import numpy as np
+import os
+import run
+import time
+
+
+def test_parallel_batch(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('results')
+
+    puzzles = [np.array([3, 0, 1, 4, 2, 6, 5, 7]), np.array([6, 3, 4, 7, 1, 2, 5, 0])]
+    jobs = run.generate_jobs(puzzles, [heuristics.manhattan_distance, heuristics.hamming_distance], use_oracle=False, timeout=60)
+    assert len(jobs) == len(puzzles) * 2 * len(run.ALGORITHMS)
+
+    serial = list(run.solve_jobs(jobs, processes=1))
+    serial_files = {name: open(os.path.join('results', name)).read() for name in os.listdir('results')}
+
+    parallel = list(run.solve_jobs(jobs, processes=2))
+    parallel_files = {name: open(os.path.join('results', name)).read() for name in os.listdir('results')}
+
+    for expected, actual in zip(serial, parallel):
+        del expected['runtime'], actual['runtime']
+        assert expected == actual, "results should come back in the same order"
+
+    assert serial_files == parallel_files
+
+
+solve_job = run.solve_job
+
+
+def hanging_job(job: dict) -> dict:
+    if job.get('hang'):
+        time.sleep(3)
+        open('late.txt', 'w').close()
+    return solve_job(job)
+
+
+def test_hung_worker_is_terminated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    os.makedirs('results')
+    monkeypatch.setattr(run, 'solve_job', hanging_job)
+    monkeypatch.setattr(run, 'TIMEOUT_GRACE', 0)
+
+    jobs = run.generate_jobs([np.array([3, 0, 1, 4, 2, 6, 5, 7])], [heuristics.manhattan_distance], use_oracle=False, timeout=1)
+    jobs.insert(0, dict(jobs[0], hang=True))
+    summaries = list(run.solve_jobs(jobs, processes=2))
+    time.sleep(3)
+    print(summaries)
+
+    assert summaries[0]['cost'] is None and not summaries[0]['success']
+    assert all(summary['success'] for summary in summaries[1:]), "the jobs of the terminated pool are solved by the new one"
+    assert not os.path.exists('late.txt'), "the hung worker is terminated"
@@ -1,5 +1,6 @@
-from search import Node, uniform_cost
-from board import Board
+from search import Node, uniform_cost, a_star, ida_star, bidirectional
+import heuristics
+from board import Board, PackedBoard
 import numpy as np
 
 def test_2x4_ufc_search():
@@ -53,3 +54,91 @@ def test_3x3_ufc_board():
         print("Solved!")
         print(result["current_node"].board)
         assert result["current_node"].is_goal_state(), "The board could not be solved!"
+
+
+def test_packed_board_search():
+    print()
+    print(35*"=")
+    print("Testing search on packed boards")
+    print(35*"=")
+
+    puzzle = np.array([
+        [7, 0, 1, 6],
+        [2, 5, 3, 4]])
+
+    expected = uniform_cost(Board(puzzle=puzzle))
+    actual = uniform_cost(PackedBoard(puzzle=puzzle))
+
+    assert actual["current_node"].is_goal_state(), "The board could not be solved!"
+    assert actual["current_node"].total_cost == expected["current_node"].total_cost
+    assert actual["current_node"].generate_solution_string('ucs') == expected["current_node"].generate_solution_string('ucs')
+
+
+def test_ida_star():
+    print()
+    print(35*"=")
+    print("Testing IDA*")
+    print(35*"=")
+
+    board = Board(puzzle=np.array([
+        [7, 0, 1, 6],
+        [2, 5, 3, 4]]))
+
+    result = ida_star(board, heuristics.manhattan_distance)
+    print(result["current_node"].generate_solution_string('ida*'))
+    assert result["success"]
+    assert result["current_node"].is_goal_state(), "The board could not be solved!"
+    assert result["current_node"].total_cost == a_star(board, heuristics.manhattan_distance)["current_node"].total_cost
+    assert result["search_space"] == [], "IDA* should not keep the expanded nodes"
+
+    near_goal = Board(puzzle=np.array([
+        [1, 2, 0, 4],
+        [5, 6, 3, 7]]))
+
+    result = ida_star(near_goal, lambda n: 0)  # without heuristic, IDA* is optimal
+    assert result["current_node"].total_cost == uniform_cost(near_goal)["current_node"].total_cost
+
+
+def test_bidirectional():
+    print()
+    print(35*"=")
+    print("Testing bidirectional search")
+    print(35*"=")
+
+    test_cases = [
+        Board(puzzle=np.array([
+            [7, 0, 1, 6],
+            [2, 5, 3, 4]])),
+        Board(puzzle=np.array([
+            [1, 3, 5, 7],
+            [2, 4, 6, 0]])),
+        PackedBoard(puzzle=np.array([
+            [4, 1, 7],
+            [3, 0, 2],
+            [6, 5, 8]]))
+    ]
+
+    for board in test_cases:
+        print("\nTesting board")
+        print(board)
+        result = bidirectional(board)
+        print(result["current_node"].generate_solution_string('bd-ucs'))
+        assert result["success"]
+        assert result["current_node"].is_goal_state(), "The board could not be solved!"
+        assert result["current_node"].total_cost == uniform_cost(board)["current_node"].total_cost, "bidirectional uniform cost should be optimal"
+
+        result = bidirectional(board, H=heuristics.manhattan_distance)
+        assert result["current_node"].is_goal_state(), "The board could not be solved!"
+
+
+def test_bidirectional_is_optimal_with_an_inconsistent_heuristic():
+    def inconsistent(node):     # admissible, but drops to 0 on most configurations
+        return heuristics.pattern_database_distance(node) if node.board.pack().state % 7 == 0 else 0
+
+    board = Board(puzzle=np.array([
+        [4, 0, 5, 1],
+        [3, 7, 2, 6]]))
+    result = bidirectional(board, H=inconsistent)
+    print(result["current_node"].total_cost, result["visited_nodes"])
+    assert result["current_node"].is_goal_state()
+    assert result["current_node"].total_cost == uniform_cost(board)["current_node"].total_cost, "configurations reached again more cheaply must be reopened"
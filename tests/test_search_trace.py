@@ -0,0 +1,43 @@
+from board import Board
+from search import uniform_cost, greedy_best_first, a_star, generate_search_string
+import heuristics
+import numpy as np
+import os
+import pytest
+import search_trace
+
+
+def test_trace_matches_search_string(tmp_path):
+    board = Board(puzzle=np.array([[3, 0, 1, 4], [2, 6, 5, 7]]))
+
+    for search, kwargs in [(uniform_cost, {}), (greedy_best_first, {'H': heuristics.manhattan_distance}), (a_star, {'H': heuristics.manhattan_distance})]:
+        in_memory = search(board, **kwargs)
+        expected_search = generate_search_string(in_memory['search_space'], in_memory['algo'])
+        expected_solution = in_memory['current_node'].generate_solution_string(in_memory['algo'])
+
+        search_path, solution_path = str(tmp_path / 'search.txt'), str(tmp_path / 'solution.txt')
+        with search_trace.TraceWriter(search_trace.TRACE_FULL, search_path, solution_path) as trace:
+            streamed = search(board, trace=trace, **kwargs)
+            trace.solution(streamed['current_node'], streamed['algo'])
+
+        print(f"{streamed['algo']} streamed {trace.expanded_nodes} lines")
+        assert streamed['search_space'] == [], "nodes should not be kept when they are streamed"
+        assert trace.expanded_nodes == len(in_memory['search_space'])
+        assert open(search_path).read() == expected_search
+        assert open(solution_path).read() == expected_solution
+
+
+def test_trace_levels(tmp_path):
+    board = Board(puzzle=np.array([[1, 2, 3, 4], [5, 6, 0, 7]]))
+
+    for level in search_trace.TRACE_LEVELS:
+        search_path, solution_path = str(tmp_path / f'{level}_search.txt'), str(tmp_path / f'{level}_solution.txt')
+        with search_trace.TraceWriter(level, search_path, solution_path) as trace:
+            result = a_star(board, heuristics.manhattan_distance, trace=trace)
+            trace.solution(result['current_node'], result['algo'])
+
+        assert os.path.exists(search_path) == (level == search_trace.TRACE_FULL)
+        assert os.path.exists(solution_path) == (level != search_trace.TRACE_NONE)
+
+    with pytest.raises(ValueError):
+        search_trace.TraceWriter('everything')
@@ -0,0 +1,107 @@
+import asyncio
+import json
+import os
+import service
+import signal
+import socket
+import time
+
+puzzle = [[1, 0, 3], [7, 2, 5], [4, 8, 6]]
+hard = [[15, 1, 3, 9], [2, 4, 5, 7], [10, 14, 11, 6], [13, 0, 12, 8]]
+
+
+async def solve(requests: list, unix_path: str = None, **options) -> list:
+    async with await service.SolverService(**options).start(path=unix_path) as solver:
+        if unix_path is not None:
+            return await service.query(requests, path=unix_path)
+        host, port = solver.address
+        return await service.query(requests, host, port)
+
+
+def test_requests_are_answered_like_search_results():
+    requests = [{'id': algorithm, 'puzzle': puzzle, 'algorithm': algorithm, 'heuristic': 'manhattan_distance'} for algorithm in service.ALGORITHMS]
+    requests.append({'id': 'flat', 'puzzle': [4, 1, 7, 0, 3, 6, 2, 5], 'shape': [2, 4], 'algorithm': 'GBF', 'heuristic': 'hamming_distance'})
+    responses = asyncio.run(solve(requests, workers=2, warm_shapes=[(3, 3)], warm_heuristics=['manhattan_distance']))
+
+    for request, response in zip(requests, responses):
+        print(response['id'], response['algo'], response['message'], response['current_node']['cost'])
+        assert response['id'] == request['id'] and response['success']
+        assert {'algo', 'current_node', 'runtime', 'visited_nodes', 'created_nodes', 'search_space', 'success', 'message'} <= set(response)
+
+        path = response['current_node']['path']
+        assert path[0] == [0, 0, sum(request['puzzle'], []) if request['id'] != 'flat' else request['puzzle']]
+        assert path[-1][2] == response['current_node']['tiles']
+        assert sum(cost for _, cost, _ in path) == response['current_node']['cost']
+
+    costs = {response['id']: response['current_node']['cost'] for response in responses}
+    assert costs['A*'] == costs['UCS'] == costs['IDA*'] == costs['BD'] == costs['ARA*']
+
+
+def test_invalid_requests_get_errors():
+    requests = [
+        {'id': 1, 'puzzle': [1, 2, 3]},
+        {'id': 2, 'puzzle': puzzle, 'algorithm': 'DFS'},
+        {'id': 3, 'puzzle': puzzle, 'algorithm': 'A*'},
+        {'id': 4, 'puzzle': puzzle, 'heuristic': 'zero'},
+        {'id': 5, 'puzzle': [[1, 1], [2, 0]], 'algorithm': 'UCS'},
+    ]
+    responses = asyncio.run(solve(requests, workers=1))
+    for response in responses:
+        print(response)
+    assert all('error' in response for response in responses[:4])
+    assert responses[4]['message'].startswith('unsolvable')
+
+
+def test_backpressure_and_limits_over_a_unix_socket(tmp_path):
+    requests = [{'id': i, 'puzzle': puzzle, 'algorithm': 'A*', 'heuristic': 'hamming_distance'} for i in range(20)]
+    requests.append({'id': 'slow', 'puzzle': hard, 'algorithm': 'UCS', 'timeout': 0.2})
+    requests.append({'id': 'late', 'puzzle': hard, 'algorithm': 'A*', 'heuristic': 'manhattan_distance', 'deadline': time.time() - 1})
+    responses = asyncio.run(solve(requests, str(tmp_path / 'solver.sock'), workers=2, queue_size=1))
+
+    assert all(response['success'] for response in responses[:20])
+    assert responses[20]['message'] == 'timeout after 0.2 seconds'
+    assert responses[21]['message'] == 'deadline reached'
+
+
+def test_a_dead_worker_is_replaced():
+    async def scenario():
+        async with await service.SolverService(workers=1).start() as solver:
+            host, port = solver.address
+            slow = asyncio.create_task(service.query([{'id': 'killed', 'puzzle': hard, 'algorithm': 'UCS', 'timeout': 30}], host, port))
+            while not solver.pool._processes:
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.5)
+            for pid in list(solver.pool._processes):
+                os.kill(pid, signal.SIGKILL)
+
+            killed = await asyncio.wait_for(slow, 10)
+            after = await asyncio.wait_for(service.query([{'id': 1, 'puzzle': puzzle, 'algorithm': 'A*', 'heuristic': 'hamming_distance'}], host, port), 10)
+            return killed + after
+
+    killed, after = asyncio.run(scenario())
+    print(killed, after['message'])
+    assert killed['id'] == 'killed' and 'died' in killed['error']
+    assert after['id'] == 1 and after['success']
+
+
+def test_a_client_that_does_not_read_only_holds_up_itself():
+    async def scenario():
+        async with await service.SolverService(workers=1).start() as solver:
+            host, port = solver.address
+            sock = socket.socket()
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+            sock.connect((host, port))
+            sock.setblocking(False)
+            _, stalled = await asyncio.open_connection(sock=sock)
+            request = json.dumps({'puzzle': list(range(1, 2500)) + [0], 'shape': [50, 50], 'algorithm': 'UCS'}).encode() + b'\n'
+            for _ in range(300):    # megabytes of responses, far more than the socket buffers hold
+                stalled.write(request)
+            await asyncio.sleep(1)
+
+            answered = await asyncio.wait_for(service.query([{'id': 1, 'puzzle': puzzle, 'algorithm': 'A*', 'heuristic': 'hamming_distance'}], host, port), 10)
+            stalled.close()
+            return answered
+
+    answered, = asyncio.run(scenario())
+    print(answered['message'])
+    assert answered['id'] == 1 and answered['success']
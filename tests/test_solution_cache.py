@@ -0,0 +1,90 @@
+from board import Board
+from search import uniform_cost, a_star, bidirectional, greedy_best_first, weighted_a_star
+from solution_cache import SolutionCache, cached_search, is_optimal, timeout_class
+import heuristics
+import numpy as np
+
+
+def test_lookup_rebuilds_the_stored_solution(tmp_path):
+    board = Board(puzzle=np.array([[3, 0, 1, 4], [2, 6, 5, 7]]))
+    with SolutionCache(str(tmp_path / 'cache.sqlite')) as cache:
+        assert cache.lookup(board, 'GBF', 'manhattan_distance') is None
+
+        result = cached_search(cache, greedy_best_first, board, heuristics.manhattan_distance)
+        cached = cached_search(cache, greedy_best_first, board, heuristics.manhattan_distance)
+        print(result['message'], result['visited_nodes'], cached['visited_nodes'])
+
+        assert cached['cached'] and 'cached' not in result
+        assert cached['search_space'] == []
+        for key in ('algo', 'visited_nodes', 'created_nodes', 'success', 'message'):
+            assert cached[key] == result[key]
+        assert cached['current_node'].generate_solution_string('gbf') == result['current_node'].generate_solution_string('gbf')
+
+        assert cache.lookup(board, 'GBF', 'hamming_distance') is None
+        assert cache.lookup(board, 'GBF', 'manhattan_distance', timeout=10) is None
+        assert cache.lookup(board, 'GBF', 'manhattan_distance', timeout=40) is not None     # same timeout class as 60s
+        assert timeout_class(0) == 'none' and timeout_class(60) == timeout_class(64) == '64s'
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    boards = [Board(puzzle=np.array(p)) for p in ([[3, 0, 1, 4], [2, 6, 5, 7]], [[4, 1, 7, 0], [3, 6, 2, 5]], [[1, 2, 3, 4], [5, 6, 0, 7]])]
+    with SolutionCache(str(tmp_path / 'cache.sqlite'), max_results=2) as cache:
+        for board in boards[:2]:
+            cached_search(cache, greedy_best_first, board, heuristics.hamming_distance)
+        cache.lookup(boards[0], 'GBF', 'hamming_distance')
+        cached_search(cache, greedy_best_first, boards[2], heuristics.hamming_distance)
+
+        assert cache.lookup(boards[0], 'GBF', 'hamming_distance') is not None
+        assert cache.lookup(boards[1], 'GBF', 'hamming_distance') is None
+        assert cache.lookup(boards[2], 'GBF', 'hamming_distance') is not None
+
+
+def test_known_optimal_paths_stop_searches_early(tmp_path):
+    assert is_optimal('UCS') and is_optimal('A*', heuristics.pattern_database_distance)
+    assert not is_optimal('A*', heuristics.manhattan_distance) and not is_optimal('GBF', heuristics.pattern_database_distance)
+
+    solved = Board(puzzle=np.array([[4, 1, 7, 0], [3, 6, 2, 5]]))
+    with SolutionCache(str(tmp_path / 'cache.sqlite')) as cache:
+        result = cached_search(cache, uniform_cost, solved)
+
+        board = Board(puzzle=np.array([[0, 1, 7, 4], [3, 6, 2, 5]]))   # a wrapping move away, its searches reach the cached path
+        for search, args in [(uniform_cost, ()), (a_star, (heuristics.pattern_database_distance,))]:
+            for store in ('nodes', 'arena'):
+                plain = search(board, *args, store=store)
+                early = search(board, *args, store=store, cache=cache)
+                print(plain['algo'], store, plain['current_node'].total_cost, plain['visited_nodes'], early['visited_nodes'])
+                assert early['success'] and early['current_node'].total_cost == plain['current_node'].total_cost
+                assert early['current_node'].is_goal_state()
+                assert early['visited_nodes'] < plain['visited_nodes']
+
+        for board in [solved, solved.pack()]:
+            for store in ('nodes', 'arena'):
+                early = uniform_cost(board, store=store, cache=cache)
+                assert early['visited_nodes'] == 1 and early['current_node'].total_cost == result['current_node'].total_cost
+                assert early['current_node'].generate_solution_string('ucs') == result['current_node'].generate_solution_string('ucs')
+
+
+def test_followed_optimal_paths_are_evicted_last(tmp_path):
+    boards = [Board(puzzle=np.array(puzzle)) for puzzle in [[[4, 1, 7, 0], [3, 6, 2, 5]], [[3, 0, 1, 4], [2, 6, 5, 7]], [[1, 2, 3, 4], [5, 6, 0, 7]]]]
+    path = str(tmp_path / 'cache.sqlite')
+    with SolutionCache(path) as cache:
+        for board in boards[:2]:
+            cached_search(cache, uniform_cost, board)
+        states = cache.connection.execute('SELECT COUNT(*) FROM optimal').fetchone()[0]
+        assert uniform_cost(boards[0], cache=cache)['visited_nodes'] == 1     # follows the path of the first board
+
+    with SolutionCache(path, max_states=states) as cache:
+        cached_search(cache, uniform_cost, boards[2])
+        assert boards[0].pack().state in cache.known_costs(boards[0].pack())
+        assert boards[1].pack().state not in cache.known_costs(boards[1].pack()), "the second path, never followed, goes first"
+
+
+def test_only_searches_keyed_completely_are_cached(tmp_path):
+    board = Board(puzzle=np.array([[3, 0, 1, 4], [2, 6, 5, 7]]))
+    with SolutionCache(str(tmp_path / 'cache.sqlite')) as cache:
+        result = cached_search(cache, bidirectional, board)
+        assert cached_search(cache, bidirectional, board)['cached'] and result['algo'] == 'BD-UCS'
+
+        result = cached_search(cache, weighted_a_star, board, heuristics.manhattan_distance)
+        assert 'cached' not in cached_search(cache, weighted_a_star, board, heuristics.manhattan_distance)
+        assert cache.lookup(board, result['algo'], 'manhattan_distance') is None
@@ -0,0 +1,34 @@
+from board import Board, PackedBoard, permutation_unrank
+from search import uniform_cost, a_star, ida_star, bidirectional
+import heuristics
+import numpy as np
+import solvability
+
+
+def test_analysis_matches_exhaustive_search():
+    for shape in [(2, 2), (2, 3), (3, 2), (1, 4), (1, 5), (2, 4)]:
+        analysis = solvability.analyze(shape)
+        print(f'{shape}: invariant {analysis.colours is not None}, {analysis.method}, {analysis.reachable_fraction()} reachable')
+        assert solvability.verify(shape)
+
+    assert solvability.analyze((3, 3)).colours is None, "diagonal moves break the parity invariant"
+    assert solvability.analyze((4, 4)).reachable_fraction() == 1.0
+    assert solvability.analyze((1, 4)).reachable_fraction() == 0.5
+    assert solvability.analyze((1, 12)).method == 'unknown'
+
+
+def test_searches_reject_impossible_boards():
+    duplicated = Board(puzzle=np.array([[1, 1, 2, 3], [4, 5, 6, 0]]))
+    assert solvability.rejection(duplicated).startswith('unsolvable')
+    assert solvability.rejection(Board(puzzle=np.array([[3, 0, 1, 4], [2, 6, 5, 7]]))) is None
+
+    analysis = solvability.analyze((1, 5))
+    unreachable = Board(puzzle=np.array(permutation_unrank(min(analysis.unreachable), 5)).reshape(1, 5))
+    assert solvability.rejection(unreachable.pack()) is not None
+
+    for board in [duplicated, duplicated.pack(), unreachable]:
+        for result in [uniform_cost(board), a_star(board, heuristics.manhattan_distance), ida_star(board, heuristics.hamming_distance),
+                       bidirectional(board)]:
+            print(result['algo'], result['message'])
+            assert not result['success'] and result['message'].startswith('unsolvable')
+            assert result['visited_nodes'] == 0